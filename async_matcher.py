@@ -0,0 +1,357 @@
+try:
+    from config import MONGODB_URI
+except ImportError:  # Callers pass mongodb_uri
+    MONGODB_URI = None
+import asyncio
+import contextvars
+import functools
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+
+from candidate_records import CANDIDATE_PROJECTION, CANDIDATEDATA_PROJECTION
+from instrumentation import collects_stats, count_documents
+from job_candidate_matcher import JobCandidateMatcher
+from job_queries import COMPANY_PROJECTION
+from mongo_clients import SCAN_READ_PREFERENCE, client_options
+from ranking import TopK
+
+
+class AsyncJobCandidateMatcher:
+    """
+    asyncio front end to JobCandidateMatcher for serving many requests from one process
+
+    Database reads go through pymongo's AsyncMongoClient on the event loop;
+    scoring runs on a wrapped JobCandidateMatcher in an executor (the loop's
+    default thread pool unless one is given). While one batch is scored the
+    next cursor batch and its candidatedata are already being fetched, and
+    company lookups for jobs entering the top-k run alongside scoring.
+    Results are identical to the synchronous methods.
+
+    The wrapped matcher's text model, skills index, feature store and ANN
+    index are used as loaded; build them on it (matcher.build_*) before
+    serving requests.
+    """
+
+    # Scoring tasks queued per request before cursor fetching waits for one to finish
+    MAX_PENDING_BATCHES = 2
+
+    def __init__(self, db_name='db', mongodb_uri=None, matcher: JobCandidateMatcher = None, executor=None,
+                 **matcher_options):
+        """
+        Args:
+            db_name: Database name
+            mongodb_uri: Connection string (defaults to config.MONGODB_URI)
+            matcher: JobCandidateMatcher to score with (created from db_name, mongodb_uri and matcher_options if None)
+            executor: concurrent.futures executor for scoring (defaults to the loop's thread pool)
+        """
+        self.mongodb_uri = mongodb_uri or MONGODB_URI
+        self.db_name = db_name
+        # Same pool settings as the shared sync clients; an async client belongs to one event loop
+        self.client = AsyncMongoClient(self.mongodb_uri, **client_options())
+        self.db = self.client[db_name]
+        self.jobs_collection = self.db.get_collection('jobs', read_preference=SCAN_READ_PREFERENCE)
+        self.candidates_collection = self.db.get_collection('candidates', read_preference=SCAN_READ_PREFERENCE)
+        self.candidatedatas_collection = self.db.get_collection('candidatedatas',
+                                                                read_preference=SCAN_READ_PREFERENCE)
+        self.companies_collection = self.db['companies']
+        self.matcher = matcher or JobCandidateMatcher(db_name, mongodb_uri=self.mongodb_uri, **matcher_options)
+        self.executor = executor
+        # Concurrent requests wait for one skills index build instead of each starting their own
+        self._skills_index_lock = asyncio.Lock()
+
+    @property
+    def instrumentation(self):
+        """The wrapped matcher's Instrumentation (see JobCandidateMatcher.enable_instrumentation)"""
+        return self.matcher.instrumentation
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        return self.matcher.cache_stats()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _run(self, function: Callable, *args, **kwargs):
+        """Run a blocking scoring call in the executor (in a copy of this context, so instrumentation follows it)"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, function, *args, **kwargs)
+        return await loop.run_in_executor(self.executor, call)
+
+    async def fetch_candidatedatas(self, candidate_ids: List, projection: Dict = CANDIDATEDATA_PROJECTION) -> Dict:
+        """Async JobCandidateMatcher.fetch_candidatedatas"""
+        candidatedatas = {}
+        candidate_ids = list(candidate_ids)
+        join_batch_size = self.matcher.JOIN_BATCH_SIZE
+        for start in range(0, len(candidate_ids), join_batch_size):
+            batch_ids = candidate_ids[start:start + join_batch_size]
+            batch = await self.candidatedatas_collection.find({'candidate': {'$in': batch_ids}}, projection).to_list()
+            count_documents('candidatedatas', batch)
+            for candidatedata in batch:
+                candidatedatas.setdefault(candidatedata['candidate'], candidatedata)
+        return candidatedatas
+
+    async def fetch_companies(self, company_ids: List, projection: Dict = COMPANY_PROJECTION) -> Dict:
+        """Company documents for many ids with one $in query, keyed by id"""
+        company_ids = [company_id for company_id in set(company_ids) if company_id is not None]
+        if not company_ids:
+            return {}
+        return {
+            company['_id']: company
+            async for company in self.companies_collection.find({'_id': {'$in': company_ids}}, projection)
+        }
+
+    async def _join_candidatedatas(self, candidates: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Attach candidatedata to a batch of candidates with a single $in query"""
+        count_documents('candidates', candidates)
+        candidatedatas = await self.fetch_candidatedatas([candidate['_id'] for candidate in candidates])
+        return candidates, [candidatedatas.get(candidate['_id']) for candidate in candidates]
+
+    async def iter_candidates_with_data(self, query: Dict = None,
+                                        batch_size: int = None) -> AsyncIterator[Tuple[List[Dict], List[Dict]]]:
+        """Async JobCandidateMatcher.iter_candidates_with_data"""
+        batch_size = batch_size or self.matcher.JOIN_BATCH_SIZE
+        batch = []
+        cursor = self.candidates_collection.find(query or {}, CANDIDATE_PROJECTION).batch_size(batch_size)
+        async for candidate in cursor:
+            batch.append(candidate)
+            if len(batch) >= batch_size:
+                yield await self._join_candidatedatas(batch)
+                batch = []
+        if batch:
+            yield await self._join_candidatedatas(batch)
+
+    async def iter_candidates_by_ids(self, candidate_ids: List, query: Dict = None,
+                                     batch_size: int = None) -> AsyncIterator[Tuple[List[Dict], List[Dict]]]:
+        """Async JobCandidateMatcher.iter_candidates_by_ids"""
+        batch_size = batch_size or self.matcher.JOIN_BATCH_SIZE
+        candidate_ids = list(candidate_ids)
+        for start in range(0, len(candidate_ids), batch_size):
+            id_filter = {'_id': {'$in': candidate_ids[start:start + batch_size]}}
+            batch_query = {'$and': [query, id_filter]} if query else id_filter
+            candidates = await self.candidates_collection.find(batch_query, CANDIDATE_PROJECTION).to_list()
+            if candidates:
+                yield await self._join_candidatedatas(candidates)
+
+    async def _iter_job_batches(self, query: Dict, batch_size: int) -> AsyncIterator[Tuple[List[Dict]]]:
+        """Job documents matching query, one cursor batch at a time"""
+        batch = []
+        async for job in self.jobs_collection.find(query).batch_size(batch_size):
+            batch.append(job)
+            if len(batch) >= batch_size:
+                yield (batch,)
+                batch = []
+        if batch:
+            yield (batch,)
+
+    async def _score_batches(self, batches: AsyncIterator[Tuple], score: Callable, collect: Callable):
+        """
+        Score each batch in the executor while the next one is fetched
+
+        Args:
+            batches: Async iterator of argument tuples for score
+            score: Blocking function scoring one batch
+            collect: Called on the event loop with each batch's result, in batch order
+        """
+        pending = deque()
+        try:
+            async for batch in batches:
+                pending.append(asyncio.ensure_future(self._run(score, *batch)))
+                while len(pending) > self.MAX_PENDING_BATCHES:
+                    collect(await pending.popleft())
+            while pending:
+                collect(await pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @collects_stats
+    async def rank_candidates(self, job: Dict, limit: int = 10, min_score: float = 0.0, vectorized: bool = True,
+                              batch_size: int = None, query: Dict = None, skill_prefilter: bool = False,
+                              approximate: bool = False, location: str = None) -> List[Dict]:
+        """Async JobCandidateMatcher.rank_candidates (sharing the wrapped matcher's result cache)"""
+        matcher = self.matcher
+        query = matcher.CANDIDATE_QUERY if query is None else query
+        cache_key = None
+        if matcher.result_cache is not None:
+            cache_key = matcher.result_cache_key(job, limit, min_score, query, skill_prefilter, approximate, location,
+                                                 vectorized)
+            matches = await self._cache_call(matcher.result_cache.get, cache_key)
+            if matches is not None:
+                return matches
+
+        matches = await self._rank_candidates(job, limit, min_score, vectorized, batch_size, query, skill_prefilter,
+                                              approximate, location)
+        if cache_key is not None:
+            await self._cache_call(matcher.result_cache.put, cache_key, matches)
+        return matches
+
+    async def _cache_call(self, function: Callable, *args):
+        """Call a result cache method; with a disk tier it runs in the executor so file I/O stays off the loop"""
+        if self.matcher.result_cache.path:
+            return await self._run(function, *args)
+        return function(*args)
+
+    async def _rank_candidates(self, job: Dict, limit: int, min_score: float, vectorized: bool, batch_size: int,
+                               query: Dict, skill_prefilter: bool, approximate: bool, location: str) -> List[Dict]:
+        matcher = self.matcher
+        batch_size = batch_size or matcher.STREAM_BATCH_SIZE
+        job_profile = await self._run(matcher.compile_job_profile, job)
+
+        if vectorized and matcher.feature_store_is_current(query):
+            rows = None
+            if approximate and matcher.ann_index_is_current():
+                rows = await self._run(matcher.ann_index.search, job_profile.text_vector)
+            top = await self._run(matcher.top_feature_store_scores, job, limit, min_score, skill_prefilter,
+                                  job_profile, rows, location)
+            candidate_ids = [candidate_id for candidate_id, _, _ in top]
+            candidates, candidatedatas = await asyncio.gather(
+                self.candidates_collection.find({'_id': {'$in': candidate_ids}}, CANDIDATE_PROJECTION).to_list(),
+                self.fetch_candidatedatas(candidate_ids)
+            )
+            candidates = {candidate['_id']: candidate for candidate in candidates}
+            return matcher.feature_store_matches(top, candidates, candidatedatas)
+
+        skills_by_id = None
+        if skill_prefilter:
+            async with self._skills_index_lock:
+                if matcher.skills_index is None:
+                    await self._run(matcher.build_skills_index)
+            candidate_ids, skills_scores = matcher.skills_index.skills_match(job_profile.skill_set)
+            skills_by_id = dict(zip(candidate_ids, skills_scores.tolist()))
+            batches = self.iter_candidates_by_ids(candidate_ids, query, batch_size)
+        else:
+            batches = self.iter_candidates_with_data(query, batch_size)
+
+        top = TopK(limit)
+        metro_id = None if location is None else matcher.locations.metro_id(location)
+
+        def score(candidates, candidatedatas):
+            if metro_id is not None:
+                candidates, candidatedatas = matcher.candidates_in_metro(candidates, candidatedatas, metro_id)
+            return matcher.top_batch_matches(job, job_profile, candidates, candidatedatas, limit, min_score,
+                                             vectorized, skills_by_id)
+
+        def collect(matches):
+            for match_score, candidate_id, match in matches:
+                top.push(match_score, candidate_id, match)
+
+        await self._score_batches(batches, score, collect)
+        return top.results()
+
+    @collects_stats
+    async def find_matching_candidates(self, job_id: str, limit: int = 10, min_score: float = 0.0,
+                                       vectorized: bool = True, batch_size: int = None,
+                                       skill_prefilter: bool = False, approximate: bool = False,
+                                       location: str = None) -> List[Dict]:
+        """
+        Async JobCandidateMatcher.find_matching_candidates
+
+        Args:
+            job_id: MongoDB ObjectId string or ObjectId of the job
+            limit: Maximum number of candidates to return
+            min_score: Minimum match score threshold
+            vectorized: Score candidates in batches with score_candidates instead of pair by pair
+            batch_size: Cursor/scoring batch size (defaults to STREAM_BATCH_SIZE)
+            skill_prefilter: Only score candidates sharing a skill with the job (uses the skills index)
+            approximate: Only fully score the candidates the ANN index returns (see build_ann_index)
+            location: Only candidates in this metro (a metro key or location text, see LocationTable)
+
+        Returns:
+            List of candidate matches with scores, sorted by match score
+        """
+        if isinstance(job_id, str):
+            job_id = ObjectId(job_id)
+
+        job = await self.jobs_collection.find_one({'_id': job_id})
+        if not job:
+            return []
+
+        return await self.rank_candidates(job, limit, min_score, vectorized, batch_size,
+                                          skill_prefilter=skill_prefilter, approximate=approximate,
+                                          location=location)
+
+    @collects_stats
+    async def search_jobs_for_candidate(self, candidate_id: str, limit: int = 10, min_score: float = 0.0,
+                                        batch_size: int = None, query: Dict = None,
+                                        include_company: bool = True) -> List[Dict]:
+        """
+        Async JobCandidateMatcher.search_jobs_for_candidate
+
+        Args:
+            candidate_id: MongoDB ObjectId string or ObjectId of the candidate
+            limit: Maximum number of jobs to return
+            min_score: Minimum match score threshold
+            batch_size: Cursor/scoring batch size (defaults to STREAM_BATCH_SIZE)
+            query: Job filter (defaults to every job)
+            include_company: Attach each job's company document (or None) as match['company']
+
+        Returns:
+            List of job matches with scores, sorted by match score
+        """
+        matcher = self.matcher
+        batch_size = batch_size or matcher.STREAM_BATCH_SIZE
+        if isinstance(candidate_id, str):
+            candidate_id = ObjectId(candidate_id)
+
+        candidate, candidatedata = await asyncio.gather(
+            self.candidates_collection.find_one({'_id': candidate_id}),
+            self.candidatedatas_collection.find_one({'candidate': candidate_id})
+        )
+        if not candidate:
+            return []
+
+        top = TopK(limit)
+        companies = {}
+        requested = set()
+        lookups = []
+
+        def score(jobs):
+            return matcher.score_jobs(jobs, candidate, candidatedata, min_score)
+
+        def collect(matches):
+            for match in matches:
+                top.push(match['match_score'], match['job_id'], match)
+            if include_company:
+                # Look up companies of jobs new to the top-k while later batches are scored
+                company_ids = {match['job'].get('company') for match in top.results()} - requested
+                if company_ids:
+                    requested.update(company_ids)
+                    lookups.append(asyncio.ensure_future(self.fetch_companies(list(company_ids))))
+
+        await self._score_batches(self._iter_job_batches(query or {}, batch_size), score, collect)
+        matches = top.results()
+
+        if include_company:
+            for found in await asyncio.gather(*lookups):
+                companies.update(found)
+            for match in matches:
+                match['company'] = companies.get(match['job'].get('company'))
+        return matches
+
+    async def close(self):
+        """Close the async client and the wrapped matcher"""
+        await self.client.close()
+        self.matcher.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    async def main(job_ids: List[str]):
+        """Rank candidates for several jobs concurrently"""
+        async with AsyncJobCandidateMatcher() as matcher:
+            results = await asyncio.gather(*[matcher.find_matching_candidates(job_id, limit=5) for job_id in job_ids])
+            for job_id, matches in zip(job_ids, results):
+                print(f"\nJob {job_id}:")
+                for i, match in enumerate(matches, 1):
+                    candidate = match['candidate']
+                    print(f"  {i}. {candidate.get('first_name', '')} {candidate.get('last_name', '')} "
+                          f"- {match['match_score']:.3f}")
+
+    # Usage: python async_matcher.py <job_id> [<job_id> ...]
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,297 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+from bson import ObjectId
+
+from feature_store import CandidateFeatureStore
+from instrumentation import count, count_documents, stage
+from ranking import TopK, top_k_indices
+from skills_index import skills_match_from_counts
+
+# Collection the pipeline writes ranked pairs to
+MATCHES_COLLECTION = 'matches'
+
+# Job fields read when compiling job profiles
+JOB_PROJECTION = {'_id': 1, 'title': 1, 'description': 1, 'skills': 1, 'location': 1}
+
+
+class BatchMatchResult:
+    """
+    Top-N candidates per job and top-N jobs per candidate from one BatchMatcher run
+
+    Rank lists are row-aligned arrays padded with -1 (and NaN scores) where
+    fewer than top_n pairs reached min_score. job_candidates holds candidate
+    row numbers into candidate_ids; candidate_jobs holds job row numbers
+    into job_ids. The score dicts have one array per sub-score plus
+    'overall_score'. stats holds the run's MatchStats when the matcher's
+    instrumentation is enabled.
+    """
+
+    def __init__(self, job_ids: List[ObjectId], candidate_ids: np.ndarray, job_candidates: np.ndarray,
+                 job_scores: Dict[str, np.ndarray], candidate_jobs: np.ndarray,
+                 candidate_scores: Dict[str, np.ndarray]):
+        self.job_ids = job_ids
+        self.candidate_ids = candidate_ids
+        self.job_candidates = job_candidates
+        self.job_scores = job_scores
+        self.candidate_jobs = candidate_jobs
+        self.candidate_scores = candidate_scores
+        self.stats = None
+
+    def _candidate_id(self, row: int) -> ObjectId:
+        return ObjectId(self.candidate_ids[row].tobytes())
+
+    def iter_pairs(self):
+        """
+        Yield (ranked_for, job_id, candidate_id, rank, scores) for every kept pair
+
+        ranked_for is 'job' for a job's top candidates and 'candidate' for a
+        candidate's top jobs; scores maps each score key to a float.
+        """
+        keys = list(self.job_scores)
+        for j, job_id in enumerate(self.job_ids):
+            for rank, row in enumerate(self.job_candidates[j].tolist()):
+                if row < 0:
+                    break
+                yield 'job', job_id, self._candidate_id(row), rank, {
+                    key: float(self.job_scores[key][j, rank]) for key in keys
+                }
+        for row in range(len(self.candidate_jobs)):
+            for rank, j in enumerate(self.candidate_jobs[row].tolist()):
+                if j < 0:
+                    break
+                yield 'candidate', self.job_ids[j], self._candidate_id(row), rank, {
+                    key: float(self.candidate_scores[key][row, rank]) for key in keys
+                }
+
+    def save_npz(self, path: str):
+        """Write every array to a compressed .npz file (ids as 12-byte rows)"""
+        arrays = {
+            'job_ids': np.array([np.frombuffer(job_id.binary, dtype=np.uint8) for job_id in self.job_ids],
+                                dtype=np.uint8).reshape(-1, 12),
+            'candidate_ids': np.asarray(self.candidate_ids),
+            'job_candidates': self.job_candidates,
+            'candidate_jobs': self.candidate_jobs
+        }
+        for key, values in self.job_scores.items():
+            arrays['job_' + key] = values
+        for key, values in self.candidate_scores.items():
+            arrays['candidate_' + key] = values
+        np.savez_compressed(path, **arrays)
+
+    def write_matches(self, collection, chunk_size: int = 1000) -> int:
+        """
+        Replace the contents of a matches collection with this run's pairs
+
+        The new run is inserted first and older runs are deleted afterwards,
+        so readers never see an empty collection.
+
+        Returns:
+            Number of documents written
+        """
+        run_id = ObjectId()
+        generated_at = datetime.now(timezone.utc)
+        written = 0
+        chunk = []
+        for ranked_for, job_id, candidate_id, rank, scores in self.iter_pairs():
+            chunk.append({
+                'run': run_id,
+                'generated_at': generated_at,
+                'ranked_for': ranked_for,
+                'job': job_id,
+                'candidate': candidate_id,
+                'rank': rank,
+                'match_score': scores.pop('overall_score'),
+                'score_breakdown': scores
+            })
+            if len(chunk) >= chunk_size:
+                collection.insert_many(chunk)
+                written += len(chunk)
+                chunk = []
+        if chunk:
+            collection.insert_many(chunk)
+            written += len(chunk)
+
+        collection.delete_many({'run': {'$ne': run_id}})
+        collection.create_index([('ranked_for', 1), ('job', 1), ('rank', 1)])
+        collection.create_index([('ranked_for', 1), ('candidate', 1), ('rank', 1)])
+        return written
+
+
+class BatchMatcher:
+    """
+    Scores every job against every eligible candidate in one pass
+
+    Candidate features come from the matcher's feature store (built in
+    memory with one scan if it is missing or stale). Candidates are
+    processed in row blocks: text similarity for all jobs is one sparse
+    product per block (one GEMV per job with dense SVD vectors), skills
+    overlap one sparse-dense product, and experience, role and (when
+    weighted) location scores are broadcast from per-job arrays. Scores are
+    identical to rank_candidates on the same store.
+    """
+
+    # Candidate rows scored per block; memory is about block_size x jobs x 5 doubles
+    CANDIDATE_BLOCK_SIZE = 10000
+
+    def __init__(self, matcher, top_n: int = 50, min_score: float = 0.0, block_size: int = None):
+        """
+        Args:
+            matcher: JobCandidateMatcher providing the database, text model and feature store
+            top_n: Pairs kept per job and per candidate
+            min_score: Minimum overall score for a pair to be kept
+            block_size: Candidate rows per block (defaults to CANDIDATE_BLOCK_SIZE)
+        """
+        self.matcher = matcher
+        self.top_n = top_n
+        self.min_score = min_score
+        self.block_size = block_size or self.CANDIDATE_BLOCK_SIZE
+
+    def load_jobs(self, job_query: Dict = None) -> List[Dict]:
+        """Jobs to rank for, ordered by id so equal scores break ties the same way everywhere"""
+        with stage('fetch'):
+            jobs = list(self.matcher.jobs_collection.find(job_query or {}, JOB_PROJECTION))
+        count_documents('jobs', jobs)
+        jobs.sort(key=lambda job: str(job['_id']))
+        return jobs
+
+    def candidate_store(self, candidate_query: Dict = None) -> CandidateFeatureStore:
+        """
+        The matcher's feature store (compacted) if it covers candidate_query
+
+        Otherwise a store for candidate_query is built in memory for this run;
+        matcher.feature_store is left as it is.
+        """
+        matcher = self.matcher
+        if matcher.feature_store_is_current(candidate_query):
+            return matcher.feature_store.compacted()
+        with stage('build_feature_store'):
+            return CandidateFeatureStore.build(matcher, candidate_query, matcher.STREAM_BATCH_SIZE)
+
+    def run(self, job_query: Dict = None, candidate_query: Dict = None) -> BatchMatchResult:
+        """
+        Rank candidates for every job and jobs for every candidate
+
+        Args:
+            job_query: Jobs to include (defaults to every job)
+            candidate_query: Candidate filter (defaults to matcher.CANDIDATE_QUERY)
+        """
+        with self.matcher._collect() as stats:
+            result = self._match(job_query, candidate_query)
+        result.stats = stats
+        return result
+
+    def _match(self, job_query: Dict, candidate_query: Dict) -> BatchMatchResult:
+        matcher = self.matcher
+        store = self.candidate_store(candidate_query)
+        jobs = self.load_jobs(job_query)
+        profiles = [matcher.compile_job_profile(job) for job in jobs]
+        keys = list(matcher.WEIGHTS) + ['overall_score']
+        n_jobs, n_candidates, top_n = len(jobs), len(store), self.top_n
+
+        # Job-side matrices, built once
+        job_text = matcher.text_model.stack([profile.text_vector for profile in profiles]) if profiles else None
+        skill_lookup = {skill: i for i, skill in enumerate(store.skill_vocabulary)}
+        job_skills = np.zeros((store.skills.shape[1], n_jobs))
+        for j, profile in enumerate(profiles):
+            for skill in profile.skill_set:
+                if skill in skill_lookup:
+                    job_skills[skill_lookup[skill], j] = 1.0
+        job_skill_counts = [len(profile.skill_set) for profile in profiles]
+        role_table = np.array([matcher._job_role_scores(profile, store.roles) for profile in profiles])
+
+        job_tops = [TopK(top_n) for _ in profiles]
+        candidate_jobs = np.full((n_candidates, top_n), -1, dtype=np.int64)
+        candidate_scores = {key: np.full((n_candidates, top_n), np.nan) for key in keys}
+        ids = store.id_strings
+
+        for lo in range(0, n_candidates if n_jobs else 0, self.block_size):
+            hi = min(lo + self.block_size, n_candidates)
+            scores = self._score_block(store, lo, hi, profiles, job_text, job_skills, job_skill_counts, role_table)
+            overall = scores['overall_score']
+
+            with stage('selection'):
+                # Top candidates per job
+                block_ids = [ids[row] for row in range(lo, hi)]
+                for j in range(n_jobs):
+                    column = overall[:, j]
+                    for i in top_k_indices(column, top_n, block_ids, self.min_score):
+                        job_tops[j].push(float(column[i]), block_ids[i],
+                                         (lo + i, tuple(float(scores[key][i, j]) for key in keys)))
+
+                # Top jobs per candidate; jobs are in id order, so a stable sort breaks ties by id
+                order = np.argsort(-overall, axis=1, kind='stable')[:, :top_n]
+                kept = np.take_along_axis(overall, order, axis=1) >= self.min_score
+                width = order.shape[1]
+                candidate_jobs[lo:hi, :width] = np.where(kept, order, -1)
+                for key in keys:
+                    candidate_scores[key][lo:hi, :width] = np.where(
+                        kept, np.take_along_axis(scores[key], order, axis=1), np.nan)
+
+        job_candidates = np.full((n_jobs, top_n), -1, dtype=np.int64)
+        job_scores = {key: np.full((n_jobs, top_n), np.nan) for key in keys}
+        for j, top in enumerate(job_tops):
+            for rank, (row, values) in enumerate(top.results()):
+                job_candidates[j, rank] = row
+                for key, value in zip(keys, values):
+                    job_scores[key][j, rank] = value
+
+        return BatchMatchResult([job['_id'] for job in jobs], store.ids, job_candidates, job_scores,
+                                candidate_jobs, candidate_scores)
+
+    def _score_block(self, store, lo: int, hi: int, profiles, job_text, job_skills: np.ndarray,
+                     job_skill_counts: List[int], role_table: np.ndarray) -> Dict[str, np.ndarray]:
+        """(block rows x jobs) arrays for each sub-score and 'overall_score'"""
+        matcher = self.matcher
+        scores = {}
+        with stage('skills_match'):
+            skills = store.skills[lo:hi]
+            matched = np.asarray(skills @ job_skills)
+            sizes = np.diff(skills.indptr)
+            scores['skills_match'] = np.column_stack([
+                skills_match_from_counts(matched[:, j].copy(), sizes, job_skill_counts[j])
+                for j in range(len(profiles))
+            ])
+        with stage('experience_match'):
+            years = np.asarray(store.years[lo:hi])
+            scores['experience_match'] = np.column_stack([
+                matcher._experience_match_array(profile.required_years, years) for profile in profiles
+            ])
+        with stage('job_role_match'):
+            scores['job_role_match'] = role_table[:, np.asarray(store.role_codes[lo:hi])].T
+        with stage('text_similarity'):
+            scores['text_similarity'] = matcher.text_model.similarity_matrix(job_text, store.text[lo:hi])
+        if 'location_match' in matcher.WEIGHTS:
+            with stage('location_match'):
+                city_codes = np.asarray(store.city_codes[lo:hi])
+                scores['location_match'] = np.column_stack([
+                    matcher.locations.match_scores(profile.city_id, city_codes) for profile in profiles
+                ])
+        count('pairs_scored', (hi - lo) * len(profiles))
+
+        # Same summation order as score_feature_store (the order scores were computed) so results are identical
+        overall = np.zeros((hi - lo, len(profiles)))
+        for key in scores:
+            overall += scores[key] * matcher.WEIGHTS[key]
+        scores['overall_score'] = overall
+        return scores
+
+
+if __name__ == "__main__":
+    import sys
+    from job_candidate_matcher import JobCandidateMatcher
+
+    # Usage: python batch_matching.py [mongo|npz] [path]
+    target = sys.argv[1] if len(sys.argv) > 1 else 'mongo'
+    matcher = JobCandidateMatcher()
+    print("Scoring every job against every eligible candidate...")
+    result = BatchMatcher(matcher).run()
+    if target == 'npz':
+        path = sys.argv[2] if len(sys.argv) > 2 else 'matches.npz'
+        result.save_npz(path)
+        print(f"Wrote top matches for {len(result.job_ids)} jobs and {len(result.candidate_jobs)} candidates to {path}")
+    else:
+        written = result.write_matches(matcher.db[MATCHES_COLLECTION])
+        print(f"Wrote {written} ranked pairs to the {MATCHES_COLLECTION} collection")
+    matcher.close()
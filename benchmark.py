@@ -0,0 +1,267 @@
+import json
+import multiprocessing
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from batch_matching import BatchMatcher
+from job_candidate_matcher import JobCandidateMatcher
+from synthetic_corpus import SyntheticCorpus
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+try:
+    import mongomock
+except ImportError:  # Only needed for the in-memory stand-in store (pass --uri for a local MongoDB)
+    mongomock = None
+
+# Matcher paths the benchmark can time
+PATHS = ('per_pair', 'streaming', 'feature_store', 'batched', 'parallel')
+
+# Database the synthetic corpus is loaded into on a real server
+BENCHMARK_DB = 'matcher_benchmark'
+
+
+class InMemoryMatcher(JobCandidateMatcher):
+    """JobCandidateMatcher over an in-memory (mongomock) database instead of a server"""
+
+    def __init__(self, database, **kwargs):
+        self._database = database
+        super().__init__(database.name, text_model_path=None, mongodb_uri='mongodb://localhost',
+                         feature_store_path=None, **kwargs)
+
+    def reconnect(self):
+        """Bind the in-memory database (forked workers keep their inherited copy)"""
+        self.db = self._database
+        self.client = self.db.client
+        self.jobs_collection = self.db['jobs']
+        self.candidates_collection = self.db['candidates']
+        self.candidatedatas_collection = self.db['candidatedatas']
+
+
+def open_matcher(uri: str = None, db_name: str = BENCHMARK_DB) -> JobCandidateMatcher:
+    """Matcher over a local MongoDB at uri, or over an in-memory stand-in when uri is None"""
+    if uri:
+        return JobCandidateMatcher(db_name, text_model_path=None, mongodb_uri=uri, feature_store_path=None)
+    if mongomock is None:
+        raise RuntimeError("Install mongomock for the in-memory store, or pass the URI of a local MongoDB")
+    return InMemoryMatcher(mongomock.MongoClient()[db_name])
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its finished children, in MiB (None if unknown)"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+class MatcherBenchmark:
+    """
+    Times the matcher's ranking paths on one loaded corpus
+
+    Paths:
+        per_pair       rank_candidates(vectorized=False), streamed from the cursor
+        streaming      rank_candidates, vectorized per cursor batch
+        feature_store  rank_candidates served from an in-memory feature store
+        batched        BatchMatcher over the queried jobs (one sample for the whole run)
+        parallel       ShardedScorer over ObjectId-range shards of the cursor scan
+
+    Each path runs in a forked child so its peak RSS and warm caches do not
+    leak into the next one. One untimed query warms every path up before
+    the timed queries. A "pair" is one job scored against one eligible
+    candidate.
+    """
+
+    def __init__(self, matcher, queries: int = 20, limit: int = 10, processes: int = None):
+        """
+        Args:
+            matcher: Matcher over the loaded corpus
+            queries: Jobs ranked per path (the first jobs by id)
+            limit: Candidates kept per job
+            processes: Worker processes for the parallel path (defaults to the CPU count)
+        """
+        self.matcher = matcher
+        self.limit = limit
+        self.processes = processes
+        self.jobs = list(matcher.jobs_collection.find().sort('_id', 1).limit(queries + 1))
+        self.eligible = matcher.candidates_collection.count_documents(matcher.CANDIDATE_QUERY)
+        self.setup_seconds: Dict[str, float] = {}
+
+    def prepare(self, paths: List[str]):
+        """Fit the text model (and build the feature store when a path needs it), timing both"""
+        started = time.perf_counter()
+        self.matcher.fit_text_model()
+        self.setup_seconds['fit_text_model'] = time.perf_counter() - started
+        if 'feature_store' in paths or 'batched' in paths:
+            started = time.perf_counter()
+            self.matcher.build_feature_store(save_path=None)
+            self.setup_seconds['build_feature_store'] = time.perf_counter() - started
+
+    def run(self, paths: List[str] = PATHS) -> Dict[str, Dict]:
+        """Report per path: queries, pairs, seconds, pairs_per_sec, p50_ms, p99_ms and peak_rss_mb"""
+        self.prepare(paths)
+        return {path: self._isolated(getattr(self, '_time_' + path)) for path in paths}
+
+    def _isolated(self, measure: Callable[[], Dict]) -> Dict:
+        """Run measure() in a forked child and return its report (in-process where fork is unavailable)"""
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return measure()
+        context = multiprocessing.get_context('fork')
+        receiver, sender = context.Pipe(duplex=False)
+        # Not a daemon, so the parallel path may start its own pool
+        child = context.Process(target=self._report_to, args=(measure, sender), daemon=False)
+        child.start()
+        sender.close()
+        report = receiver.recv()
+        child.join()
+        if isinstance(report, BaseException):
+            raise report
+        return report
+
+    def _report_to(self, measure: Callable[[], Dict], sender):
+        try:
+            # The parent's client must not be used across the fork
+            self.matcher.reconnect()
+            report = measure()
+        except Exception as error:
+            report = error
+        sender.send(report)
+        sender.close()
+
+    def _report(self, latencies: List[float], pairs: int) -> Dict:
+        seconds = float(sum(latencies))
+        return {
+            'queries': len(latencies),
+            'pairs': pairs,
+            'seconds': seconds,
+            'pairs_per_sec': pairs / seconds if seconds else None,
+            'p50_ms': float(np.percentile(latencies, 50)) * 1000.0 if latencies else None,
+            'p99_ms': float(np.percentile(latencies, 99)) * 1000.0 if latencies else None,
+            'peak_rss_mb': peak_rss_mb()
+        }
+
+    def _time_queries(self, rank: Callable[[Dict], List[Dict]]) -> Dict:
+        """Warm up on the first job, then time rank(job) for each of the others"""
+        warmup, timed = self.jobs[:1], self.jobs[1:]
+        for job in warmup:
+            rank(job)
+        latencies = []
+        for job in timed:
+            started = time.perf_counter()
+            rank(job)
+            latencies.append(time.perf_counter() - started)
+        return self._report(latencies, len(timed) * self.eligible)
+
+    def _time_per_pair(self) -> Dict:
+        self.matcher.feature_store = None
+        return self._time_queries(lambda job: self.matcher.rank_candidates(job, self.limit, vectorized=False))
+
+    def _time_streaming(self) -> Dict:
+        self.matcher.feature_store = None
+        return self._time_queries(lambda job: self.matcher.rank_candidates(job, self.limit))
+
+    def _time_feature_store(self) -> Dict:
+        return self._time_queries(lambda job: self.matcher.rank_candidates(job, self.limit))
+
+    def _time_batched(self) -> Dict:
+        job_ids = [job['_id'] for job in self.jobs[1:]]
+        started = time.perf_counter()
+        BatchMatcher(self.matcher, top_n=self.limit).run({'_id': {'$in': job_ids}})
+        return self._report([time.perf_counter() - started], len(job_ids) * len(self.matcher.feature_store))
+
+    def _time_parallel(self) -> Dict:
+        self.matcher.feature_store = None
+        scorer = self.matcher.sharded_scorer(self.processes)
+        try:
+            return self._time_queries(lambda job: scorer.rank_candidates(job, self.limit))
+        finally:
+            self.matcher.close()
+
+
+def format_report(results: Dict[str, Dict]) -> str:
+    """Results as an aligned text table"""
+    columns = ('queries', 'pairs_per_sec', 'p50_ms', 'p99_ms', 'peak_rss_mb')
+    lines = [f"{'path':<14}" + ''.join(f"{column:>15}" for column in columns)]
+    for path, report in results.items():
+        cells = []
+        for column in columns:
+            value = report.get(column)
+            if value is None:
+                cells.append(f"{'-':>15}")
+            elif isinstance(value, int):
+                cells.append(f"{value:>15,}")
+            else:
+                cells.append(f"{value:>15,.1f}")
+        lines.append(f"{path:<14}" + ''.join(cells))
+    return '\n'.join(lines)
+
+
+def regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float = 0.2) -> List[str]:
+    """Paths whose throughput fell more than tolerance below a baseline report"""
+    slower = []
+    for path, report in results.items():
+        before = baseline.get(path, {}).get('pairs_per_sec')
+        after = report.get('pairs_per_sec')
+        if before and after is not None and after < before * (1.0 - tolerance):
+            slower.append(f"{path}: {after:,.0f} pairs/sec vs {before:,.0f} in the baseline")
+    return slower
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time the matcher's ranking paths on a synthetic corpus")
+    parser.add_argument('--candidates', type=int, default=10000, help="Synthetic candidates (1k to 500k)")
+    parser.add_argument('--jobs', type=int, default=200, help="Synthetic jobs")
+    parser.add_argument('--skills', type=int, default=500, help="Skill vocabulary size")
+    parser.add_argument('--skill-skew', type=float, default=1.1, help="Zipf exponent of skill popularity")
+    parser.add_argument('--text-words', type=int, default=60, help="Mean words per free-text field")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=20, help="Jobs ranked per path")
+    parser.add_argument('--limit', type=int, default=10, help="Candidates kept per job")
+    parser.add_argument('--processes', type=int, default=None, help="Workers for the parallel path")
+    parser.add_argument('--paths', default=','.join(PATHS), help="Comma-separated subset of " + ', '.join(PATHS))
+    parser.add_argument('--uri', default=None, help="Local MongoDB to load into (default: in-memory mongomock)")
+    parser.add_argument('--json', dest='json_path', default=None, help="Write the results to this file")
+    parser.add_argument('--baseline', default=None, help="Earlier --json output; exit 1 on a throughput regression")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed throughput drop against the baseline")
+    args = parser.parse_args()
+
+    paths = [path.strip() for path in args.paths.split(',') if path.strip()]
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        parser.error(f"Unknown paths: {', '.join(sorted(unknown))}")
+
+    matcher = open_matcher(args.uri)
+    corpus = SyntheticCorpus(args.candidates, args.jobs, args.skills, args.skill_skew, args.text_words,
+                             seed=args.seed)
+    started = time.perf_counter()
+    counts = corpus.load(matcher.db)
+    print(f"Loaded {counts} in {time.perf_counter() - started:.1f}s")
+
+    benchmark = MatcherBenchmark(matcher, args.queries, args.limit, args.processes)
+    results = benchmark.run(paths)
+    print(', '.join(f"{step} {seconds:.1f}s" for step, seconds in benchmark.setup_seconds.items()))
+    print(format_report(results))
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'corpus': vars(args), 'setup_seconds': benchmark.setup_seconds, 'results': results}, f,
+                      indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f)['results'], args.tolerance)
+        for line in slower:
+            print("REGRESSION " + line)
+        if slower:
+            sys.exit(1)
+    matcher.close()
@@ -0,0 +1,58 @@
+from typing import Dict
+
+# Fields read by scoring (build_candidate_profile_text / extract_candidate_fields)
+# plus the few shown in match listings
+CANDIDATE_PROJECTION = {
+    '_id': 1,
+    'skills': 1,
+    'job_role': 1,
+    'about': 1,
+    'years_of_experience': 1,
+    'biggest_achievement': 1,
+    'job_expectations': 1,
+    'first_name': 1,
+    'last_name': 1,
+    'email': 1,
+    'city': 1,
+    'is_job_seeking': 1,
+    'is_availabletointerview': 1
+}
+
+CANDIDATEDATA_PROJECTION = {
+    '_id': 0,
+    'candidate': 1,
+    'skills': 1,
+    'job_role': 1,
+    'years_experience': 1,
+    'education.summary': 1,
+    'education.major': 1,
+    'employment.summary': 1,
+    'employment.job_title': 1
+}
+
+
+class CandidateRecord:
+    """
+    Compact per-candidate view holding only what scoring needs
+
+    Built from a (projected) candidate and candidatedata pair by
+    JobCandidateMatcher.build_candidate_record.
+    """
+
+    __slots__ = ('candidate_id', 'skills_text', 'years', 'job_role', 'profile_text', 'city_id')
+
+    def __init__(self, candidate_id, skills_text: str, years, job_role: str, profile_text: str, city_id: int = 0):
+        self.candidate_id = candidate_id
+        self.skills_text = skills_text
+        self.years = years
+        self.job_role = job_role
+        self.profile_text = profile_text
+        # LocationTable city id of the candidate's city (0 if unknown)
+        self.city_id = city_id
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form, mainly for debugging and serialization"""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self):
+        return f"CandidateRecord({self.candidate_id!r}, job_role={self.job_role!r})"
@@ -0,0 +1,233 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from bson import json_util
+
+from job_search import JOB_SEARCH_PROJECTION
+from mongo_clients import primary_collection
+
+# Default location of the persisted change stream resume token
+RESUME_TOKEN_PATH = 'change_stream_token.json'
+
+
+class ChangeStreamWatcher:
+    """
+    Keeps a JobCandidateMatcher's in-memory indexes in step with MongoDB
+
+    Tails one database-level change stream filtered to the candidates,
+    candidatedatas and jobs collections. Candidate-side events re-derive the
+    affected candidate and upsert it into (or remove it from) the feature
+    store's delta and the skills index, compacting the store once enough
+    changes have accumulated. Job events drop the job's cached scores and
+    re-index it in job_search, if given. Every applied event is also passed
+    to registered listeners. The resume token is checkpointed to disk so a
+    restarted watcher continues where it stopped.
+
+    Deletes carry no document unless pre-images are enabled, so the owner of
+    every candidatedata is loaded with one projected scan when the watcher
+    starts and then kept up to date from the events.
+
+    Tests can pass event_source, a callable taking the resume token and
+    returning an iterable of change events shaped like MongoDB's.
+    """
+
+    COLLECTIONS = ('candidates', 'candidatedatas', 'jobs')
+
+    def __init__(self, matcher, token_path: str = RESUME_TOKEN_PATH, event_source: Callable = None,
+                 feature_store_path: str = None, checkpoint_seconds: float = 60.0, job_search=None):
+        """
+        Args:
+            matcher: JobCandidateMatcher whose feature_store / skills_index are maintained
+            token_path: File the resume token is persisted to (None to disable)
+            event_source: Optional stand-in for the change stream (see class docstring)
+            feature_store_path: If set, the feature store is saved at each checkpoint
+            checkpoint_seconds: Minimum interval between checkpoints
+            job_search: Optional JobSearch kept in step with the jobs collection
+        """
+        self.matcher = matcher
+        self.job_search = job_search
+        self.token_path = token_path
+        self.event_source = event_source
+        self.feature_store_path = feature_store_path
+        self.checkpoint_seconds = checkpoint_seconds
+        self.resume_token = self.load_resume_token()
+        self.listeners: List[Callable[[str, str, object], None]] = []
+        self.events_applied = 0
+        self._running = False
+        self._last_checkpoint = time.monotonic()
+        # candidatedata _id -> candidate _id, for deletes that carry no document (see load_candidatedata_owners)
+        self._candidatedata_owners: Dict = None
+
+    def add_listener(self, listener: Callable[[str, str, object], None]):
+        """Register a callback(collection, operation, document_id) run after each applied event"""
+        self.listeners.append(listener)
+
+    # Resume tokens
+
+    def load_resume_token(self) -> Optional[Dict]:
+        """Read the persisted resume token, if any"""
+        if self.token_path and os.path.exists(self.token_path):
+            with open(self.token_path) as f:
+                return json_util.loads(f.read())
+        return None
+
+    def checkpoint(self):
+        """Persist the feature store (if configured) and then the resume token"""
+        if self.feature_store_path and self.matcher.feature_store is not None:
+            self.matcher.feature_store.save(self.feature_store_path)
+        if self.token_path and self.resume_token is not None:
+            staging = self.token_path + '.tmp'
+            with open(staging, 'w') as f:
+                f.write(json_util.dumps(self.resume_token))
+            os.replace(staging, self.token_path)
+        self._last_checkpoint = time.monotonic()
+
+    # Event loop
+
+    def open_stream(self) -> Iterable[Dict]:
+        """Open the change stream, resuming after the persisted token"""
+        if self.event_source is not None:
+            return self.event_source(self.resume_token)
+
+        pipeline = [{'$match': {'ns.coll': {'$in': list(self.COLLECTIONS)}}}]
+        return self.matcher.db.watch(
+            pipeline,
+            full_document='updateLookup',
+            full_document_before_change='whenAvailable',
+            resume_after=self.resume_token
+        )
+
+    def run(self, max_events: int = None):
+        """
+        Apply change events until stop() is called, the source is exhausted
+        or max_events have been applied
+        """
+        self._running = True
+        applied = 0
+        if self._candidatedata_owners is None:
+            self.load_candidatedata_owners()
+        stream = self.open_stream()
+        try:
+            for event in stream:
+                self.apply(event)
+                self.resume_token = event.get('_id', self.resume_token)
+                applied += 1
+
+                if time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds:
+                    self.checkpoint()
+                if not self._running or (max_events is not None and applied >= max_events):
+                    break
+        finally:
+            if hasattr(stream, 'close'):
+                stream.close()
+            self.checkpoint()
+            self._running = False
+
+    def stop(self):
+        """Ask run() to return after the current event"""
+        self._running = False
+
+    # Applying events
+
+    def apply(self, event: Dict):
+        """Apply a single change event to the matcher's indexes"""
+        collection = event.get('ns', {}).get('coll')
+        operation = event.get('operationType')
+        document_id = event.get('documentKey', {}).get('_id')
+
+        if collection == 'candidates':
+            self.refresh_candidate(document_id)
+        elif collection == 'candidatedatas':
+            for candidate_id in self._candidatedata_owner(event, operation, document_id):
+                self.refresh_candidate(candidate_id)
+        elif collection == 'jobs':
+            self.refresh_job(document_id)
+
+        store = self.matcher.feature_store
+        if store is not None and store.needs_compaction():
+            self.matcher.compact_feature_store()
+
+        self.events_applied += 1
+        for listener in self.listeners:
+            listener(collection, operation, document_id)
+
+    def load_candidatedata_owners(self):
+        """Read the candidate of every candidatedata (one projected scan, from the primary so no owner is missed)"""
+        collection = primary_collection(self.matcher.candidatedatas_collection)
+        self._candidatedata_owners = {
+            candidatedata['_id']: candidatedata['candidate']
+            for candidatedata in collection.find({}, {'candidate': 1})
+            if candidatedata.get('candidate') is not None
+        }
+
+    def _candidatedata_owner(self, event: Dict, operation: str, candidatedata_id) -> List:
+        """Candidates a candidatedata event affects: its current owner and any previous one"""
+        if self._candidatedata_owners is None:
+            self.load_candidatedata_owners()
+        owners = [
+            self._candidatedata_owners.get(candidatedata_id),
+            (event.get('fullDocumentBeforeChange') or {}).get('candidate'),
+            (event.get('fullDocument') or {}).get('candidate')
+        ]
+        if operation == 'delete':
+            self._candidatedata_owners.pop(candidatedata_id, None)
+        elif owners[-1] is not None:
+            self._candidatedata_owners[candidatedata_id] = owners[-1]
+        return list(dict.fromkeys(owner for owner in owners if owner is not None))
+
+    def refresh_candidate(self, candidate_id):
+        """Re-derive one candidate from the database, or drop it if gone or no longer eligible"""
+        matcher = self.matcher
+        store = matcher.feature_store
+        index = matcher.skills_index
+
+        if store is not None:
+            joined = self._fetch_candidate(candidate_id, store.query)
+            if joined is None:
+                store.remove([candidate_id])
+            else:
+                store.upsert(matcher, *joined)
+
+        if index is not None:
+            if store is None or index.query != store.query:
+                joined = self._fetch_candidate(candidate_id, index.query)
+            if joined is None:
+                index.remove(candidate_id)
+            else:
+                candidates, candidatedatas = joined
+                skills_text = matcher.extract_candidate_fields(candidates[0], candidatedatas[0])[0]
+                index.add(candidate_id, matcher.extract_skills(skills_text))
+
+    def refresh_job(self, job_id):
+        """Drop a job's cached scores and re-index it in job_search (or remove it if gone)"""
+        self.matcher.forget_job(job_id)
+        if self.job_search is None:
+            return
+        job = primary_collection(self.matcher.jobs_collection).find_one({'_id': job_id}, JOB_SEARCH_PROJECTION)
+        if job is None:
+            self.job_search.remove(job_id)
+        else:
+            self.job_search.update(job)
+
+    def _fetch_candidate(self, candidate_id, query: Dict):
+        """(candidates, candidatedatas) for one candidate matching query, or None (read from the primary)"""
+        return next(iter(self.matcher.iter_candidates_by_ids([candidate_id], query, primary=True)), None)
+
+
+if __name__ == "__main__":
+    from job_candidate_matcher import JobCandidateMatcher
+    from feature_store import FEATURE_STORE_PATH
+
+    matcher = JobCandidateMatcher()
+    if matcher.feature_store is None:
+        print("No feature store found; run `python feature_store.py build` first.")
+    else:
+        watcher = ChangeStreamWatcher(matcher, feature_store_path=FEATURE_STORE_PATH)
+        print(f"Watching {', '.join(watcher.COLLECTIONS)} for changes (Ctrl+C to stop)...")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+        print(f"Applied {watcher.events_applied} events")
+    matcher.close()
@@ -1,13 +1,15 @@
-from pymongo import MongoClient
 from config import MONGODB_URI
+from mongo_clients import get_client
+from job_queries import company_resolver
 from pprint import pprint
 
 def check_allocate_details():
     """Check details of jobs with 'allocate' in description"""
-    client = MongoClient(MONGODB_URI)
+    client = get_client(MONGODB_URI)
     db = client['db']
     jobs_collection = db['jobs']
-    companies_collection = db['companies']
+    # Companies of each listing are resolved with one query (and cached)
+    resolver = company_resolver(db)
     
     # Find jobs with 'allocate' in description
     jobs = list(jobs_collection.find({
@@ -15,6 +17,7 @@ def check_allocate_details():
     }))
     
     print(f"Jobs with 'allocate' in description: {len(jobs)}\n")
+    companies = resolver.for_jobs(jobs)
     
     for i, job in enumerate(jobs, 1):
         print("="*80)
@@ -26,7 +29,7 @@ def check_allocate_details():
         
         # Get company info
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"Company: {company.get('employer_name', 'N/A')}")
                 print(f"Company Email: {company.get('email', 'N/A')}")
@@ -53,15 +56,14 @@ def check_allocate_details():
     }))
     
     print(f"\nTotal analyst positions: {len(analyst_jobs)}\n")
+    companies = resolver.for_jobs(analyst_jobs)
     
     for i, job in enumerate(analyst_jobs, 1):
         print(f"{i}. {job.get('title', 'N/A')} at {job.get('location', 'N/A')}")
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
-    
-    client.close()
 
 if __name__ == "__main__":
     check_allocate_details()
@@ -79,8 +79,6 @@ def check_company_details():
         print(f"Found {len(all_company_jobs)} jobs from this company:")
         for j in all_company_jobs:
             print(f"  - {j.get('title', 'N/A')} at {j.get('location', 'N/A')}")
-    
-    client.close()
 
 if __name__ == "__main__":
     check_company_details()
@@ -1,14 +1,17 @@
-from pymongo import MongoClient
 from config import MONGODB_URI
+from mongo_clients import get_client
+from job_queries import company_resolver
+from job_search import JobSearch
 from pprint import pprint
-import json
 
 def comprehensive_search():
     """Comprehensive search for Dialogue AI Founding Software Engineer in Los Angeles"""
-    client = MongoClient(MONGODB_URI)
+    client = get_client(MONGODB_URI)
     db = client['db']
     jobs_collection = db['jobs']
     companies_collection = db['companies']
+    # Index over all jobs for the text searches below (reused from the last run while current)
+    search = JobSearch.load_or_build(db)
     
     print("="*80)
     print("COMPREHENSIVE SEARCH FOR DIALOGUE AI FOUNDING SOFTWARE ENGINEER")
@@ -16,27 +19,16 @@ def comprehensive_search():
     
     # Search 1: All jobs with "dialogue" anywhere
     print("\n1. Searching for 'dialogue' in any job field:")
-    dialogue_jobs = list(jobs_collection.find({
-        '$or': [
-            {'title': {'$regex': 'dialogue', '$options': 'i'}},
-            {'description': {'$regex': 'dialogue', '$options': 'i'}},
-            {'skills': {'$regex': 'dialogue', '$options': 'i'}},
-            {'location': {'$regex': 'dialogue', '$options': 'i'}}
-        ]
-    }))
+    dialogue_jobs = search.find_jobs(
+        'title:dialogue* OR description:dialogue* OR skills:dialogue* OR location:dialogue*'
+    )
     print(f"   Found: {len(dialogue_jobs)} jobs")
     for job in dialogue_jobs:
         print(f"   - {job.get('title', 'N/A')} at {job.get('location', 'N/A')}")
     
     # Search 2: All jobs with "founding" anywhere
     print("\n2. Searching for 'founding' in any job field:")
-    founding_jobs = list(jobs_collection.find({
-        '$or': [
-            {'title': {'$regex': 'founding', '$options': 'i'}},
-            {'description': {'$regex': 'founding', '$options': 'i'}},
-            {'skills': {'$regex': 'founding', '$options': 'i'}}
-        ]
-    }))
+    founding_jobs = search.find_jobs('title:founding* OR description:founding* OR skills:founding*')
     print(f"   Found: {len(founding_jobs)} jobs")
     for job in founding_jobs:
         print(f"   - {job.get('title', 'N/A')} at {job.get('location', 'N/A')}")
@@ -44,30 +36,17 @@ def comprehensive_search():
             desc = str(job.get('description', ''))[:200]
             print(f"     Description: {desc}...")
     
-    # Search 3: All jobs in Los Angeles (various formats)
-    print("\n3. Searching for Los Angeles jobs (various formats):")
-    la_variations = ['los angeles', 'los angeles,', 'la,', '^la$', 'los angeles ca', 'los angeles, ca']
-    la_jobs = []
-    for variation in la_variations:
-        jobs = list(jobs_collection.find({
-            'location': {'$regex': variation, '$options': 'i'}
-        }))
-        la_jobs.extend(jobs)
-    
-    # Remove duplicates
-    seen_ids = set()
-    unique_la_jobs = []
-    for job in la_jobs:
-        if job['_id'] not in seen_ids:
-            seen_ids.add(job['_id'])
-            unique_la_jobs.append(job)
+    # Search 3: All jobs in the Los Angeles metro ("Los Angeles, CA", "LA", "Santa Monica", ...)
+    print("\n3. Searching for Los Angeles jobs (any location resolving to the LA metro):")
+    unique_la_jobs = search.find_jobs('', location='los_angeles')
     
     print(f"   Found: {len(unique_la_jobs)} jobs")
+    companies = company_resolver(db).for_jobs(unique_la_jobs)
     for job in unique_la_jobs:
         print(f"   - {job.get('title', 'N/A')} at {job.get('location', 'N/A')}")
         # Get company name
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"     Company: {company.get('employer_name', 'N/A')}")
     
@@ -98,8 +77,6 @@ def comprehensive_search():
     for loc in sorted_locations[:30]:  # Show first 30
         print(f"   - {loc}")
     
-    client.close()
-    
     print("\n" + "="*80)
     print("CONCLUSION")
     print("="*80)
@@ -2,3 +2,6 @@
 # Copy this file to config.py and fill in your credentials
 MONGODB_URI = 'mongodb+srv://<db_username>:<db_password>@careerscrossroad-stagin.zvho8.mongodb.net/'
 
+
+# Optional MongoClient settings for the shared clients (see mongo_clients.DEFAULT_CLIENT_OPTIONS)
+# MONGODB_CLIENT_OPTIONS = {'maxPoolSize': 100, 'serverSelectionTimeoutMS': 5000}
@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from mongo_clients import get_client, close_clients
 from config import MONGODB_URI
 
 def connect_to_mongodb():
@@ -6,8 +6,8 @@ def connect_to_mongodb():
     Connect to MongoDB using the connection string from config.py
     """
     try:
-        # Create a MongoClient instance
-        client = MongoClient(MONGODB_URI)
+        # Shared, pooled client for this URI
+        client = get_client(MONGODB_URI)
         
         # Test the connection by accessing the server info
         server_info = client.server_info()
@@ -29,7 +29,7 @@ def get_database(db_name='db'):
     Get a specific database from MongoDB
     """
     try:
-        client = MongoClient(MONGODB_URI)
+        client = get_client(MONGODB_URI)
         db = client[db_name]
         return db, client
     except Exception as e:
@@ -53,6 +53,6 @@ if __name__ == "__main__":
         # collection = db['your_collection_name']
         
         # Close the connection when done
-        client.close()
+        close_clients()
         print("Connection closed.")
 
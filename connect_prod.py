@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from mongo_clients import get_client, close_clients
 from urllib.parse import quote_plus
 import sys
 
@@ -17,13 +17,16 @@ def build_connection_string():
 
 MONGODB_URI = build_connection_string()
 
+# Saved job search index of the production database (kept apart from the dev one)
+JOB_SEARCH_PATH = 'job_search_prod.pkl'
+
 def connect_to_mongodb():
     """
     Connect to MongoDB Production using the connection string
     """
     try:
-        # Create a MongoClient instance
-        client = MongoClient(MONGODB_URI)
+        # Shared, pooled client for this URI
+        client = get_client(MONGODB_URI)
         
         # Test the connection by accessing the server info
         server_info = client.server_info()
@@ -45,7 +48,7 @@ def get_database(db_name='db'):
     Get a specific database from MongoDB Production
     """
     try:
-        client = MongoClient(MONGODB_URI)
+        client = get_client(MONGODB_URI)
         db = client[db_name]
         return db, client
     except Exception as e:
@@ -72,7 +75,7 @@ if __name__ == "__main__":
             print(f"  - {collection_name}: {count} documents")
         
         # Close the connection when done
-        client.close()
+        close_clients()
         print("\n✅ Connection closed.")
     else:
         sys.exit(1)
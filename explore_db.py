@@ -1,5 +1,5 @@
-from pymongo import MongoClient
 from config import MONGODB_URI
+from mongo_clients import get_client
 from collections import defaultdict
 import json
 from pprint import pprint
@@ -9,7 +9,7 @@ def get_database(db_name='db'):
     Get a specific database from MongoDB
     """
     try:
-        client = MongoClient(MONGODB_URI)
+        client = get_client(MONGODB_URI)
         db = client[db_name]
         return db, client
     except Exception as e:
@@ -162,8 +162,6 @@ def explore_database(db_name='db'):
     for col_name in collections:
         explore_collection(db, col_name)
     
-    # Close connection
-    client.close()
     print(f"\n{'='*80}")
     print("Exploration complete!")
     print(f"{'='*80}")
@@ -186,8 +184,6 @@ def explore_specific_collection(db_name='db', collection_name=None):
             print(f"Available collections: {db.list_collection_names()}")
     else:
         print("Please specify a collection name.")
-    
-    client.close()
 
 if __name__ == "__main__":
     import sys
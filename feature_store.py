@@ -0,0 +1,526 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from bson import ObjectId, json_util
+from scipy import sparse
+
+# Default directory of the persisted feature store
+FEATURE_STORE_PATH = 'feature_store'
+
+
+class _HexIds:
+    """Sequence view of the store's ObjectId rows as hex strings (for tie-breaking)"""
+
+    def __init__(self, ids: np.ndarray):
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, i) -> str:
+        return self._ids[i].tobytes().hex()
+
+
+class CandidateFeatureStore:
+    """
+    Precomputed per-candidate matching features, persisted as NumPy arrays
+
+    Row i of every array belongs to the candidate whose 12-byte ObjectId is
+    ids[i]. Holds years of experience, job role codes, the skill-token
+    incidence matrix, the profile text matrix (sparse TF-IDF, or a
+    contiguous float32 array when the text model uses SVD) and LocationTable
+    city codes. Dense arrays and CSR components are saved as .npy files so
+    load() can memory-map them, and refresh() re-derives only candidates
+    changed since the last build.
+
+    Those arrays form the base segment and are never modified in place.
+    upsert() and remove() mark replaced or deleted base rows in the dead
+    mask and append new rows to a small in-memory delta segment (itself a
+    CandidateFeatureStore sharing the vocabularies), so a change costs
+    O(delta) rather than a copy of every array. segments() lists the
+    segments to score; compact() folds the delta and the dead rows into new
+    base arrays once needs_compaction() says so, and save() writes the
+    compacted form.
+
+    revision is a token that changes whenever the base arrays are replaced
+    (build, refresh through the matcher, compaction) and is saved with the
+    store. Deltas leave it unchanged, so rankings cached against it lag
+    individual changes by at most the cache TTL.
+    """
+
+    # Field consulted (together with the ObjectId timestamp) to find changed documents
+    UPDATED_FIELD = 'updated'
+
+    # Margin subtracted from the watermark to allow for clock skew with the database
+    WATERMARK_SKEW = timedelta(minutes=5)
+
+    FORMAT_VERSION = 2
+
+    # Compact once the delta plus dead rows exceed this share of the base rows (and COMPACT_MIN_ROWS)
+    COMPACT_FRACTION = 0.05
+    COMPACT_MIN_ROWS = 1000
+
+    def __init__(self):
+        self.ids = np.zeros((0, 12), dtype=np.uint8)
+        self.years = np.zeros(0)
+        self.role_codes = np.zeros(0, dtype=np.int32)
+        self.city_codes = np.zeros(0, dtype=np.int32)
+        self.roles: List[str] = []
+        self.skill_vocabulary: List[str] = []
+        self.skills = sparse.csr_matrix((0, 0))
+        self.text = sparse.csr_matrix((0, 0))
+        self.text_model_fingerprint = None
+        self.location_fingerprint = None
+        self.query = None
+        self.watermark = None
+        self.revision = uuid.uuid4().hex
+        # Base rows replaced or removed since the last compaction (None when there are none)
+        self.dead: np.ndarray = None
+        self.dead_count = 0
+        # Rows added since the last compaction (None when there are none)
+        self.delta: CandidateFeatureStore = None
+        self._reset_lookups()
+
+    def __len__(self):
+        """Number of current candidates (base rows not dead, plus delta rows)"""
+        return self.ids.shape[0] - self.dead_count + (len(self.delta) if self.delta is not None else 0)
+
+    def __contains__(self, candidate_id):
+        candidate_id = ObjectId(candidate_id)
+        if self.delta is not None and candidate_id in self.delta.rows:
+            return True
+        row = self.rows.get(candidate_id)
+        return row is not None and (self.dead is None or not self.dead[row])
+
+    def _reset_lookups(self):
+        self._rows = None
+        self._role_lookup = None
+        self._skill_lookup = None
+
+    @property
+    def rows(self) -> Dict[ObjectId, int]:
+        """Candidate ObjectId -> row number in this segment (dead rows included)"""
+        if self._rows is None:
+            self._rows = {ObjectId(row.tobytes()): i for i, row in enumerate(self.ids)}
+        return self._rows
+
+    @property
+    def id_strings(self) -> _HexIds:
+        """Row-aligned candidate ids as hex strings"""
+        return _HexIds(self.ids)
+
+    def candidate_ids(self, rows: Iterable[int]) -> List[ObjectId]:
+        """ObjectIds for the given row numbers"""
+        return [ObjectId(self.ids[i].tobytes()) for i in rows]
+
+    def current_ids(self) -> List[ObjectId]:
+        """ObjectIds of the current candidates (base rows not dead, then delta rows)"""
+        base = self.rows if self.dead is None else [
+            candidate_id for candidate_id, row in self.rows.items() if not self.dead[row]
+        ]
+        return list(base) + (list(self.delta.rows) if self.delta is not None else [])
+
+    def segments(self) -> List['CandidateFeatureStore']:
+        """The base segment followed by the delta, if any; rows of each are scored separately"""
+        return [self] if self.delta is None else [self, self.delta]
+
+    @property
+    def pending(self) -> int:
+        """Delta plus dead rows waiting for compaction"""
+        return self.dead_count + (len(self.delta) if self.delta is not None else 0)
+
+    def needs_compaction(self) -> bool:
+        """Whether enough changes have accumulated to be worth a compaction"""
+        return self.pending > max(self.COMPACT_MIN_ROWS, self.COMPACT_FRACTION * self.ids.shape[0])
+
+    # Building and refreshing
+
+    @classmethod
+    def build(cls, matcher, query: Dict = None, batch_size: int = None) -> 'CandidateFeatureStore':
+        """
+        Scan candidates once and derive every feature
+
+        Args:
+            matcher: JobCandidateMatcher providing the database and feature extraction
+            query: Candidate filter (defaults to matcher.CANDIDATE_QUERY)
+            batch_size: Cursor batch size
+        """
+        if matcher.text_model is None:
+            raise ValueError("Fit or load a corpus text model before building the feature store")
+
+        store = cls()
+        store.query = matcher.CANDIDATE_QUERY if query is None else query
+        store.text_model_fingerprint = matcher.text_model.fingerprint
+        store.location_fingerprint = matcher.locations.fingerprint
+        started = datetime.now(timezone.utc)
+
+        parts = [
+            store._derive(matcher, candidates, candidatedatas)
+            for candidates, candidatedatas in matcher.iter_candidates_with_data(store.query, batch_size)
+        ]
+        store._append(parts)
+        store.watermark = started
+        return store
+
+    def refresh(self, matcher, batch_size: int = None) -> Tuple[int, int]:
+        """
+        Re-derive candidates changed since the last build/refresh
+
+        Changed candidates are found by the UPDATED_FIELD timestamp or a newer
+        ObjectId, on both candidates and candidatedatas. Candidates that no
+        longer match the store's query, or were deleted (found by a projected
+        _id scan), are dropped. A different text model or location table
+        forces a full rebuild.
+
+        Returns:
+            (number of candidates upserted, number removed)
+        """
+        if (matcher.text_model is None or matcher.text_model.fingerprint != self.text_model_fingerprint
+                or matcher.locations.fingerprint != self.location_fingerprint):
+            rebuilt = self.build(matcher, self.query, batch_size)
+            self.__dict__.update(rebuilt.__dict__)
+            return len(self), 0
+
+        started = datetime.now(timezone.utc)
+        changed = self.changed_candidate_ids(matcher, self.watermark - self.WATERMARK_SKEW)
+
+        candidates, candidatedatas = [], []
+        for batch, batch_data in matcher.iter_candidates_by_ids(changed, self.query, batch_size):
+            candidates.extend(batch)
+            candidatedatas.extend(batch_data)
+
+        eligible = {candidate['_id'] for candidate in candidates}
+        self.upsert(matcher, candidates, candidatedatas)
+        # Hard deletes leave no changed document behind; reconcile ids against the collection
+        present = {candidate['_id'] for candidate in matcher.candidates_collection.find(self.query, {'_id': 1})}
+        gone = {candidate_id for candidate_id in self.current_ids() if candidate_id not in present}
+        removed = self.remove((set(changed) | gone) - eligible)
+        self.watermark = started
+        return len(candidates), removed
+
+    def changed_candidate_ids(self, matcher, since: datetime) -> List[ObjectId]:
+        """Ids of candidates whose candidate or candidatedata document changed since a time"""
+        recent = {'$or': [
+            {self.UPDATED_FIELD: {'$gte': since}},
+            {'_id': {'$gte': ObjectId.from_datetime(since)}}
+        ]}
+        changed = {candidate['_id'] for candidate in matcher.candidates_collection.find(recent, {'_id': 1})}
+        for candidatedata in matcher.candidatedatas_collection.find(recent, {'candidate': 1}):
+            if candidatedata.get('candidate') is not None:
+                changed.add(candidatedata['candidate'])
+        return sorted(changed)
+
+    def upsert(self, matcher, candidates: List[Dict], candidatedatas: List[Dict]):
+        """Insert or replace the features of the given candidates (into the delta segment)"""
+        if not candidates:
+            return
+        self.remove(candidate['_id'] for candidate in candidates)
+        part = self._derive(matcher, candidates, candidatedatas)
+        if self.delta is None:
+            self.delta = self._empty_segment()
+        self.delta._append([part])
+
+    def remove(self, candidate_ids: Iterable) -> int:
+        """Drop candidates from the store (dead base rows, delta rows removed); returns how many were present"""
+        candidate_ids = set(candidate_ids)
+        removed = 0
+        rows = [self.rows[candidate_id] for candidate_id in candidate_ids if candidate_id in self.rows]
+        if rows:
+            if self.dead is None:
+                self.dead = np.zeros(self.ids.shape[0], dtype=bool)
+            newly_dead = int((~self.dead[rows]).sum())
+            self.dead[rows] = True
+            self.dead_count += newly_dead
+            removed += newly_dead
+        if self.delta is not None:
+            removed += self.delta._drop(candidate_ids)
+            if not self.delta.ids.shape[0]:
+                self.delta = None
+        return removed
+
+    def _empty_segment(self) -> 'CandidateFeatureStore':
+        """Delta segment sharing this store's role and skill vocabularies (and their lookups)"""
+        segment = CandidateFeatureStore()
+        segment.roles = self.roles
+        segment.skill_vocabulary = self.skill_vocabulary
+        segment._role_lookup = self._role_lookup_table()
+        segment._skill_lookup = self._skill_lookup_table()
+        segment.text_model_fingerprint = self.text_model_fingerprint
+        segment.location_fingerprint = self.location_fingerprint
+        segment.query = self.query
+        return segment
+
+    def _drop(self, candidate_ids: Iterable) -> int:
+        """Delete rows by copying the rest (only used on the small delta segment)"""
+        rows = [self.rows[candidate_id] for candidate_id in set(candidate_ids) if candidate_id in self.rows]
+        if not rows:
+            return 0
+
+        keep = np.ones(self.ids.shape[0], dtype=bool)
+        keep[rows] = False
+        self.ids = self.ids[keep]
+        self.years = self.years[keep]
+        self.role_codes = self.role_codes[keep]
+        self.city_codes = self.city_codes[keep]
+        self.skills = self.skills[keep]
+        self.text = self.text[keep]
+        self._rows = None
+        return len(rows)
+
+    def compacted(self) -> 'CandidateFeatureStore':
+        """This store with the delta and dead rows folded into new base arrays (self when nothing is pending)"""
+        if not self.pending:
+            return self
+
+        store = CandidateFeatureStore()
+        for name in ('roles', 'skill_vocabulary', 'text_model_fingerprint', 'location_fingerprint', 'query',
+                     'watermark'):
+            setattr(store, name, getattr(self, name))
+        live = np.ones(self.ids.shape[0], dtype=bool) if self.dead is None else ~self.dead
+        parts = [(self, live)]
+        if self.delta is not None:
+            parts.append((self.delta, np.ones(self.delta.ids.shape[0], dtype=bool)))
+
+        vocabulary_size = len(self.skill_vocabulary)
+        store.ids = np.concatenate([np.asarray(segment.ids)[keep] for segment, keep in parts])
+        store.years = np.concatenate([np.asarray(segment.years)[keep] for segment, keep in parts])
+        store.role_codes = np.concatenate([np.asarray(segment.role_codes)[keep] for segment, keep in parts])
+        store.city_codes = np.concatenate([np.asarray(segment.city_codes)[keep] for segment, keep in parts])
+        store.skills = sparse.vstack([self._resized(segment.skills, vocabulary_size)[keep] for segment, keep in parts],
+                                     format='csr')
+        texts = [segment.text[keep] for segment, keep in parts]
+        if sparse.issparse(texts[0]):
+            store.text = sparse.vstack(texts, format='csr')
+        else:
+            store.text = np.ascontiguousarray(np.concatenate(texts), dtype=np.float32)
+        return store
+
+    def compact(self) -> bool:
+        """Replace the base arrays with compacted() (a new revision); returns False when nothing was pending"""
+        compacted = self.compacted()
+        if compacted is self:
+            return False
+        self.__dict__.update(compacted.__dict__)
+        return True
+
+    def _role_lookup_table(self) -> Dict[str, int]:
+        if self._role_lookup is None:
+            self._role_lookup = {role: i for i, role in enumerate(self.roles)}
+        return self._role_lookup
+
+    def _skill_lookup_table(self) -> Dict[str, int]:
+        if self._skill_lookup is None:
+            self._skill_lookup = {skill: i for i, skill in enumerate(self.skill_vocabulary)}
+        return self._skill_lookup
+
+    def _derive(self, matcher, candidates: List[Dict], candidatedatas: List[Dict]) -> Dict:
+        """Features for one batch of candidates, as row-aligned arrays"""
+        self._role_lookup_table()
+        self._skill_lookup_table()
+
+        records = [
+            matcher.build_candidate_record(candidate, candidatedata)
+            for candidate, candidatedata in zip(candidates, candidatedatas)
+        ]
+
+        role_codes = []
+        for record in records:
+            role = record.job_role or ''
+            if role not in self._role_lookup:
+                self._role_lookup[role] = len(self.roles)
+                self.roles.append(role)
+            role_codes.append(self._role_lookup[role])
+
+        indices, indptr = [], [0]
+        for record in records:
+            for skill in set(matcher.extract_skills(record.skills_text)):
+                if skill not in self._skill_lookup:
+                    self._skill_lookup[skill] = len(self.skill_vocabulary)
+                    self.skill_vocabulary.append(skill)
+                indices.append(self._skill_lookup[skill])
+            indptr.append(len(indices))
+
+        return {
+            'ids': np.array([np.frombuffer(record.candidate_id.binary, dtype=np.uint8) for record in records],
+                            dtype=np.uint8).reshape(-1, 12),
+            'years': matcher.years_array([record.years for record in records]),
+            'role_codes': np.array(role_codes, dtype=np.int32),
+            'city_codes': np.array([record.city_id for record in records], dtype=np.int32),
+            'skills': (np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            'text': matcher.text_model.transform([matcher.normalize_text(record.profile_text) for record in records])
+        }
+
+    def _append(self, parts: List[Dict]):
+        """Concatenate derived batches onto the stored arrays"""
+        if not parts:
+            return
+
+        vocabulary_size = len(self.skill_vocabulary)
+        skills = [self._resized(self.skills, vocabulary_size)]
+        for part in parts:
+            indices, indptr = part['skills']
+            skills.append(sparse.csr_matrix(
+                (np.ones(len(indices)), indices, indptr), shape=(len(indptr) - 1, vocabulary_size)
+            ))
+
+        text = [part['text'] for part in parts]
+        if self.ids.shape[0]:
+            text.insert(0, self.text)
+
+        self.ids = np.concatenate([self.ids] + [part['ids'] for part in parts])
+        self.years = np.concatenate([self.years] + [part['years'] for part in parts])
+        self.role_codes = np.concatenate([self.role_codes] + [part['role_codes'] for part in parts])
+        self.city_codes = np.concatenate([self.city_codes] + [part['city_codes'] for part in parts])
+        self.skills = sparse.vstack(skills, format='csr')
+        if sparse.issparse(text[0]):
+            self.text = sparse.vstack(text, format='csr')
+        else:
+            self.text = np.ascontiguousarray(np.concatenate(text), dtype=np.float32)
+        self._rows = None
+        self.revision = uuid.uuid4().hex
+
+    @staticmethod
+    def _resized(matrix, columns: int):
+        """Copy of a CSR matrix widened to a larger column count"""
+        return sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], columns))
+
+    # Queries
+
+    def skills_overlap(self, job_skills: Iterable[str], rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-row intersection with a job's skills (for every row, or only the given rows)
+
+        Returns:
+            (matched counts, distinct skills per candidate) arrays
+        """
+        # The vocabulary may have grown (through the delta) past this segment's columns
+        indicator = np.zeros(max(self.skills.shape[1], len(self.skill_vocabulary)))
+        lookup = self._skill_lookup_table()
+        for skill in set(job_skills):
+            if skill in lookup:
+                indicator[lookup[skill]] = 1.0
+        skills = self.skills if rows is None else self.skills[rows]
+        matched = skills @ indicator[:skills.shape[1]]
+        return matched, np.diff(skills.indptr)
+
+    # Persistence
+
+    def save(self, path: str = FEATURE_STORE_PATH):
+        """Write the store (compacted, see compacted()) to a directory, replacing any previous version atomically"""
+        self = self.compacted()
+        staging = path + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        arrays = {
+            'ids': self.ids,
+            'years': self.years,
+            'role_codes': self.role_codes,
+            'city_codes': self.city_codes,
+            'skills_indices': self.skills.indices,
+            'skills_indptr': self.skills.indptr
+        }
+        text_dense = not sparse.issparse(self.text)
+        if text_dense:
+            arrays['text'] = self.text
+        else:
+            arrays.update(text_data=self.text.data, text_indices=self.text.indices, text_indptr=self.text.indptr)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, name + '.npy'), np.ascontiguousarray(array))
+
+        meta = {
+            'format_version': self.FORMAT_VERSION,
+            'count': len(self),
+            'roles': self.roles,
+            'skill_vocabulary': self.skill_vocabulary,
+            'skills_shape': list(self.skills.shape),
+            'text_shape': list(self.text.shape),
+            'text_dense': text_dense,
+            'text_model_fingerprint': self.text_model_fingerprint,
+            'location_fingerprint': self.location_fingerprint,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'revision': self.revision,
+            'query': json_util.dumps(self.query)
+        }
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        previous = path + '.old'
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, previous)
+        os.rename(staging, path)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str = FEATURE_STORE_PATH, mmap: bool = True) -> 'CandidateFeatureStore':
+        """Load a store written by save(), memory-mapping its arrays by default"""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['format_version'] != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature store format {meta['format_version']} in {path}")
+
+        def array(name):
+            return np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None)
+
+        store = cls()
+        store.ids = array('ids')
+        store.years = array('years')
+        store.role_codes = array('role_codes')
+        store.city_codes = array('city_codes')
+        store.roles = meta['roles']
+        store.skill_vocabulary = meta['skill_vocabulary']
+        skills_indices = array('skills_indices')
+        store.skills = sparse.csr_matrix(
+            (np.ones(len(skills_indices)), skills_indices, array('skills_indptr')),
+            shape=tuple(meta['skills_shape'])
+        )
+        if meta.get('text_dense'):
+            store.text = array('text')
+        else:
+            store.text = sparse.csr_matrix(
+                (array('text_data'), array('text_indices'), array('text_indptr')),
+                shape=tuple(meta['text_shape'])
+            )
+        store.text_model_fingerprint = meta['text_model_fingerprint']
+        store.location_fingerprint = meta['location_fingerprint']
+        store.watermark = datetime.fromisoformat(meta['watermark']) if meta['watermark'] else None
+        store.query = json_util.loads(meta['query'])
+        store.revision = meta['revision']
+        return store
+
+    @classmethod
+    def load_if_exists(cls, path: str = FEATURE_STORE_PATH, mmap: bool = True):
+        """Load a persisted store, or return None when it is missing or in an older format (so it is rebuilt)"""
+        if not path or not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        with open(os.path.join(path, 'meta.json')) as f:
+            if json.load(f).get('format_version') != cls.FORMAT_VERSION:
+                return None
+        return cls.load(path, mmap)
+
+
+if __name__ == "__main__":
+    import sys
+    from job_candidate_matcher import JobCandidateMatcher
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'refresh'
+    path = sys.argv[2] if len(sys.argv) > 2 else FEATURE_STORE_PATH
+
+    matcher = JobCandidateMatcher(feature_store_path=path)
+    if command == 'build' or matcher.feature_store is None:
+        print("Building candidate feature store...")
+        store = matcher.build_feature_store(save_path=path)
+        print(f"Stored features for {len(store)} candidates in {path}")
+    elif command == 'refresh':
+        print("Refreshing candidate feature store...")
+        upserted, removed = matcher.refresh_feature_store(save_path=path)
+        print(f"Upserted {upserted}, removed {removed}; {len(matcher.feature_store)} candidates in {path}")
+    else:
+        print("Usage: python feature_store.py [build|refresh] [path]")
+    matcher.close()
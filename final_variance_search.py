@@ -103,8 +103,6 @@ def final_variance_search():
             if company:
                 print(f"     Company: {company.get('employer_name', 'N/A')}")
     
-    client.close()
-    
     print("\n" + "="*80)
     print("CONCLUSION")
     print("="*80)
@@ -0,0 +1,301 @@
+import contextvars
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Callable, Dict, Iterable, List
+
+import bson
+
+# MatchStats of the matcher call running in this context (None when not instrumented)
+_current_stats: contextvars.ContextVar = contextvars.ContextVar('match_stats', default=None)
+
+# Returned by stage() when nothing is collecting, so disabled hooks cost a context variable lookup
+_NO_STAGE = nullcontext()
+
+# Stand-in for Instrumentation.collect() when instrumentation is off (yields None)
+NOT_COLLECTING = nullcontext()
+
+
+class _Stage:
+    """Context manager adding its elapsed time to one stage of a MatchStats"""
+
+    __slots__ = ('stats', 'name', 'started')
+
+    def __init__(self, stats: 'MatchStats', name: str):
+        self.stats = stats
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def current_stats() -> 'MatchStats':
+    """The MatchStats being collected in this context, or None"""
+    return _current_stats.get()
+
+
+def stage(name: str):
+    """Time a block as a stage of the current call: `with stage('fetch'): ...`"""
+    stats = _current_stats.get()
+    return _NO_STAGE if stats is None else _Stage(stats, name)
+
+
+def count(name: str, n: int = 1):
+    """Add n to a counter of the current call"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count(name, n)
+
+
+def count_documents(collection: str, documents: List[Dict]):
+    """Count documents read from a collection, and their BSON size as bytes_fetched"""
+    stats = _current_stats.get()
+    if stats is not None and documents:
+        stats.count(collection + '_fetched', len(documents))
+        stats.count('bytes_fetched', sum(len(bson.encode(document)) for document in documents))
+
+
+class MatchStats:
+    """
+    Stage timings, counters and cache activity of one matcher call
+
+    stages maps a stage name to [seconds, calls]. Stages may nest (a
+    feature store build includes the fetch and join of its scan), so their
+    times do not add up to the wall time. counters holds document counts
+    per collection ('candidates_fetched', ...), 'bytes_fetched' (BSON size
+    of the documents read) and 'pairs_scored'; caches holds per-cache hits
+    and misses during the call.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, List] = {}
+        self.counters: Dict[str, int] = {}
+        self.caches: Dict[str, Dict[str, int]] = {}
+        # Executor threads of one async call record into the same stats
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, calls: int = 1):
+        """Add time to a stage"""
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [seconds, calls]
+            else:
+                entry[0] += seconds
+                entry[1] += calls
+
+    def count(self, name: str, n: int = 1):
+        """Add n to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_cache(self, name: str, hits: int, misses: int):
+        """Add cache hits and misses"""
+        with self._lock:
+            entry = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+            entry['hits'] += hits
+            entry['misses'] += misses
+
+    def merge(self, other: 'MatchStats'):
+        """Add another MatchStats into this one"""
+        for name, (seconds, calls) in list(other.stages.items()):
+            self.record(name, seconds, calls)
+        for name, n in list(other.counters.items()):
+            self.count(name, n)
+        for name, entry in list(other.caches.items()):
+            self.record_cache(name, entry['hits'], entry['misses'])
+
+    def seconds(self, name: str) -> float:
+        """Total seconds spent in a stage"""
+        return self.stages.get(name, [0.0, 0])[0]
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form with per-cache hit rates"""
+        return {
+            'stages': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'caches': {
+                name: dict(entry, hit_rate=entry['hits'] / (entry['hits'] + entry['misses'])
+                           if entry['hits'] + entry['misses'] else 0.0)
+                for name, entry in self.caches.items()
+            }
+        }
+
+    def __repr__(self):
+        stages = ', '.join(f"{name}={seconds:.3f}s" for name, (seconds, _) in self.stages.items())
+        return f"MatchStats({stages})"
+
+
+class MatchResults(list):
+    """Ranked matches, with the MatchStats of the call that produced them (None when not instrumented)"""
+
+    def __init__(self, matches: Iterable = (), stats: MatchStats = None):
+        super().__init__(matches)
+        self.stats = stats
+
+
+def collects_stats(method):
+    """
+    Decorator for matcher methods returning a list of matches
+
+    With the matcher's instrumentation enabled, the call's MatchStats are
+    collected and attached to the returned MatchResults. Coroutine methods
+    are wrapped the same way; scoring they run in executor threads records
+    into the call as long as the context is carried over (see
+    AsyncJobCandidateMatcher._run).
+    """
+    if inspect.iscoroutinefunction(method):
+        @wraps(method)
+        async def async_wrapper(matcher, *args, **kwargs):
+            instrumentation = matcher.instrumentation
+            if instrumentation is None:
+                return MatchResults(await method(matcher, *args, **kwargs))
+            with instrumentation.collect(matcher.cache_stats) as stats:
+                matches = await method(matcher, *args, **kwargs)
+            return MatchResults(matches, stats)
+        return async_wrapper
+
+    @wraps(method)
+    def wrapper(matcher, *args, **kwargs):
+        instrumentation = matcher.instrumentation
+        if instrumentation is None:
+            return MatchResults(method(matcher, *args, **kwargs))
+        with instrumentation.collect(matcher.cache_stats) as stats:
+            matches = method(matcher, *args, **kwargs)
+        return MatchResults(matches, stats)
+    return wrapper
+
+
+class Instrumentation:
+    """
+    Per-call MatchStats collection with running totals for export
+
+    collect() makes a fresh MatchStats current for the duration of one
+    matcher call (nested calls record into the outer one) and adds it to
+    totals when the call ends. to_prometheus() and to_json() render the
+    totals; serve() exposes them over HTTP.
+    """
+
+    def __init__(self, prefix: str = 'job_matcher'):
+        """
+        Args:
+            prefix: Metric name prefix in the Prometheus output
+        """
+        self.prefix = prefix
+        self.totals = MatchStats()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def collect(self, caches: Callable[[], Dict[str, Dict]] = None):
+        """
+        Collect one call's MatchStats
+
+        Args:
+            caches: Returns {cache name: {'hits': .., 'misses': ..}} counters; the
+                difference over the call is recorded as its cache activity
+        """
+        outer = _current_stats.get()
+        if outer is not None:
+            yield outer
+            return
+
+        stats = MatchStats()
+        before = caches() if caches else {}
+        token = _current_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_stats.reset(token)
+            for name, counters in (caches() if caches else {}).items():
+                previous = before.get(name, {})
+                stats.record_cache(name, counters['hits'] - previous.get('hits', 0),
+                                   counters['misses'] - previous.get('misses', 0))
+            self.totals.merge(stats)
+            with self._lock:
+                self.calls += 1
+
+    def reset(self):
+        """Clear the running totals"""
+        self.totals = MatchStats()
+        self.calls = 0
+
+    def to_dict(self) -> Dict:
+        return dict(self.totals.to_dict(), calls=self.calls)
+
+    def to_json(self) -> str:
+        """Running totals as JSON"""
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def to_prometheus(self) -> str:
+        """Running totals in the Prometheus text exposition format"""
+        prefix = self.prefix
+        totals = self.totals.to_dict()
+        lines = [
+            f"# HELP {prefix}_calls_total Instrumented matcher calls",
+            f"# TYPE {prefix}_calls_total counter",
+            f"{prefix}_calls_total {self.calls}",
+            f"# HELP {prefix}_stage_seconds_total Time spent per matching stage",
+            f"# TYPE {prefix}_stage_seconds_total counter"
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {entry["seconds"]!r}'
+                  for name, entry in sorted(totals['stages'].items())]
+        lines += [f"# HELP {prefix}_stage_calls_total Times each matching stage ran",
+                  f"# TYPE {prefix}_stage_calls_total counter"]
+        lines += [f'{prefix}_stage_calls_total{{stage="{name}"}} {entry["calls"]}'
+                  for name, entry in sorted(totals['stages'].items())]
+        for name, value in sorted(totals['counters'].items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        lines += [f"# HELP {prefix}_cache_requests_total Cache lookups by result",
+                  f"# TYPE {prefix}_cache_requests_total counter"]
+        for name, entry in sorted(totals['caches'].items()):
+            lines.append(f'{prefix}_cache_requests_total{{cache="{name}",result="hit"}} {entry["hits"]}')
+            lines.append(f'{prefix}_cache_requests_total{{cache="{name}",result="miss"}} {entry["misses"]}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = 9102, host: str = '127.0.0.1'):
+        """
+        Serve /metrics (Prometheus text) and /metrics.json from a daemon thread
+
+        Args:
+            port: Port to listen on
+            host: Interface to bind (local only by default; '' or '0.0.0.0' exposes it to the network)
+
+        Returns:
+            The HTTPServer; call shutdown() on it to stop
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        instrumentation = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = instrumentation.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = instrumentation.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -1,41 +1,331 @@
-from pymongo import MongoClient
-from config import MONGODB_URI
+try:
+    from config import MONGODB_URI
+except ImportError:  # Callers pass mongodb_uri (or connect through their own database)
+    MONGODB_URI = None
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import re
-from typing import List, Dict, Tuple
+from itertools import islice
+from typing import Callable, Iterable, List, Dict, Tuple, Iterator
 import numpy as np
+from bson import json_util
+from scipy import sparse
+from text_model import CorpusTextModel, TEXT_MODEL_PATH
+from candidate_records import CandidateRecord, CANDIDATE_PROJECTION, CANDIDATEDATA_PROJECTION
+from ranking import TopK, top_k_indices
+from skills_index import SkillsIndex, skills_match_from_counts
+from feature_store import CandidateFeatureStore, FEATURE_STORE_PATH
+from text_cache import LRUCache, TTLCache, normalize_text
+from job_profile import JobProfile, parse_years_requirement
+from parallel_scoring import ShardedScorer
+from ann_index import ProfileANNIndex
+from mongo_clients import get_client, primary_collection, scan_collection
+from locations import LOCATIONS
+from instrumentation import Instrumentation, NOT_COLLECTING, collects_stats, count, count_documents, stage
+from result_cache import MatchResultCache, job_revision
+from scoring import CORE_SUB_SCORES, OPTIONAL_SUB_SCORES, ScoringConfig, SubScorePlugin, SubScoreTable
 
 class JobCandidateMatcher:
     """
     A comprehensive job-candidate matching and ranking system
     """
     
-    def __init__(self, db_name='db'):
-        """Initialize the matcher with database connection"""
-        self.client = MongoClient(MONGODB_URI)
-        self.db = self.client[db_name]
-        self.jobs_collection = self.db['jobs']
-        self.candidates_collection = self.db['candidates']
-        self.candidatedatas_collection = self.db['candidatedatas']
+    # Weighted contribution of each sub-score to the overall score
+    WEIGHTS = {
+        'skills_match': 0.30,
+        'experience_match': 0.20,
+        'job_role_match': 0.25,
+        'text_similarity': 0.25
+    }
+    
+    # Share of the overall score given to location_match (see set_location_weight); 0 leaves it out
+    LOCATION_WEIGHT = 0.0
+    
+    # Ranking skips text similarity for candidates whose upper bound cannot reach the top-k (see _text_rows)
+    TEXT_PRUNING = True
+    
+    # Largest possible text_similarity (cosine similarity is at most 1; the margin covers rounding)
+    TEXT_SIMILARITY_BOUND = 1.0 + 1e-6
+    
+    # Candidate ids per $in query when joining candidatedatas
+    JOIN_BATCH_SIZE = 1000
+    
+    # Documents per cursor batch (and per scoring batch) when streaming matches
+    STREAM_BATCH_SIZE = 2000
+    
+    # Bounded memo caches for normalize_text / extract_skills; longer strings bypass them
+    NORMALIZE_CACHE_SIZE = 50000
+    SKILLS_CACHE_SIZE = 50000
+    CACHE_MAX_TEXT_LENGTH = 512
+    
+    # Per-job sub-score tables kept for re-weighting (see score_table), and how long scanned ones stay valid
+    SCORE_TABLE_CACHE_SIZE = 32
+    SCORE_TABLE_TTL = 600.0
+    
+    # Candidates considered by find_matching_candidates
+    CANDIDATE_QUERY = {
+        'is_job_seeking': True,  # Only active job seekers
+        'approval_status': {'$ne': 'rejected'}  # Exclude rejected candidates
+    }
+    
+    def __init__(self, db_name='db', text_model_path=TEXT_MODEL_PATH, mongodb_uri=None,
+                 feature_store_path=FEATURE_STORE_PATH):
+        """Initialize the matcher with database connection (mongodb_uri defaults to config.MONGODB_URI)"""
+        self.mongodb_uri = mongodb_uri or MONGODB_URI
+        self.db_name = db_name
+        self.reconnect()
+        # Corpus-level TF-IDF model (see fit_text_model); None falls back to per-pair fitting
+        self.text_model = CorpusTextModel.load_if_exists(text_model_path)
+        # Skill token -> candidates inverted index (see build_skills_index)
+        self.skills_index = None
+        # Precomputed candidate features (see build_feature_store); used when current
+        self.feature_store = CandidateFeatureStore.load_if_exists(feature_store_path)
+        # IVF index over the feature store's profile vectors (see build_ann_index)
+        self.ann_index = None
+        self.normalize_cache = LRUCache(self.NORMALIZE_CACHE_SIZE)
+        self.skills_cache = LRUCache(self.SKILLS_CACHE_SIZE)
+        # Job location / candidate city -> city and metro ids
+        self.locations = LOCATIONS
+        if self.LOCATION_WEIGHT:
+            self.set_location_weight(self.LOCATION_WEIGHT)
+        # Process pool for sharded scans (see sharded_scorer)
+        self._sharded_scorer = None
+        # Stage timers and counters (see enable_instrumentation); None disables them
+        self.instrumentation = None
+        # Cached rank_candidates results (see enable_result_cache); None disables caching
+        self.result_cache = None
+        # Unweighted sub-scores per job for re-weighting and A/B comparison (see score_table)
+        self.score_tables = TTLCache(self.SCORE_TABLE_CACHE_SIZE, self.SCORE_TABLE_TTL)
+    
+    def set_location_weight(self, weight: float):
+        """
+        Score location_match with this share of the overall score
+        
+        The other weights are scaled by (1 - weight) so they still sum to 1;
+        0 restores the class WEIGHTS and leaves location out of scoring.
+        """
+        weights = {key: value for key, value in type(self).WEIGHTS.items() if key != 'location_match'}
+        if weight:
+            weights = {key: value * (1.0 - weight) for key, value in weights.items()}
+            weights['location_match'] = weight
+        self.WEIGHTS = weights
+    
+    def set_scoring_config(self, config):
+        """
+        Rank with the weights of a ScoringConfig (or a plain weights dict)
+        
+        Only built-in sub-scores can be weighted here, since every ranking
+        path computes them from its own features; rank plugin sub-scores with
+        rank_with_config. Unweighted optional sub-scores are left out.
+        """
+        config = config if isinstance(config, ScoringConfig) else ScoringConfig(config)
+        if not config.builtin:
+            raise ValueError("Plugin sub-scores are only ranked from score tables (see rank_with_config)")
+        self.WEIGHTS = {
+            key: weight for key, weight in config.weights.items()
+            if key in CORE_SUB_SCORES or (key in OPTIONAL_SUB_SCORES and weight)
+        }
+    
+    @property
+    def scoring_config(self) -> ScoringConfig:
+        """The current WEIGHTS as a ScoringConfig"""
+        return ScoringConfig(self.WEIGHTS)
+    
+    def enable_instrumentation(self, instrumentation: Instrumentation = None) -> Instrumentation:
+        """
+        Record per-stage timings, document counters and cache activity of matching calls
+        
+        Ranking and search results then carry their MatchStats as `.stats`, and
+        the returned Instrumentation keeps running totals for export.
+        """
+        self.instrumentation = instrumentation or self.instrumentation or Instrumentation()
+        return self.instrumentation
+    
+    def disable_instrumentation(self):
+        """Stop recording stats (results carry stats=None)"""
+        self.instrumentation = None
+    
+    def _collect(self):
+        """Context collecting one call's MatchStats (yields None when instrumentation is off)"""
+        if self.instrumentation is None:
+            return NOT_COLLECTING
+        return self.instrumentation.collect(self.cache_stats)
+    
+    def enable_result_cache(self, path: str = None, maxsize: int = None, ttl: float = None) -> MatchResultCache:
+        """
+        Serve repeated candidate rankings from a MatchResultCache
         
+        Args:
+            path: Directory for the on-disk tier (None keeps results in memory only)
+            maxsize: Results kept in memory (defaults to MatchResultCache.MAXSIZE)
+            ttl: Seconds a result is served for (defaults to MatchResultCache.TTL)
+        """
+        self.result_cache = MatchResultCache(path, maxsize, ttl)
+        return self.result_cache
+    
+    def disable_result_cache(self):
+        """Rank every request afresh"""
+        self.result_cache = None
+    
+    def forget_job(self, job_id) -> int:
+        """
+        Drop the cached score tables and in-memory rankings of a job that changed or was deleted
+        
+        Entries are keyed by job revision, so they would no longer be served
+        anyway; this frees them before they expire. Returns how many were dropped.
+        """
+        job_id = str(job_id)
+        dropped = self.score_tables.discard(lambda key: key[0] == job_id)
+        if self.result_cache is not None:
+            dropped += self.result_cache.memory.discard(lambda key: key[0] == job_id)
+        return dropped
+    
+    def result_cache_key(self, job: Dict, limit: int, min_score: float = 0.0, query: Dict = None,
+                         skill_prefilter: bool = False, approximate: bool = False, location: str = None,
+                         vectorized: bool = True) -> Tuple:
+        """
+        Result cache key of a rank_candidates call
+        
+        Covers the job (id and content revision), the weights, the candidate
+        filter and limit, and what the ranking is computed from: the feature
+        store revision when the store answers the query ('scan' otherwise),
+        the ANN index settings, the text model and the location table.
+        """
+        query = self.CANDIDATE_QUERY if query is None else query
+        source = self._ranking_source(query, vectorized)
+        if approximate and source != 'scan' and self.ann_index_is_current():
+            ann_index = self.ann_index
+            source += f"/ann:{ann_index.n_lists}:{ann_index.n_probe}:{ann_index.max_candidates}"
+        filters = json_util.dumps({
+            'query': query,
+            'min_score': min_score,
+            'skill_prefilter': skill_prefilter,
+            'approximate': approximate,
+            'location': location
+        }, sort_keys=True)
+        return (
+            str(job.get('_id')),
+            job_revision(job),
+            tuple(self.WEIGHTS.items()),
+            filters,
+            limit,
+            source,
+            self.text_model.fingerprint if self.text_model is not None else None,
+            self.locations.fingerprint
+        )
+    
+    def _ranking_source(self, query: Dict, vectorized: bool = True) -> str:
+        """Feature store revision when the store answers query, 'scan' otherwise"""
+        return self.feature_store.revision if vectorized and self.feature_store_is_current(query) else 'scan'
+    
+    def _cached_ranking(self, key: Tuple, rank: Callable[[], List[Dict]]) -> List[Dict]:
+        """rank() through the result cache (key None bypasses it)"""
+        if key is None:
+            return rank()
+        matches = self.result_cache.get(key)
+        if matches is None:
+            matches = rank()
+            self.result_cache.put(key, matches)
+        return matches
+    
+    def reconnect(self):
+        """Bind to the process's shared client for mongodb_uri (a forked worker gets its own)"""
+        self.client = get_client(self.mongodb_uri)
+        self.db = self.client[self.db_name]
+        # Matching reads are scans, so they may be served by secondaries (point lookups use primary_collection)
+        self.jobs_collection = scan_collection(self.db, 'jobs')
+        self.candidates_collection = scan_collection(self.db, 'candidates')
+        self.candidatedatas_collection = scan_collection(self.db, 'candidatedatas')
+        
+    def fetch_candidatedatas(self, candidate_ids: List, projection: Dict = CANDIDATEDATA_PROJECTION,
+                             primary: bool = False) -> Dict:
+        """
+        Bulk-load candidatedatas for many candidates with batched $in queries
+        
+        Args:
+            candidate_ids: Candidate ObjectIds to look up
+            projection: Fields to fetch (None for whole documents)
+            primary: Read from the primary instead of SCAN_READ_PREFERENCE
+        
+        Returns:
+            Dict of candidate id -> candidatedata (first document per candidate, like find_one)
+        """
+        candidatedatas = {}
+        candidate_ids = list(candidate_ids)
+        collection = primary_collection(self.candidatedatas_collection) if primary else self.candidatedatas_collection
+        for start in range(0, len(candidate_ids), self.JOIN_BATCH_SIZE):
+            batch_ids = candidate_ids[start:start + self.JOIN_BATCH_SIZE]
+            found = list(collection.find({'candidate': {'$in': batch_ids}}, projection))
+            count_documents('candidatedatas', found)
+            for candidatedata in found:
+                candidatedatas.setdefault(candidatedata['candidate'], candidatedata)
+        return candidatedatas
+    
+    def iter_candidates_with_data(self, query: Dict = None, batch_size: int = None,
+                                  projection: Dict = CANDIDATE_PROJECTION):
+        """
+        Stream candidates joined with their candidatedata, one batch at a time
+        
+        Yields:
+            (candidates, candidatedatas) lists of equal length; missing candidatedata is None
+        """
+        batch_size = batch_size or self.JOIN_BATCH_SIZE
+        cursor = self.candidates_collection.find(query or {}, projection).batch_size(batch_size)
+        while True:
+            with stage('fetch'):
+                batch = list(islice(cursor, batch_size))
+            if not batch:
+                return
+            count_documents('candidates', batch)
+            yield self._join_candidatedatas(batch)
+    
+    def iter_candidates_by_ids(self, candidate_ids: List, query: Dict = None, batch_size: int = None,
+                               projection: Dict = CANDIDATE_PROJECTION, primary: bool = False):
+        """
+        Stream the given candidates (still subject to query) joined with their candidatedata
+        
+        Set primary for lookups that must see the latest write (secondaries may lag).
+        
+        Yields:
+            (candidates, candidatedatas) lists of equal length; missing candidatedata is None
+        """
+        batch_size = batch_size or self.JOIN_BATCH_SIZE
+        candidate_ids = list(candidate_ids)
+        collection = primary_collection(self.candidates_collection) if primary else self.candidates_collection
+        for start in range(0, len(candidate_ids), batch_size):
+            id_filter = {'_id': {'$in': candidate_ids[start:start + batch_size]}}
+            batch_query = {'$and': [query, id_filter]} if query else id_filter
+            with stage('fetch'):
+                candidates = list(collection.find(batch_query, projection))
+            count_documents('candidates', candidates)
+            if candidates:
+                yield self._join_candidatedatas(candidates, primary)
+    
+    def _join_candidatedatas(self, candidates: List[Dict], primary: bool = False) -> Tuple[List[Dict], List[Dict]]:
+        """Attach candidatedata to a batch of candidates with a single $in query"""
+        with stage('join'):
+            candidatedatas = self.fetch_candidatedatas([candidate['_id'] for candidate in candidates],
+                                                       primary=primary)
+        return candidates, [candidatedatas.get(candidate['_id']) for candidate in candidates]
+    
     def normalize_text(self, text: str) -> str:
-        """Normalize text for processing"""
+        """Normalize text for processing (memoized for short strings)"""
         if not text:
             return ""
-        # Convert to lowercase and remove extra whitespace
-        text = str(text).lower().strip()
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^\w\s]', ' ', text)
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        return text
+        if isinstance(text, str) and len(text) <= self.CACHE_MAX_TEXT_LENGTH:
+            return self.normalize_cache.get_or_compute(text, lambda: normalize_text(text))
+        return normalize_text(text)
     
     def extract_skills(self, skills_text: str) -> List[str]:
-        """Extract skills from a comma-separated or space-separated string"""
+        """Extract skills from a comma-separated or space-separated string (memoized for short strings)"""
         if not skills_text:
             return []
-        
+        if isinstance(skills_text, str) and len(skills_text) <= self.CACHE_MAX_TEXT_LENGTH:
+            return list(self.skills_cache.get_or_compute(skills_text, lambda: tuple(self._extract_skills(skills_text))))
+        return self._extract_skills(skills_text)
+    
+    def _extract_skills(self, skills_text: str) -> List[str]:
+        """Uncached extract_skills"""
         # Split by comma, semicolon, or space
         skills = re.split(r'[,;]|\s+', str(skills_text))
         # Clean and filter
@@ -66,10 +356,12 @@ class JobCandidateMatcher:
         
         return match_score
     
-    def calculate_experience_match(self, job_description: str, candidate_years: float) -> float:
-        """Calculate experience level matching score"""
-        if candidate_years is None or candidate_years < 0:
-            return 0.0
+    def parse_required_years(self, job_description: str) -> float:
+        """Infer the years of experience a job description asks for"""
+        # Explicit requirements ("3-5 years", "7+ yrs") take precedence over level keywords
+        required_years = parse_years_requirement(job_description)
+        if required_years is not None:
+            return required_years
         
         # Extract experience requirements from job description
         desc_lower = self.normalize_text(job_description)
@@ -87,6 +379,17 @@ class JobCandidateMatcher:
             # Default: assume mid-level (3-5 years)
             required_years = 3.0
         
+        return required_years
+    
+    def calculate_experience_match(self, job_description: str, candidate_years: float) -> float:
+        """Calculate experience level matching score"""
+        return self._experience_score(self.parse_required_years(job_description), candidate_years)
+    
+    def _experience_score(self, required_years: float, candidate_years: float) -> float:
+        """calculate_experience_match with the job requirement already parsed"""
+        if candidate_years is None or candidate_years < 0:
+            return 0.0
+        
         # Calculate match score
         if candidate_years >= required_years:
             return 1.0
@@ -105,6 +408,11 @@ class JobCandidateMatcher:
         # Combine texts for vectorization
         texts = [self.normalize_text(job_text), self.normalize_text(candidate_text)]
         
+        # Corpus model: vectors are already L2-normalized, so cosine is a dot product
+        if self.text_model is not None:
+            vectors = self.text_model.transform(texts)
+            return float(self.text_model.similarity(vectors[0], vectors[1:2])[0])
+        
         # Use TF-IDF vectorizer
         vectorizer = TfidfVectorizer(max_features=1000, stop_words='english', ngram_range=(1, 2))
         
@@ -121,6 +429,13 @@ class JobCandidateMatcher:
             return 0.0
         
         job_title_norm = self.normalize_text(job_title)
+        return self._role_match(job_title_norm, set(job_title_norm.split()), candidate_job_role)
+    
+    def _role_match(self, job_title_norm: str, job_keywords: set, candidate_job_role: str) -> float:
+        """calculate_job_role_match with the job title already normalized and tokenized"""
+        if not candidate_job_role:
+            return 0.0
+        
         candidate_role_norm = self.normalize_text(candidate_job_role)
         
         # Exact match
@@ -132,7 +447,6 @@ class JobCandidateMatcher:
             return 0.8
         
         # Check for keyword overlap
-        job_keywords = set(job_title_norm.split())
         candidate_keywords = set(candidate_role_norm.split())
         
         if job_keywords and candidate_keywords:
@@ -186,42 +500,228 @@ class JobCandidateMatcher:
         
         return ' '.join(profile_parts)
     
-    def calculate_match_score(self, job: Dict, candidate: Dict, candidatedata: Dict = None) -> Dict:
-        """Calculate comprehensive match score for a job-candidate pair"""
+    def build_job_profile_text(self, job: Dict) -> str:
+        """Build the text that is compared against candidate profiles"""
+        return f"{job.get('title', '')} {job.get('description', '')}"
+    
+    def fit_text_model(self, save_path: str = None, dimensions: int = None) -> CorpusTextModel:
+        """
+        Fit the corpus-level TF-IDF model over all job and candidate profile texts
         
-        # Extract job information
-        job_title = job.get('title', '')
-        job_description = job.get('description', '')
-        job_skills_text = job.get('skills', '')
-        job_skills = self.extract_skills(job_skills_text)
+        Args:
+            save_path: Optional path to persist the fitted model
+            dimensions: Project vectors to this many dense float32 dimensions with a
+                truncated SVD (e.g. 128-256); None keeps sparse TF-IDF vectors
+        
+        Returns:
+            The fitted model, which is also installed on this matcher
+        """
+        def corpus():
+            for job in self.jobs_collection.find({}, {'title': 1, 'description': 1}):
+                yield self.normalize_text(self.build_job_profile_text(job))
+            for candidates, candidatedatas in self.iter_candidates_with_data():
+                for candidate, candidatedata in zip(candidates, candidatedatas):
+                    yield self.normalize_text(self.build_candidate_profile_text(candidate, candidatedata))
+        
+        with self._collect(), stage('fit_text_model'):
+            model = CorpusTextModel(dimensions=dimensions).fit(corpus())
+        if save_path:
+            model.save(save_path)
+        
+        self.text_model = model
+        return model
+    
+    def build_skills_index(self, query: Dict = None) -> SkillsIndex:
+        """
+        Build the inverted skills index over candidates from extract_skills output
+        
+        Args:
+            query: Optional candidate filter (defaults to every candidate)
+        
+        Returns:
+            The index, which is also installed on this matcher
+        """
+        index = SkillsIndex(query)
+        for candidates, candidatedatas in self.iter_candidates_with_data(query):
+            for candidate, candidatedata in zip(candidates, candidatedatas):
+                skills_text = self.extract_candidate_fields(candidate, candidatedata)[0]
+                index.add(candidate['_id'], self.extract_skills(skills_text))
+        
+        self.skills_index = index
+        return index
+    
+    def build_feature_store(self, save_path: str = FEATURE_STORE_PATH, query: Dict = None) -> CandidateFeatureStore:
+        """
+        Precompute candidate features with one scan and persist them
+        
+        Args:
+            save_path: Directory to write the store to (None to keep it in memory only)
+            query: Candidate filter (defaults to CANDIDATE_QUERY)
+        
+        Returns:
+            The store, which is also installed on this matcher
+        """
+        with self._collect(), stage('build_feature_store'):
+            store = CandidateFeatureStore.build(self, query, self.STREAM_BATCH_SIZE)
+        if save_path:
+            store.save(save_path)
+        
+        self.feature_store = store
+        return store
+    
+    def refresh_feature_store(self, save_path: str = FEATURE_STORE_PATH) -> Tuple[int, int]:
+        """
+        Bring the feature store up to date with candidates changed since it was built
+        
+        Returns:
+            (number of candidates upserted, number removed)
+        """
+        if self.feature_store is None:
+            store = self.build_feature_store(save_path)
+            return len(store), 0
+        
+        result = self.feature_store.refresh(self, self.STREAM_BATCH_SIZE)
+        self.compact_feature_store(save_path)
+        return result
+    
+    def compact_feature_store(self, save_path: str = None) -> bool:
+        """
+        Fold the feature store's delta and removed rows into its base arrays
+        
+        A current ANN index is rebuilt over the compacted store with the same
+        settings, since its rows would otherwise no longer line up.
+        
+        Args:
+            save_path: Directory to write the store to afterwards (None to keep it in memory only)
         
-        # Extract candidate information
+        Returns:
+            Whether anything was pending
+        """
+        store = self.feature_store
+        if store is None:
+            return False
+        rebuild_ann = self.ann_index_is_current()
+        with self._collect(), stage('compact_feature_store'):
+            compacted = store.compact()
+        if compacted and rebuild_ann:
+            previous = self.ann_index
+            self.ann_index = ProfileANNIndex.build(store.text, previous.n_lists)
+            self.ann_index.n_probe, self.ann_index.max_candidates = previous.n_probe, previous.max_candidates
+        if save_path:
+            store.save(save_path)
+        return compacted
+    
+    def build_ann_index(self, n_lists: int = None) -> ProfileANNIndex:
+        """
+        Cluster the feature store's profile vectors for approximate candidate generation
+        
+        The index covers the store's base segment (the store is compacted
+        first); rows changed later through the delta are scored exactly, so
+        it stays current until the next compaction or rebuild, which
+        compact_feature_store handles (see ann_index_is_current).
+        """
+        if self.feature_store is None:
+            raise ValueError("Build or load the feature store before the ANN index")
+        self.feature_store.compact()
+        self.ann_index = ProfileANNIndex.build(self.feature_store.text, n_lists)
+        return self.ann_index
+    
+    def ann_index_is_current(self) -> bool:
+        """Whether the ANN index was built over the feature store currently loaded"""
+        return (
+            self.ann_index is not None
+            and self.feature_store is not None
+            and self.ann_index.is_current(self.feature_store.text)
+        )
+    
+    def feature_store_is_current(self, query: Dict = None) -> bool:
+        """Whether the feature store can answer a ranking over this candidate query"""
+        query = self.CANDIDATE_QUERY if query is None else query
+        return (
+            self.feature_store is not None
+            and self.text_model is not None
+            and self.feature_store.text_model_fingerprint == self.text_model.fingerprint
+            and self.feature_store.location_fingerprint == self.locations.fingerprint
+            and self.feature_store.query == query
+        )
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss counters of the text, skills, location and score table caches (and the result cache if enabled)"""
+        stats = {
+            'normalize_text': self.normalize_cache.stats(),
+            'extract_skills': self.skills_cache.stats(),
+            'locations': self.locations.cache.stats(),
+            'score_tables': self.score_tables.stats()
+        }
+        if self.result_cache is not None:
+            stats['results'] = self.result_cache.stats()
+        return stats
+    
+    def compile_job_profile(self, job: Dict) -> JobProfile:
+        """Parse everything job-side that scoring needs, once per job (see JobProfile)"""
+        with stage('job_profile'):
+            job_title = job.get('title', '')
+            job_text = self.build_job_profile_text(job)
+            text_vector = None
+            if self.text_model is not None:
+                text_vector = self.text_model.transform([self.normalize_text(job_text)])
+            return JobProfile(
+                job.get('_id'),
+                job_title,
+                self.normalize_text(job_title),
+                self.extract_skills(job.get('skills', '')),
+                self.parse_required_years(job.get('description', '')),
+                job_text,
+                text_vector,
+                self.locations.city_id(job.get('location'))
+            )
+    
+    def extract_candidate_fields(self, candidate: Dict, candidatedata: Dict = None) -> Tuple[str, float, str]:
+        """Pick skills text, years of experience and job role, preferring the candidates record"""
         candidate_skills_text = candidate.get('skills', '') or (candidatedata.get('skills', '') if candidatedata else '')
-        candidate_skills = self.extract_skills(candidate_skills_text)
         candidate_years = candidate.get('years_of_experience') or (candidatedata.get('years_experience') if candidatedata else 0)
         candidate_job_role = candidate.get('job_role', '') or (candidatedata.get('job_role', '') if candidatedata else '')
+        return candidate_skills_text, candidate_years, candidate_job_role
+    
+    def calculate_match_score(self, job: Dict, candidate: Dict, candidatedata: Dict = None,
+                              job_profile: JobProfile = None) -> Dict:
+        """
+        Calculate comprehensive match score for a job-candidate pair
         
-        # Build candidate profile text
-        candidate_profile_text = self.build_candidate_profile_text(candidate, candidatedata)
+        Pass job_profile (from compile_job_profile) when scoring one job against
+        many candidates so the job side is only processed once.
+        """
+        
+        # Extract job information
+        job_profile = job_profile or self.compile_job_profile(job)
+        
+        with stage('features'):
+            # Extract candidate information
+            candidate_skills_text, candidate_years, candidate_job_role = self.extract_candidate_fields(candidate, candidatedata)
+            candidate_skills = self.extract_skills(candidate_skills_text)
+            
+            # Build candidate profile text
+            candidate_profile_text = self.build_candidate_profile_text(candidate, candidatedata)
         
         # Calculate individual scores
-        scores = {
-            'skills_match': self.calculate_skills_match(job_skills, candidate_skills),
-            'experience_match': self.calculate_experience_match(job_description, candidate_years),
-            'job_role_match': self.calculate_job_role_match(job_title, candidate_job_role),
-            'text_similarity': self.calculate_text_similarity(
-                f"{job_title} {job_description}",
-                candidate_profile_text
-            )
-        }
+        scores = {}
+        with stage('skills_match'):
+            scores['skills_match'] = self.calculate_skills_match(job_profile.skills, candidate_skills)
+        with stage('experience_match'):
+            scores['experience_match'] = self._experience_score(job_profile.required_years, candidate_years)
+        with stage('job_role_match'):
+            scores['job_role_match'] = self._job_role_score(job_profile, candidate_job_role)
+        with stage('text_similarity'):
+            scores['text_similarity'] = self._text_similarity_to_job(job_profile, candidate_profile_text)
+        
+        if 'location_match' in self.WEIGHTS:
+            with stage('location_match'):
+                scores['location_match'] = self.locations.match_score(job_profile.city_id,
+                                                                      self.locations.city_id(candidate.get('city')))
+        count('pairs_scored')
         
         # Weighted overall score
-        weights = {
-            'skills_match': 0.30,
-            'experience_match': 0.20,
-            'job_role_match': 0.25,
-            'text_similarity': 0.25
-        }
+        weights = dict(self.WEIGHTS)
         
         overall_score = sum(scores[key] * weights[key] for key in scores)
         
@@ -231,14 +731,759 @@ class JobCandidateMatcher:
             'weights': weights
         }
     
-    def find_matching_candidates(self, job_id: str, limit: int = 10, min_score: float = 0.0) -> List[Dict]:
+    def _job_role_score(self, job_profile: JobProfile, candidate_job_role: str) -> float:
+        """calculate_job_role_match against a compiled job profile"""
+        if not job_profile.title:
+            return 0.0
+        return self._role_match(job_profile.title_norm, job_profile.title_tokens, candidate_job_role)
+    
+    def _text_similarity_to_job(self, job_profile: JobProfile, candidate_text: str) -> float:
+        """calculate_text_similarity reusing the job's precomputed TF-IDF vector"""
+        if job_profile.text_vector is None or not job_profile.text or not candidate_text:
+            return self.calculate_text_similarity(job_profile.text, candidate_text)
+        
+        vector = self.text_model.transform([self.normalize_text(candidate_text)])
+        return float(self.text_model.similarity(job_profile.text_vector, vector)[0])
+    
+    def build_candidate_record(self, candidate: Dict, candidatedata: Dict = None) -> CandidateRecord:
+        """Reduce a candidate/candidatedata pair to the compact record used for scoring"""
+        skills_text, candidate_years, job_role = self.extract_candidate_fields(candidate, candidatedata)
+        return CandidateRecord(
+            candidate.get('_id'),
+            skills_text,
+            candidate_years,
+            job_role,
+            self.build_candidate_profile_text(candidate, candidatedata),
+            self.locations.city_id(candidate.get('city'))
+        )
+    
+    def score_candidates(self, job: Dict, candidates: List[Dict], candidatedatas: List[Dict] = None,
+                         job_profile: JobProfile = None) -> Dict[str, np.ndarray]:
+        """
+        Vectorized scoring of one job against a batch of candidates
+        
+        Args:
+            job: Job document
+            candidates: Candidate documents
+            candidatedatas: Matching candidatedata documents (or None entries), aligned with candidates
+            job_profile: Precomputed compile_job_profile(job), if available
+        
+        Returns:
+            Dict of float64 arrays, one entry per candidate, for each sub-score and 'overall_score'
+        """
+        if candidatedatas is None:
+            candidatedatas = [None] * len(candidates)
+        
+        with stage('features'):
+            records = [
+                self.build_candidate_record(candidate, candidatedata)
+                for candidate, candidatedata in zip(candidates, candidatedatas)
+            ]
+        return self.score_records(job, records, job_profile=job_profile)
+    
+    def score_records(self, job: Dict, records: List[CandidateRecord],
+                      precomputed: Dict[str, np.ndarray] = None, job_profile: JobProfile = None,
+                      weights: Dict[str, float] = None, limit: int = None,
+                      threshold: float = float('-inf')) -> Dict[str, np.ndarray]:
+        """
+        Vectorized scoring of one job against a batch of CandidateRecords (see score_candidates)
+        
+        Args:
+            precomputed: Sub-score arrays already known for these records (e.g. skills_match
+                from the skills index); those sub-scores are not recomputed
+            job_profile: Precomputed compile_job_profile(job), if available
+            weights: Weights to combine (defaults to WEIGHTS); location_match is computed when listed
+            limit: Only records that can reach the top `limit` (and score at least threshold) need
+                exact scores; text similarity is skipped for the others (see _text_rows), which get
+                NaN text_similarity and -inf overall_score
+            threshold: Score a record must reach to matter, e.g. the current k-th best
+        """
+        precomputed = precomputed or {}
+        job_profile = job_profile or self.compile_job_profile(job)
+        weights = self.WEIGHTS if weights is None else weights
+        scores = {}
+        with stage('skills_match'):
+            scores['skills_match'] = precomputed['skills_match'] if 'skills_match' in precomputed else \
+                self._skills_match_vector(job_profile.skills, [record.skills_text for record in records])
+        with stage('experience_match'):
+            scores['experience_match'] = self._experience_match_array(
+                job_profile.required_years, self.years_array([record.years for record in records]))
+        with stage('job_role_match'):
+            scores['job_role_match'] = self._job_role_match_vector(job_profile, [record.job_role for record in records])
+        # Filled in last, but keeps its place in the summation order
+        scores['text_similarity'] = None
+        if 'location_match' in weights:
+            with stage('location_match'):
+                scores['location_match'] = self.locations.match_scores(
+                    job_profile.city_id, np.array([record.city_id for record in records], dtype=np.int32))
+        count('pairs_scored', len(records))
+        
+        text_rows = self._text_rows(scores, weights, limit, threshold) if limit is not None else None
+        with stage('text_similarity'):
+            if text_rows is None:
+                scores['text_similarity'] = self._text_similarity_vector(
+                    job_profile.text, [record.profile_text for record in records], job_profile.text_vector)
+            else:
+                scores['text_similarity'] = np.full(len(records), np.nan)
+                scores['text_similarity'][text_rows] = self._text_similarity_vector(
+                    job_profile.text, [records[i].profile_text for i in text_rows], job_profile.text_vector)
+        
+        # Same summation order as calculate_match_score so results are bit-identical
+        overall = np.zeros(len(records))
+        for key in scores:
+            overall += scores[key] * weights[key]
+        if text_rows is not None:
+            overall[np.isnan(overall)] = -np.inf
+        scores['overall_score'] = overall
+        return scores
+    
+    def _text_rows(self, scores: Dict[str, np.ndarray], weights: Dict[str, float], limit: int, threshold: float,
+                   eligible: np.ndarray = None) -> np.ndarray:
+        """
+        Rows whose overall score can still reach the top `limit` once text similarity is known
+        
+        Cascaded scoring: every other sub-score is already in scores. Summing
+        them in scoring order with text_similarity at 0 and at its maximum
+        gives a lower and an upper bound on each row's overall score
+        (rounding is monotonic, so the bounds hold for the exact float sums
+        too). At least `limit` rows score no less than the limit-th best
+        lower bound, so a row whose upper bound falls below that, or below
+        threshold, cannot make the top `limit` (not even on a tie) and its
+        text similarity is never computed.
+        
+        Args:
+            eligible: Rows that may be ranked at all (others are never kept)
+        
+        Returns:
+            Sorted row indices, or None when every row has to be scored
+        """
+        n = len(scores['skills_match'])
+        lower, upper = np.zeros(n), np.zeros(n)
+        for key in scores:
+            if key == 'text_similarity':
+                upper += self.TEXT_SIMILARITY_BOUND * weights[key]
+            else:
+                lower += scores[key] * weights[key]
+                upper += scores[key] * weights[key]
+        if eligible is not None:
+            lower[~eligible] = -np.inf
+        
+        cutoff = threshold
+        if 0 < limit <= n:
+            cutoff = max(cutoff, np.partition(lower, n - limit)[n - limit])
+        keep = upper >= cutoff
+        if eligible is not None:
+            keep &= eligible
+        if keep.all():
+            return None
+        count('text_pruned', n - int(keep.sum()))
+        return np.flatnonzero(keep)
+    
+    def score_feature_store(self, job: Dict, job_profile: JobProfile = None, rows: np.ndarray = None,
+                            weights: Dict[str, float] = None, limit: int = None, threshold: float = float('-inf'),
+                            skill_prefilter: bool = False,
+                            segment: CandidateFeatureStore = None) -> Dict[str, np.ndarray]:
+        """
+        Vectorized scoring of one job against every candidate in a feature store segment
+        
+        Args:
+            rows: Only score these segment rows (e.g. ANN candidates); arrays are then aligned with rows
+            weights: Weights to combine (defaults to WEIGHTS); location_match is computed when listed
+            limit: Skip text similarity for rows that cannot reach the top `limit` or threshold
+                (see score_records); they get NaN text_similarity and -inf overall_score
+            threshold: Score a row must reach to matter
+            skill_prefilter: Give rows sharing no skill with the job an overall_score of -inf
+            segment: One of feature_store.segments() (defaults to the base segment); its dead
+                rows get an overall_score of -inf
+        
+        Returns:
+            Dict of float64 arrays aligned with the segment rows, for each sub-score,
+            'overall_score' and 'skills_overlap' (job skills each candidate has)
+        """
+        store = self.feature_store if segment is None else segment
+        job_profile = job_profile or self.compile_job_profile(job)
+        job_skills = job_profile.skills
+        weights = self.WEIGHTS if weights is None else weights
+        
+        years, role_codes, city_codes = np.asarray(store.years), store.role_codes, store.city_codes
+        if rows is not None:
+            years, role_codes, city_codes = years[rows], role_codes[rows], city_codes[rows]
+        
+        scores = {}
+        with stage('skills_match'):
+            matched, candidate_sizes = store.skills_overlap(job_skills, rows)
+            scores['skills_match'] = skills_match_from_counts(matched, candidate_sizes, len(set(job_skills)))
+        with stage('experience_match'):
+            scores['experience_match'] = self._experience_match_array(job_profile.required_years, years)
+        with stage('job_role_match'):
+            scores['job_role_match'] = self._job_role_scores(job_profile, store.roles)[role_codes]
+        # Filled in last, but keeps its place in the summation order
+        scores['text_similarity'] = None
+        if 'location_match' in weights:
+            with stage('location_match'):
+                scores['location_match'] = self.locations.match_scores(job_profile.city_id, city_codes)
+        count('pairs_scored', len(years))
+        
+        eligible = matched > 0 if skill_prefilter else None
+        if store.dead is not None:
+            live = ~(store.dead if rows is None else store.dead[rows])
+            eligible = live if eligible is None else eligible & live
+        text_rows = self._text_rows(scores, weights, limit, threshold, eligible) if limit is not None else None
+        with stage('text_similarity'):
+            if text_rows is None:
+                scores['text_similarity'] = self.text_model.similarity(
+                    job_profile.text_vector, store.text if rows is None else store.text[rows])
+            else:
+                scores['text_similarity'] = np.full(len(years), np.nan)
+                scores['text_similarity'][text_rows] = self.text_model.similarity(
+                    job_profile.text_vector, store.text[text_rows if rows is None else rows[text_rows]])
+        
+        overall = np.zeros(len(years))
+        for key in scores:
+            overall += scores[key] * weights[key]
+        if text_rows is not None:
+            overall[np.isnan(overall)] = -np.inf
+        if eligible is not None:
+            overall[~eligible] = -np.inf
+        scores['overall_score'] = overall
+        scores['skills_overlap'] = matched
+        return scores
+    
+    def calculate_match_scores(self, job: Dict, candidates: List[Dict], candidatedatas: List[Dict] = None,
+                               job_profile: JobProfile = None) -> List[Dict]:
+        """Batched calculate_match_score: one result dict per candidate, in input order"""
+        arrays = self.score_candidates(job, candidates, candidatedatas, job_profile)
+        keys = list(self.WEIGHTS)
+        columns = [arrays[key].tolist() for key in keys]
+        return [
+            {
+                'overall_score': overall,
+                'scores': dict(zip(keys, row)),
+                'weights': dict(self.WEIGHTS)
+            }
+            for overall, row in zip(arrays['overall_score'].tolist(), zip(*columns))
+        ]
+    
+    def _skills_match_vector(self, job_skills: List[str], skills_texts: List[str]) -> np.ndarray:
+        """calculate_skills_match over many candidates via a sparse skill-incidence matrix"""
+        n = len(skills_texts)
+        job_skills_set = set(job_skills)
+        if not job_skills_set:
+            return np.zeros(n)
+        
+        # Columns: the job's skills first, then any other skill seen in the batch
+        vocabulary = {skill: i for i, skill in enumerate(job_skills_set)}
+        indices, indptr = [], [0]
+        for skills_text in skills_texts:
+            for skill in set(self.extract_skills(skills_text)):
+                indices.append(vocabulary.setdefault(skill, len(vocabulary)))
+            indptr.append(len(indices))
+        incidence = sparse.csr_matrix(
+            (np.ones(len(indices)), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(n, len(vocabulary))
+        )
+        
+        candidate_sizes = np.diff(incidence.indptr)
+        matched = np.asarray(incidence[:, :len(job_skills_set)].sum(axis=1)).ravel()
+        return skills_match_from_counts(matched, candidate_sizes, len(job_skills_set))
+    
+    def years_array(self, years: List[float]) -> np.ndarray:
+        """Candidate years as float64, with NaN for missing or non-numeric values"""
+        return np.array([
+            float(y) if isinstance(y, (int, float, np.integer, np.floating)) else np.nan for y in years
+        ], dtype=np.float64)
+    
+    def _experience_match_array(self, required_years: float, candidate_years: np.ndarray) -> np.ndarray:
+        """calculate_experience_match over a years array (see years_array)"""
+        valid = ~np.isnan(candidate_years) & (candidate_years >= 0)
+        y = np.where(valid, candidate_years, 0.0)
+        match_score = np.select(
+            [y >= required_years, y >= required_years * 0.7, y >= required_years * 0.5],
+            [1.0, 0.7, 0.5],
+            default=np.maximum(0.0, y / required_years)
+        )
+        match_score[~valid] = 0.0
+        return match_score
+    
+    def _job_role_match_vector(self, job_profile: JobProfile, roles: List[str]) -> np.ndarray:
+        """calculate_job_role_match computed once per distinct role and broadcast back"""
+        n = len(roles)
+        if not job_profile.title or n == 0:
+            return np.zeros(n)
+        
+        unique_roles = {}
+        inverse = np.array([unique_roles.setdefault(role or '', len(unique_roles)) for role in roles], dtype=np.int64)
+        return self._job_role_scores(job_profile, list(unique_roles))[inverse]
+    
+    def _job_role_scores(self, job_profile: JobProfile, unique_roles: List[str]) -> np.ndarray:
+        """calculate_job_role_match for each of a list of distinct roles"""
+        if not job_profile.title or not unique_roles:
+            return np.zeros(len(unique_roles))
+        
+        job_title_norm = job_profile.title_norm
+        job_keywords = job_profile.title_tokens
+        token_ids = {token: i for i, token in enumerate(job_keywords)}
+        
+        # Exact and containment checks per distinct role; tokens go into a sparse matrix
+        role_scores = np.zeros(len(unique_roles))
+        needs_overlap = np.zeros(len(unique_roles), dtype=bool)
+        indices, indptr = [], [0]
+        for i, role in enumerate(unique_roles):
+            role_norm = self.normalize_text(role) if role else ''
+            if not role:
+                pass
+            elif job_title_norm == role_norm:
+                role_scores[i] = 1.0
+            elif role_norm in job_title_norm or job_title_norm in role_norm:
+                role_scores[i] = 0.8
+            else:
+                needs_overlap[i] = True
+                for token in set(role_norm.split()):
+                    indices.append(token_ids.setdefault(token, len(token_ids)))
+            indptr.append(len(indices))
+        
+        tokens = sparse.csr_matrix(
+            (np.ones(len(indices)), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(unique_roles), max(len(token_ids), 1))
+        )
+        role_sizes = np.diff(tokens.indptr)
+        overlap = np.asarray(tokens[:, :len(job_keywords)].sum(axis=1)).ravel()
+        total_unique = len(job_keywords) + role_sizes - overlap
+        
+        use_overlap = needs_overlap & (role_sizes > 0) & (total_unique > 0) & bool(job_keywords)
+        role_scores[use_overlap] = overlap[use_overlap] / total_unique[use_overlap]
+        return role_scores
+    
+    def _text_similarity_vector(self, job_text: str, profile_texts: List[str], job_vector=None) -> np.ndarray:
+        """calculate_text_similarity against many profiles with one sparse product"""
+        if self.text_model is None:
+            # No corpus model: fall back to the per-pair vectorizer
+            return np.array([self.calculate_text_similarity(job_text, text) for text in profile_texts])
+        
+        similarity = np.zeros(len(profile_texts))
+        if not job_text:
+            return similarity
+        
+        present = [i for i, text in enumerate(profile_texts) if text]
+        if present:
+            query = job_vector if job_vector is not None else self.text_model.transform([self.normalize_text(job_text)])
+            matrix = self.text_model.transform([self.normalize_text(profile_texts[i]) for i in present])
+            similarity[present] = self.text_model.similarity(query, matrix)
+        return similarity
+    
+    def iter_candidate_matches(self, job: Dict, min_score: float = 0.0, vectorized: bool = True,
+                               batch_size: int = None, query: Dict = None) -> Iterator[Dict]:
+        """
+        Stream scored candidate matches for a job, batch by batch, in cursor order
+        
+        Only one batch of candidates is held in memory at a time; matches below
+        min_score are dropped as they are scored.
+        
+        Args:
+            job: Job document
+            min_score: Minimum match score threshold
+            vectorized: Score each batch with score_candidates instead of pair by pair
+            batch_size: Cursor/scoring batch size (defaults to STREAM_BATCH_SIZE)
+            query: Candidate filter (defaults to CANDIDATE_QUERY)
+        
+        Yields:
+            Candidate match dicts (unsorted)
+        """
+        batch_size = batch_size or self.STREAM_BATCH_SIZE
+        query = self.CANDIDATE_QUERY if query is None else query
+        job_profile = self.compile_job_profile(job)
+        
+        for candidates, candidatedatas in self.iter_candidates_with_data(query, batch_size):
+            # Calculate match scores
+            if vectorized:
+                match_results = self.calculate_match_scores(job, candidates, candidatedatas, job_profile)
+            else:
+                match_results = [
+                    self.calculate_match_score(job, candidate, candidatedata, job_profile)
+                    for candidate, candidatedata in zip(candidates, candidatedatas)
+                ]
+            
+            for candidate, candidatedata, match_result in zip(candidates, candidatedatas, match_results):
+                if match_result['overall_score'] >= min_score:
+                    yield self._candidate_match(candidate, candidatedata, match_result['overall_score'],
+                                                match_result['scores'])
+    
+    def _candidate_match(self, candidate: Dict, candidatedata: Dict, match_score: float, score_breakdown: Dict) -> Dict:
+        """Result entry returned by find_matching_candidates"""
+        return {
+            'candidate_id': str(candidate['_id']),
+            'candidate': candidate,
+            'candidatedata': candidatedata,
+            'match_score': match_score,
+            'score_breakdown': score_breakdown
+        }
+    
+    @collects_stats
+    def rank_candidates(self, job: Dict, limit: int = 10, min_score: float = 0.0, vectorized: bool = True,
+                        batch_size: int = None, query: Dict = None, skill_prefilter: bool = False,
+                        job_profile: JobProfile = None, approximate: bool = False, location: str = None) -> List[Dict]:
+        """
+        Top-k candidates for a job document, streamed from the cursor
+        
+        The vectorized path selects each batch's best with argpartition and
+        only builds result dicts for those; the per-pair path feeds a bounded
+        heap. Ties are broken by candidate id so rankings are deterministic.
+        
+        With skill_prefilter, only candidates sharing at least one skill with
+        the job (per the skills index) are fetched and scored, and their
+        skills_match comes straight from the index postings.
+        
+        With approximate, and a current ANN index over the feature store, only
+        the candidates the index returns for the job's profile vector get the
+        full four-factor scoring (see ProfileANNIndex for the recall knob).
+        
+        With location (a metro key such as 'los_angeles' or any location
+        text), only candidates whose city falls in that metro are ranked.
+        
+        With the result cache enabled, a repeated ranking of an unchanged job
+        is served from it (see result_cache_key).
+        """
+        query = self.CANDIDATE_QUERY if query is None else query
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache_key(job, limit, min_score, query, skill_prefilter, approximate, location,
+                                              vectorized)
+        return self._cached_ranking(cache_key, lambda: self._rank_candidates(
+            job, limit, min_score, vectorized, batch_size, query, skill_prefilter, job_profile, approximate, location))
+    
+    def _rank_candidates(self, job: Dict, limit: int, min_score: float, vectorized: bool, batch_size: int,
+                         query: Dict, skill_prefilter: bool, job_profile: JobProfile, approximate: bool,
+                         location: str) -> List[Dict]:
+        batch_size = batch_size or self.STREAM_BATCH_SIZE
+        
+        # Job-side features are derived once for the whole ranking
+        job_profile = job_profile or self.compile_job_profile(job)
+        
+        if vectorized and self.feature_store_is_current(query):
+            rows = None
+            if approximate and self.ann_index_is_current():
+                rows = self.ann_index.search(job_profile.text_vector)
+            return self._rank_from_feature_store(job, limit, min_score, skill_prefilter, job_profile, rows, location)
+        
+        if skill_prefilter:
+            candidate_ids, skills_scores = self.skill_prefilter_candidates(job_profile)
+            return self.rank_scan(job, job_profile, limit, min_score, vectorized, batch_size, query, location,
+                                  candidate_ids, skills_scores)
+        return self.rank_scan(job, job_profile, limit, min_score, vectorized, batch_size, query, location)
+    
+    def skill_prefilter_candidates(self, job_profile: JobProfile) -> Tuple[List, np.ndarray]:
+        """(candidate ids, skills_match scores) of the candidates sharing a skill with the job, from the skills index"""
+        if self.skills_index is None:
+            self.build_skills_index()
+        return self.skills_index.skills_match(job_profile.skill_set)
+    
+    def rank_scan(self, job: Dict, job_profile: JobProfile, limit: int, min_score: float, vectorized: bool,
+                  batch_size: int, query: Dict, location: str = None, candidate_ids: List = None,
+                  skills_scores: np.ndarray = None) -> List[Dict]:
+        """
+        Top-k streamed from the collection: every candidate matching query, or only candidate_ids
+        
+        Args:
+            candidate_ids: Only these candidates (see skill_prefilter_candidates), fetched with $in batches
+            skills_scores: Their skills_match scores, aligned with candidate_ids
+        """
+        batch_size = batch_size or self.STREAM_BATCH_SIZE
+        metro_id = None if location is None else self.locations.metro_id(location)
+        top = TopK(limit)
+        skills_by_id = None
+        
+        if candidate_ids is not None:
+            skills_by_id = dict(zip(candidate_ids, np.asarray(skills_scores).tolist()))
+            batches = self.iter_candidates_by_ids(candidate_ids, query, batch_size)
+        else:
+            batches = self.iter_candidates_with_data(query, batch_size)
+        
+        for candidates, candidatedatas in batches:
+            if metro_id is not None:
+                candidates, candidatedatas = self.candidates_in_metro(candidates, candidatedatas, metro_id)
+            matches = self.top_batch_matches(job, job_profile, candidates, candidatedatas, limit, min_score,
+                                             vectorized, skills_by_id, top.threshold)
+            with stage('selection'):
+                for score, candidate_id, match in matches:
+                    top.push(score, candidate_id, match)
+        
+        with stage('selection'):
+            return top.results()
+    
+    def candidates_in_metro(self, candidates: List[Dict], candidatedatas: List[Dict],
+                            metro_id: int) -> Tuple[List[Dict], List[Dict]]:
+        """The candidates (and aligned candidatedatas) whose city is in a metro"""
+        inside = self.locations.in_metro(self.locations.city_ids(candidate.get('city') for candidate in candidates),
+                                         metro_id)
+        return ([candidate for candidate, keep in zip(candidates, inside) if keep],
+                [candidatedata for candidatedata, keep in zip(candidatedatas, inside) if keep])
+    
+    def top_batch_matches(self, job: Dict, job_profile: JobProfile, candidates: List[Dict],
+                          candidatedatas: List[Dict], limit: int, min_score: float = 0.0, vectorized: bool = True,
+                          skills_by_id: Dict[str, float] = None,
+                          threshold: float = float('-inf')) -> List[Tuple[float, str, Dict]]:
+        """
+        Best matches within one batch of candidates, as (score, candidate id, match) for a TopK
+        
+        Only the batch's own top-k can reach the overall top-k, so the
+        vectorized path builds match dicts for those alone, and (with
+        TEXT_PRUNING) skips text similarity for candidates that cannot beat
+        threshold, the running top-k's k-th best score. skills_by_id supplies
+        precomputed skills_match scores (see skill_prefilter).
+        """
+        ids = [str(candidate['_id']) for candidate in candidates]
+        
+        if not vectorized:
+            matches = []
+            for candidate_id, candidate, candidatedata in zip(ids, candidates, candidatedatas):
+                match_result = self.calculate_match_score(job, candidate, candidatedata, job_profile)
+                if match_result['overall_score'] >= min_score:
+                    matches.append((match_result['overall_score'], candidate_id,
+                                    self._candidate_match(candidate, candidatedata, match_result['overall_score'],
+                                                          match_result['scores'])))
+            return matches
+        
+        with stage('features'):
+            records = [
+                self.build_candidate_record(candidate, candidatedata)
+                for candidate, candidatedata in zip(candidates, candidatedatas)
+            ]
+        precomputed = None
+        if skills_by_id is not None:
+            precomputed = {'skills_match': np.array([skills_by_id[record.candidate_id] for record in records])}
+        arrays = self.score_records(job, records, precomputed, job_profile, limit=limit if self.TEXT_PRUNING else None,
+                                    threshold=max(threshold, min_score))
+        overall = arrays['overall_score']
+        matches = []
+        with stage('selection'):
+            for i in top_k_indices(overall, limit, ids, min_score):
+                breakdown = {key: float(arrays[key][i]) for key in self.WEIGHTS}
+                matches.append((float(overall[i]), ids[i],
+                                self._candidate_match(candidates[i], candidatedatas[i], float(overall[i]), breakdown)))
+        return matches
+    
+    def _rank_from_feature_store(self, job: Dict, limit: int, min_score: float, skill_prefilter: bool,
+                                 job_profile: JobProfile = None, rows: np.ndarray = None,
+                                 location: str = None) -> List[Dict]:
+        """rank_candidates served from the feature store (or the given rows of it); only the top-k documents are fetched"""
+        top = self.top_feature_store_scores(job, limit, min_score, skill_prefilter, job_profile, rows, location)
+        return self._fetch_matches(top)
+    
+    def _fetch_matches(self, top: List[Tuple[object, float, Dict]]) -> List[Dict]:
+        """Match dicts for (candidate ObjectId, score, breakdown) results, fetching their documents in bulk"""
+        candidate_ids = [candidate_id for candidate_id, _, _ in top]
+        
+        with stage('fetch'):
+            found = list(self.candidates_collection.find({'_id': {'$in': candidate_ids}}, CANDIDATE_PROJECTION))
+        count_documents('candidates', found)
+        with stage('join'):
+            candidatedatas = self.fetch_candidatedatas(candidate_ids)
+        candidates = {candidate['_id']: candidate for candidate in found}
+        return self.feature_store_matches(top, candidates, candidatedatas)
+    
+    def top_feature_store_scores(self, job: Dict, limit: int, min_score: float = 0.0, skill_prefilter: bool = False,
+                                 job_profile: JobProfile = None, rows: np.ndarray = None,
+                                 location: str = None) -> List[Tuple[object, float, Dict]]:
+        """
+        Top-k (candidate ObjectId, score, breakdown) from the feature store, without touching the database
+        
+        Each segment (see CandidateFeatureStore.segments) is scored in turn.
+        rows (e.g. ANN candidates) select base segment rows; the delta is
+        always scored in full. Later segments prune text similarity against
+        the k-th best score found so far.
+        """
+        store = self.feature_store
+        job_profile = job_profile or self.compile_job_profile(job)
+        metro_id = None if location is None else self.locations.metro_id(location)
+        top = TopK(limit)
+        
+        for segment in store.segments():
+            matches = self.top_segment_scores(job, job_profile, segment, rows if segment is store else None, limit,
+                                              min_score, skill_prefilter, metro_id, top.threshold)
+            with stage('selection'):
+                for score, candidate_id, result in matches:
+                    top.push(score, candidate_id, result)
+        
+        with stage('selection'):
+            return top.results()
+    
+    def top_segment_scores(self, job: Dict, job_profile: JobProfile, segment: CandidateFeatureStore,
+                           rows: np.ndarray, limit: int, min_score: float = 0.0, skill_prefilter: bool = False,
+                           metro_id: int = None,
+                           threshold: float = float('-inf')) -> List[Tuple[float, str, Tuple[object, float, Dict]]]:
+        """
+        Top-k of one feature store segment (or the given rows of it) as (score, candidate id, result) for a TopK
+        
+        result is the (candidate ObjectId, score, breakdown) tuple top_feature_store_scores returns;
+        threshold is the k-th best score found so far elsewhere (for text pruning).
+        """
+        if metro_id is not None:
+            city_codes = np.asarray(segment.city_codes)
+            if rows is not None:
+                city_codes = city_codes[rows]
+            inside = self.locations.in_metro(city_codes, metro_id)
+            rows = np.flatnonzero(inside) if rows is None else np.asarray(rows)[inside]
+        arrays = self.score_feature_store(job, job_profile, rows, limit=limit if self.TEXT_PRUNING else None,
+                                          threshold=max(min_score, threshold), skill_prefilter=skill_prefilter,
+                                          segment=segment)
+        overall = arrays['overall_score']
+        
+        # Positions index the score arrays; they equal segment rows unless rows were given
+        with stage('selection'):
+            ids = segment.id_strings if rows is None else [segment.id_strings[row] for row in rows]
+            positions = top_k_indices(overall, limit, ids, min_score)
+            candidate_ids = segment.candidate_ids(positions if rows is None else [int(rows[i]) for i in positions])
+            matches = []
+            for position, candidate_id in zip(positions, candidate_ids):
+                score = float(overall[position])
+                breakdown = {key: float(arrays[key][position]) for key in self.WEIGHTS}
+                matches.append((score, ids[position], (candidate_id, score, breakdown)))
+            return matches
+    
+    def feature_store_matches(self, top: List[Tuple[object, float, Dict]], candidates: Dict,
+                              candidatedatas: Dict) -> List[Dict]:
+        """Match dicts for top_feature_store_scores results, given their documents keyed by candidate id"""
+        matches = []
+        for candidate_id, score, breakdown in top:
+            if candidate_id not in candidates:
+                # Deleted since the store was refreshed
+                continue
+            matches.append(self._candidate_match(candidates[candidate_id], candidatedatas.get(candidate_id),
+                                                 score, breakdown))
+        return matches
+    
+    def score_table(self, job: Dict, query: Dict = None, location: str = None,
+                    plugins: Iterable[SubScorePlugin] = ()) -> SubScoreTable:
+        """
+        Every built-in sub-score of a job against its whole candidate set, computed once
+        
+        The table comes from the feature store when it is current (otherwise
+        from one scan) and is cached per job revision, filter and feature
+        store revision; tables from scans expire after SCORE_TABLE_TTL.
+        Re-weighting, A/B comparison and plugin sub-scores then reuse its
+        arrays instead of re-extracting features.
+        
+        Args:
+            job: Job document
+            query: Candidate filter (defaults to CANDIDATE_QUERY)
+            location: Only candidates in this metro (a metro key or location text)
+            plugins: Plugin sub-scores to add to the table if it lacks them
+        """
+        query = self.CANDIDATE_QUERY if query is None else query
+        key = (
+            str(job.get('_id')),
+            job_revision(job),
+            json_util.dumps({'query': query, 'location': location}, sort_keys=True),
+            self._ranking_source(query),
+            self.text_model.fingerprint if self.text_model is not None else None,
+            self.locations.fingerprint
+        )
+        table = self.score_tables.get(key)
+        job_profile = None
+        if table is None:
+            job_profile = self.compile_job_profile(job)
+            table = self._build_score_table(job, job_profile, query, location)
+            self.score_tables.put(key, table)
+        
+        missing = [plugin for plugin in plugins if plugin.name not in table]
+        if missing:
+            self._add_plugin_scores(table, job_profile or self.compile_job_profile(job), missing, query)
+        return table
+    
+    def _build_score_table(self, job: Dict, job_profile: JobProfile, query: Dict, location: str) -> SubScoreTable:
+        # Weighting every built-in makes the scoring paths compute all of them
+        weights = dict.fromkeys(CORE_SUB_SCORES + OPTIONAL_SUB_SCORES, 0.0)
+        metro_id = None if location is None else self.locations.metro_id(location)
+        
+        parts, id_strings = [], []
+        if self.feature_store_is_current(query):
+            for segment in self.feature_store.segments():
+                # The same rows as a ranking scores, so the values match it exactly
+                rows = None
+                if metro_id is not None:
+                    rows = np.flatnonzero(self.locations.in_metro(np.asarray(segment.city_codes), metro_id))
+                scores = self.score_feature_store(job, job_profile, rows, weights, segment=segment)
+                if segment.dead is not None:
+                    live = np.flatnonzero(~(segment.dead if rows is None else segment.dead[rows]))
+                    scores = {key: scores[key][live] for key in weights}
+                    rows = live if rows is None else rows[live]
+                parts.append(scores)
+                id_strings.extend(segment.id_strings if rows is None else [segment.id_strings[row] for row in rows])
+        else:
+            for candidates, candidatedatas in self.iter_candidates_with_data(query):
+                if metro_id is not None:
+                    candidates, candidatedatas = self.candidates_in_metro(candidates, candidatedatas, metro_id)
+                with stage('features'):
+                    records = [
+                        self.build_candidate_record(candidate, candidatedata)
+                        for candidate, candidatedata in zip(candidates, candidatedatas)
+                    ]
+                parts.append(self.score_records(job, records, job_profile=job_profile, weights=weights))
+                id_strings.extend(str(record.candidate_id) for record in records)
+        scores = {key: np.concatenate([part[key] for part in parts]) if parts else np.zeros(0) for key in weights}
+        
+        return SubScoreTable(job.get('_id'), id_strings, {key: scores[key] for key in weights})
+    
+    def _add_plugin_scores(self, table: SubScoreTable, job_profile: JobProfile, plugins: List[SubScorePlugin],
+                           query: Dict):
+        """Compute plugin sub-scores for a table from one projected scan of the fields they read"""
+        projection = {field: 1 for plugin in plugins for field in plugin.fields}
+        rows = {candidate_id: row for row, candidate_id in enumerate(table.id_strings)}
+        documents = [{}] * len(table)
+        with stage('fetch'):
+            for candidate in self.candidates_collection.find(query, projection):
+                row = rows.get(str(candidate['_id']))
+                if row is not None:
+                    documents[row] = candidate
+        count_documents('candidates', [document for document in documents if document])
+        for plugin in plugins:
+            with stage(plugin.name):
+                table.add(plugin.name, plugin.score(self, job_profile, documents))
+    
+    @collects_stats
+    def rank_with_config(self, job: Dict, config, limit: int = 10, min_score: float = 0.0, query: Dict = None,
+                         location: str = None) -> List[Dict]:
+        """
+        rank_candidates under another ScoringConfig (or weights dict), from the job's score table
+        
+        Only the first call for a job scores its candidates; any weighting
+        after that is a linear combination of the cached sub-score arrays.
+        With the matcher's own weights the ranking equals rank_candidates.
+        """
+        plugins = config.plugins.values() if isinstance(config, ScoringConfig) else ()
+        table = self.score_table(job, query, location, plugins)
+        return self._fetch_matches(table.top(config, limit, min_score))
+    
+    def compare_configs(self, job: Dict, config_a, config_b, limit: int = 10, min_score: float = 0.0,
+                        query: Dict = None, location: str = None) -> Dict:
+        """A/B comparison of two ScoringConfigs (or weights dicts) on one job (see SubScoreTable.compare)"""
+        plugins = [config.plugins.values() for config in (config_a, config_b) if isinstance(config, ScoringConfig)]
+        table = self.score_table(job, query, location, [plugin for group in plugins for plugin in group])
+        return table.compare(config_a, config_b, limit, min_score)
+    
+    @collects_stats
+    def find_matching_candidates(self, job_id: str, limit: int = 10, min_score: float = 0.0,
+                                 vectorized: bool = True, batch_size: int = None,
+                                 skill_prefilter: bool = False, processes: int = None,
+                                 approximate: bool = False, location: str = None) -> List[Dict]:
         """
         Find and rank candidates for a specific job
         
+        Candidates are streamed from the cursor and only the best `limit`
+        matches are retained, so memory stays O(limit + batch_size). Equal
+        scores are ordered by candidate id. When a current feature store is
+        loaded, scoring runs on it and only the top documents are fetched.
+        
         Args:
             job_id: MongoDB ObjectId string or ObjectId of the job
             limit: Maximum number of candidates to return
             min_score: Minimum match score threshold
+            vectorized: Score candidates in batches with score_candidates instead of pair by pair
+            batch_size: Cursor/scoring batch size (defaults to STREAM_BATCH_SIZE)
+            skill_prefilter: Only score candidates sharing a skill with the job (uses the skills index)
+            processes: Score ObjectId-range shards in this many worker processes (see ShardedScorer)
+            approximate: Only fully score the candidates the ANN index returns (see build_ann_index)
+            location: Only candidates in this metro (a metro key or location text, see LocationTable)
         
         Returns:
             List of candidate matches with scores, sorted by match score
@@ -249,42 +1494,75 @@ class JobCandidateMatcher:
         if isinstance(job_id, str):
             job_id = ObjectId(job_id)
         
-        job = self.jobs_collection.find_one({'_id': job_id})
+        with stage('fetch'):
+            job = self.jobs_collection.find_one({'_id': job_id})
         if not job:
             return []
+        count_documents('jobs', [job])
         
-        # Get all candidates (you might want to add filters here)
-        candidates = list(self.candidates_collection.find({
-            'is_job_seeking': True,  # Only active job seekers
-            'approval_status': {'$ne': 'rejected'}  # Exclude rejected candidates
-        }))
-        
-        matches = []
+        if processes and processes > 1:
+            # Sharded rankings equal the vectorized ones, so they share those cache entries
+            cache_key = None
+            if self.result_cache is not None:
+                cache_key = self.result_cache_key(job, limit, min_score, None, skill_prefilter, approximate,
+                                                  location)
+            return self._cached_ranking(cache_key, lambda: self.sharded_scorer(processes).rank_candidates(
+                job, limit, min_score, batch_size, skill_prefilter=skill_prefilter, location=location,
+                approximate=approximate))
+        return self.rank_candidates(job, limit, min_score, vectorized, batch_size, skill_prefilter=skill_prefilter,
+                                    approximate=approximate, location=location)
+    
+    def iter_job_matches(self, candidate: Dict, candidatedata: Dict = None, min_score: float = 0.0,
+                         batch_size: int = None, query: Dict = None) -> Iterator[Dict]:
+        """
+        Stream scored job matches for a candidate in cursor order
         
-        for candidate in candidates:
-            # Try to get detailed candidate data
-            candidatedata = self.candidatedatas_collection.find_one({
-                'candidate': candidate['_id']
-            })
-            
-            # Calculate match score
-            match_result = self.calculate_match_score(job, candidate, candidatedata)
-            
-            if match_result['overall_score'] >= min_score:
-                matches.append({
-                    'candidate_id': str(candidate['_id']),
-                    'candidate': candidate,
-                    'candidatedata': candidatedata,
-                    'match_score': match_result['overall_score'],
-                    'score_breakdown': match_result['scores']
-                })
+        Args:
+            candidate: Candidate document
+            candidatedata: Candidate's candidatedata document, if any
+            min_score: Minimum match score threshold
+            batch_size: Cursor batch size (defaults to STREAM_BATCH_SIZE)
+            query: Job filter (defaults to every job)
         
-        # Sort by match score (descending)
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
+        Yields:
+            Job match dicts (unsorted)
+        """
+        batch_size = batch_size or self.STREAM_BATCH_SIZE
+        cursor = self.jobs_collection.find(query or {}).batch_size(batch_size)
         
-        return matches[:limit]
+        while True:
+            with stage('fetch'):
+                jobs = list(islice(cursor, batch_size))
+            if not jobs:
+                return
+            count_documents('jobs', jobs)
+            
+            for job in jobs:
+                # Calculate match score
+                match = self._job_match(job, candidate, candidatedata)
+                
+                if match['match_score'] >= min_score:
+                    yield match
+    
+    def score_jobs(self, jobs: List[Dict], candidate: Dict, candidatedata: Dict = None,
+                   min_score: float = 0.0) -> List[Dict]:
+        """Job matches for a batch of job documents at or above min_score (unsorted)"""
+        matches = [self._job_match(job, candidate, candidatedata) for job in jobs]
+        return [match for match in matches if match['match_score'] >= min_score]
+    
+    def _job_match(self, job: Dict, candidate: Dict, candidatedata: Dict = None) -> Dict:
+        """Result entry returned by search_jobs_for_candidate"""
+        match_result = self.calculate_match_score(job, candidate, candidatedata)
+        return {
+            'job_id': str(job['_id']),
+            'job': job,
+            'match_score': match_result['overall_score'],
+            'score_breakdown': match_result['scores']
+        }
     
-    def search_jobs_for_candidate(self, candidate_id: str, limit: int = 10, min_score: float = 0.0) -> List[Dict]:
+    @collects_stats
+    def search_jobs_for_candidate(self, candidate_id: str, limit: int = 10, min_score: float = 0.0,
+                                  batch_size: int = None, processes: int = None) -> List[Dict]:
         """
         Find and rank jobs for a specific candidate
         
@@ -292,6 +1570,8 @@ class JobCandidateMatcher:
             candidate_id: MongoDB ObjectId string or ObjectId of the candidate
             limit: Maximum number of jobs to return
             min_score: Minimum match score threshold
+            batch_size: Cursor batch size (defaults to STREAM_BATCH_SIZE)
+            processes: Score ObjectId-range shards of jobs in this many worker processes
         
         Returns:
             List of job matches with scores, sorted by match score
@@ -302,38 +1582,47 @@ class JobCandidateMatcher:
         if isinstance(candidate_id, str):
             candidate_id = ObjectId(candidate_id)
         
-        candidate = self.candidates_collection.find_one({'_id': candidate_id})
+        with stage('fetch'):
+            candidate = self.candidates_collection.find_one({'_id': candidate_id})
         if not candidate:
             return []
+        count_documents('candidates', [candidate])
         
         # Get detailed candidate data
-        candidatedata = self.candidatedatas_collection.find_one({
-            'candidate': candidate_id
-        })
+        with stage('join'):
+            candidatedata = self.candidatedatas_collection.find_one({
+                'candidate': candidate_id
+            })
+        if candidatedata:
+            count_documents('candidatedatas', [candidatedata])
         
-        # Get all jobs
-        jobs = list(self.jobs_collection.find({}))
+        if processes and processes > 1:
+            return self.sharded_scorer(processes).search_jobs(candidate, candidatedata, limit, min_score, batch_size)
         
-        matches = []
+        # Bounded heap selection; ties broken by job id
+        top = TopK(limit)
+        for match in self.iter_job_matches(candidate, candidatedata, min_score, batch_size):
+            with stage('selection'):
+                top.push(match['match_score'], match['job_id'], match)
         
-        for job in jobs:
-            # Calculate match score
-            match_result = self.calculate_match_score(job, candidate, candidatedata)
-            
-            if match_result['overall_score'] >= min_score:
-                matches.append({
-                    'job_id': str(job['_id']),
-                    'job': job,
-                    'match_score': match_result['overall_score'],
-                    'score_breakdown': match_result['scores']
-                })
-        
-        # Sort by match score (descending)
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
+        return top.results()
+    
+    def sharded_scorer(self, processes: int = None) -> ShardedScorer:
+        """
+        Process-pool scorer for this matcher, kept alive across calls
         
-        return matches[:limit]
+        Workers are forked on first use and see the matcher as it was then;
+        call close() (or build a new scorer) after rebuilding indexes.
+        """
+        if self._sharded_scorer is None or (processes and self._sharded_scorer.processes != processes):
+            if self._sharded_scorer is not None:
+                self._sharded_scorer.close()
+            self._sharded_scorer = ShardedScorer(self, processes)
+        return self._sharded_scorer
     
     def close(self):
-        """Close database connection"""
-        self.client.close()
+        """Shut down any worker pool; the shared client stays open for other users (see mongo_clients)"""
+        if self._sharded_scorer is not None:
+            self._sharded_scorer.close()
+            self._sharded_scorer = None
 
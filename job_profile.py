@@ -0,0 +1,72 @@
+import re
+from typing import Dict, FrozenSet, List, Optional
+
+# "3 years", "3-5 years", "3 to 5 yrs", "7+ yrs", "10 or more years"
+YEARS_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*'
+    r'(?:(?:-|–|—|to)\s*(\d+(?:\.\d+)?)\s*)?'
+    r'(?:\+|or more)?\s*'
+    r'(?:years?|yrs?)\b',
+    re.IGNORECASE
+)
+
+# Requirements are clamped up to this (so "0-2 years" asks for 1, like 'entry level')
+MIN_REQUIRED_YEARS = 1.0
+
+# Larger figures are not experience requirements ("founded 50 years ago")
+MAX_REQUIRED_YEARS = 20.0
+
+
+def parse_years_requirement(text: str) -> Optional[float]:
+    """
+    Years of experience stated in a job description, or None if none is stated
+
+    A range counts as its lower bound; with several mentions the largest wins.
+    """
+    if not text:
+        return None
+
+    required = None
+    for match in YEARS_PATTERN.finditer(str(text)):
+        years = float(match.group(1))
+        if years > MAX_REQUIRED_YEARS:
+            continue
+        required = years if required is None else max(required, years)
+
+    if required is None:
+        return None
+    return max(MIN_REQUIRED_YEARS, required)
+
+
+class JobProfile:
+    """
+    Job-side scoring inputs, compiled once per job
+
+    Built by JobCandidateMatcher.compile_job_profile; scoring a candidate
+    against it only touches the candidate's side.
+    """
+
+    __slots__ = ('job_id', 'title', 'title_norm', 'title_tokens', 'skills', 'skill_set',
+                 'required_years', 'text', 'text_vector', 'city_id')
+
+    def __init__(self, job_id, title: str, title_norm: str, skills: List[str], required_years: float,
+                 text: str, text_vector=None, city_id: int = 0):
+        self.job_id = job_id
+        self.title = title
+        self.title_norm = title_norm
+        self.title_tokens: FrozenSet[str] = frozenset(title_norm.split())
+        self.skills = skills
+        self.skill_set: FrozenSet[str] = frozenset(skills)
+        self.required_years = required_years
+        self.text = text
+        # TF-IDF vector of text (None without a corpus text model)
+        self.text_vector = text_vector
+        # LocationTable city id of the job's location (0 if unknown)
+        self.city_id = city_id
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form, mainly for debugging"""
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != 'text_vector'}
+
+    def __repr__(self):
+        return f"JobProfile({self.job_id!r}, title={self.title!r}, required_years={self.required_years!r})"
@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, List, Tuple
+
+from text_cache import TTLCache
+
+# Company fields shown next to job listings
+COMPANY_PROJECTION = {'_id': 1, 'employer_name': 1, 'email': 1}
+
+_MISSING = object()
+
+# Shared resolvers by (client, database name); see company_resolver
+_resolvers: Dict[Tuple, 'CompanyResolver'] = {}
+
+
+class CompanyResolver:
+    """
+    Company documents by id for job listings, behind a TTL cache
+
+    resolve() answers a whole result set with one $in query for the ids not
+    cached yet, so a listing costs two round trips (jobs, then companies)
+    instead of one per job, and companies seen recently cost none. Ids with
+    no company document are cached as None too.
+
+    Returned documents are shared with the cache; do not modify them.
+    """
+
+    # Cached companies, and how long (seconds) before a cached entry is looked up again
+    CACHE_SIZE = 10000
+    CACHE_TTL = 600.0
+
+    def __init__(self, companies_collection, ttl: float = None, maxsize: int = None,
+                 projection: Dict = COMPANY_PROJECTION):
+        """
+        Args:
+            companies_collection: The companies collection
+            ttl: Seconds a cached company is trusted (defaults to CACHE_TTL)
+            maxsize: Maximum cached companies (defaults to CACHE_SIZE)
+            projection: Company fields to fetch
+        """
+        self.companies_collection = companies_collection
+        self.projection = projection
+        self.cache = TTLCache(maxsize or self.CACHE_SIZE, self.CACHE_TTL if ttl is None else ttl)
+
+    def resolve(self, company_ids: Iterable) -> Dict:
+        """
+        Company documents for many ids
+
+        Returns:
+            Dict of company id -> company document, or None if there is no such company
+        """
+        companies = {}
+        missing = []
+        for company_id in company_ids:
+            if not company_id or company_id in companies:
+                continue
+            company = self.cache.get(company_id, _MISSING)
+            if company is _MISSING:
+                companies[company_id] = None
+                missing.append(company_id)
+            else:
+                companies[company_id] = company
+
+        if missing:
+            for company in self.companies_collection.find({'_id': {'$in': missing}}, self.projection):
+                companies[company['_id']] = company
+            for company_id in missing:
+                self.cache.put(company_id, companies[company_id])
+        return companies
+
+    def for_jobs(self, jobs: Iterable[Dict]) -> Dict:
+        """Companies of a list of job documents, keyed by company id (see resolve)"""
+        return self.resolve(job.get('company') for job in jobs)
+
+    def employer_name(self, company_id, default: str = None) -> str:
+        """Employer name of one company, or default if it is unknown"""
+        company = self.resolve([company_id]).get(company_id)
+        if company is None:
+            return default
+        return company.get('employer_name', default)
+
+
+def company_resolver(db) -> CompanyResolver:
+    """CompanyResolver for a database, shared so that separate listings reuse one cache"""
+    key = (id(db.client), db.name)
+    resolver = _resolvers.get(key)
+    if resolver is None:
+        resolver = _resolvers[key] = CompanyResolver(db['companies'])
+    return resolver
+
+
+def find_jobs_with_companies(db, query: Dict, projection: Dict = None, limit: int = 0) -> Tuple[List[Dict], Dict]:
+    """
+    Jobs matching query together with their companies, in two round trips
+
+    Returns:
+        (jobs, companies) where companies maps company id -> document or None
+    """
+    jobs = list(db['jobs'].find(query, projection).limit(limit))
+    return jobs, company_resolver(db).for_jobs(jobs)
@@ -0,0 +1,584 @@
+import math
+import os
+import pickle
+import re
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from job_queries import company_resolver
+from locations import LOCATIONS, LocationTable
+from text_cache import LRUCache, normalize_text
+
+# Job fields read when indexing
+JOB_SEARCH_PROJECTION = {'_id': 1, 'title': 1, 'description': 1, 'skills': 1, 'location': 1, 'company': 1}
+
+# Default location of the persisted index (see JobSearch.load_or_build)
+JOB_SEARCH_PATH = 'job_search.pkl'
+
+# Query tokens: parentheses, optionally negated/fielded quoted phrases, bare words
+QUERY_TOKEN_PATTERN = re.compile(r'\(|\)|-?(?:\w+:)?"[^"]*"?|-?[^\s()"]+')
+
+
+# Memo for the default normalization (strings up to this length), as in JobCandidateMatcher.normalize_text
+NORMALIZE_CACHE_SIZE = 50000
+NORMALIZE_CACHE_MAX_TEXT_LENGTH = 512
+_normalize_cache = LRUCache(NORMALIZE_CACHE_SIZE)
+
+
+def cached_normalize_text(text) -> str:
+    """text_cache.normalize_text (the matcher's normalization), memoized for short strings"""
+    if isinstance(text, str) and len(text) <= NORMALIZE_CACHE_MAX_TEXT_LENGTH:
+        return _normalize_cache.get_or_compute(text, lambda: normalize_text(text))
+    return normalize_text(text)
+
+
+class JobSearch:
+    """
+    In-memory inverted index over jobs for boolean, phrase and fielded search
+
+    Title, description, skills, location and the company's employer name are
+    tokenized with the matcher's normalization (text_cache.normalize_text) into
+    positional postings, so a query is answered from the index alone; only
+    the returned jobs are fetched. Query syntax:
+
+        data analyst            both words (AND is implicit)
+        sql OR python           either word
+        NOT senior, -senior     exclude
+        "data quality"          phrase: consecutive words within one field
+        title:engineer          restrict a word or phrase to a field
+        alloc*                  prefix
+        (a OR b) c              grouping
+
+    Fields are title, description, skills, location and company. Words match
+    whole tokens, so use a prefix where a substring regex was used before.
+    Results are ranked by a field-weighted TF-IDF sum over the words and
+    phrases that matched, ties broken by job id. Each job's location is also
+    resolved to a LocationTable city id, so the location filter is a metro
+    comparison rather than a text match.
+
+    Building reads every job once; one-shot scripts use load_or_build() to
+    reuse an index saved by an earlier run while the jobs collection has
+    not grown and the file is younger than MAX_AGE. Long-running processes
+    keep the index current with update() and remove() (see
+    change_watcher.ChangeStreamWatcher); removed rows are reused by later
+    additions.
+    """
+
+    FIELDS = ('title', 'skills', 'company', 'location', 'description')
+
+    # Contribution of a match in each field to the ranking score
+    FIELD_WEIGHTS = {'title': 3.0, 'skills': 2.0, 'company': 2.0, 'location': 1.0, 'description': 1.0}
+
+    # Alternative field names accepted in queries
+    FIELD_ALIASES = {'desc': 'description', 'skill': 'skills', 'employer': 'company', 'city': 'location'}
+
+    BATCH_SIZE = 2000
+
+    # Seconds a saved index is reused for (edits to existing jobs show up after this)
+    MAX_AGE = 3600.0
+
+    FORMAT_VERSION = 2
+
+    # Parsed form of a non-empty query with no words to match
+    MATCH_NOTHING = ('or', [])
+
+    def __init__(self, db, normalize: Callable[[str], str] = None, locations: LocationTable = None):
+        """
+        Args:
+            db: Database holding the jobs and companies collections
+            normalize: Text normalization (defaults to cached_normalize_text; pass matcher.normalize_text to
+                share the matcher's cache)
+            locations: Location table for city ids (defaults to LOCATIONS)
+        """
+        self._bind(db, normalize, locations)
+        self.built = time.time()
+        self.job_ids: List[ObjectId] = []
+        self.company_ids: List = []
+        self.city_ids: List[int] = []
+        # job _id -> row, and the distinct tokens each row indexed per field (to undo its postings)
+        self._row_of: Dict[ObjectId, int] = {}
+        self._row_tokens: List[Dict[str, Set[str]]] = []
+        # Rows of removed jobs, reused by add()
+        self._free_rows: List[int] = []
+        # field -> token -> row -> token positions
+        self.postings: Dict[str, Dict[str, Dict[int, List[int]]]] = {field: {} for field in self.FIELDS}
+        # token -> rows containing it in any field (for IDF)
+        self.document_frequency: Dict[str, int] = {}
+        self._vocabulary: List[str] = None
+        self._city_codes: np.ndarray = None
+
+    def _bind(self, db, normalize: Callable[[str], str] = None, locations: LocationTable = None):
+        self.db = db
+        self.jobs_collection = db['jobs']
+        self.normalize = normalize or cached_normalize_text
+        self.locations = locations or LOCATIONS
+
+    def __len__(self):
+        return len(self.job_ids) - len(self._free_rows)
+
+    def _all_rows(self) -> Set[int]:
+        """Every row holding a job"""
+        return set(range(len(self.job_ids))).difference(self._free_rows)
+
+    @classmethod
+    def build(cls, db, query: Dict = None, batch_size: int = None, normalize: Callable[[str], str] = None,
+              locations: LocationTable = None) -> 'JobSearch':
+        """
+        Index every job matching query (defaults to all jobs) in one scan
+
+        Company names are resolved per cursor batch with one $in query.
+
+        Args:
+            db: Database holding the jobs and companies collections (e.g. matcher.db)
+            query: Job filter
+            batch_size: Cursor batch size (defaults to BATCH_SIZE)
+            normalize: Text normalization (see __init__)
+            locations: Location table (see __init__)
+        """
+        index = cls(db, normalize, locations)
+        resolver = company_resolver(db)
+        batch_size = batch_size or cls.BATCH_SIZE
+        batch = []
+        for job in index.jobs_collection.find(query or {}, JOB_SEARCH_PROJECTION).batch_size(batch_size):
+            batch.append(job)
+            if len(batch) >= batch_size:
+                index._add_batch(batch, resolver)
+                batch = []
+        if batch:
+            index._add_batch(batch, resolver)
+        return index
+
+    # Persistence
+
+    @staticmethod
+    def _collection_state(db) -> Tuple[int, Optional[ObjectId]]:
+        """(job count, newest job id): cheap to read, and changed by any insert or delete"""
+        jobs = db['jobs']
+        newest = jobs.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+        return jobs.count_documents({}), newest['_id'] if newest else None
+
+    def save(self, path: str = JOB_SEARCH_PATH):
+        """Pickle the index (without its database handle) to path, replacing any previous file atomically"""
+        state = {name: value for name, value in self.__dict__.items()
+                 if name not in ('db', 'jobs_collection', 'normalize', 'locations')}
+        meta = {
+            'format_version': self.FORMAT_VERSION,
+            'collection_state': self._collection_state(self.db),
+            'location_fingerprint': self.locations.fingerprint
+        }
+        staging = path + '.tmp'
+        with open(staging, 'wb') as f:
+            pickle.dump((meta, state), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(staging, path)
+
+    @classmethod
+    def load(cls, db, path: str = JOB_SEARCH_PATH, normalize: Callable[[str], str] = None,
+             locations: LocationTable = None, max_age: float = None) -> Optional['JobSearch']:
+        """
+        A saved index, or None when it is missing, unreadable or stale
+
+        Stale means older than max_age (defaults to MAX_AGE), built with another
+        location table, or a jobs collection whose count or newest id changed.
+        """
+        locations = locations or LOCATIONS
+        try:
+            with open(path, 'rb') as f:
+                meta, state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        max_age = cls.MAX_AGE if max_age is None else max_age
+        if (meta.get('format_version') != cls.FORMAT_VERSION
+                or meta.get('location_fingerprint') != locations.fingerprint
+                or time.time() - state['built'] > max_age
+                or tuple(meta['collection_state']) != cls._collection_state(db)):
+            return None
+
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        index._bind(db, normalize, locations)
+        return index
+
+    @classmethod
+    def load_or_build(cls, db, path: str = JOB_SEARCH_PATH, normalize: Callable[[str], str] = None,
+                      locations: LocationTable = None, max_age: float = None) -> 'JobSearch':
+        """The saved index at path if still current (see load), otherwise a fresh build that is then saved"""
+        index = cls.load(db, path, normalize, locations, max_age)
+        if index is None:
+            index = cls.build(db, normalize=normalize, locations=locations)
+            index.save(path)
+        return index
+
+    def _add_batch(self, jobs: List[Dict], resolver):
+        companies = resolver.for_jobs(jobs)
+        for job in jobs:
+            company = companies.get(job.get('company'))
+            self.add(job, company.get('employer_name', '') if company else '')
+
+    def add(self, job: Dict, company_name: str = ''):
+        """Index one job document (with its company's employer name), replacing any earlier version of it"""
+        self.remove(job['_id'])
+        values = (job['_id'], job.get('company'), self.locations.city_id(job.get('location')))
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self.job_ids[row], self.company_ids[row], self.city_ids[row] = values
+            self._row_tokens[row] = {}
+        else:
+            row = len(self.job_ids)
+            for column, value in zip((self.job_ids, self.company_ids, self.city_ids), values):
+                column.append(value)
+            self._row_tokens.append({})
+        self._row_of[job['_id']] = row
+        texts = {
+            'title': job.get('title', ''),
+            'skills': job.get('skills', ''),
+            'company': company_name,
+            'location': job.get('location', ''),
+            'description': job.get('description', '')
+        }
+        seen = set()
+        for field, text in texts.items():
+            postings = self.postings[field]
+            tokens = self._tokens(text)
+            for position, token in enumerate(tokens):
+                postings.setdefault(token, {}).setdefault(row, []).append(position)
+            if tokens:
+                self._row_tokens[row][field] = set(tokens)
+                seen.update(tokens)
+        for token in seen:
+            self.document_frequency[token] = self.document_frequency.get(token, 0) + 1
+        self._vocabulary = None
+        self._city_codes = None
+
+    def update(self, job: Dict):
+        """Re-index one job document (JOB_SEARCH_PROJECTION fields), resolving its company's employer name"""
+        company = company_resolver(self.db).for_jobs([job]).get(job.get('company'))
+        self.add(job, company.get('employer_name', '') if company else '')
+
+    def remove(self, job_id) -> bool:
+        """Drop a job from the index; returns False if it was not indexed"""
+        row = self._row_of.pop(job_id, None)
+        if row is None:
+            return False
+        seen = set()
+        for field, tokens in self._row_tokens[row].items():
+            postings = self.postings[field]
+            for token in tokens:
+                rows = postings[token]
+                del rows[row]
+                if not rows:
+                    del postings[token]
+            seen.update(tokens)
+        for token in seen:
+            self.document_frequency[token] -= 1
+            if not self.document_frequency[token]:
+                del self.document_frequency[token]
+        self.job_ids[row] = self.company_ids[row] = None
+        self.city_ids[row] = self.locations.UNKNOWN
+        self._row_tokens[row] = {}
+        self._free_rows.append(row)
+        self._vocabulary = None
+        self._city_codes = None
+        return True
+
+    def _tokens(self, text) -> List[str]:
+        if not text:
+            return []
+        return self.normalize(text).split()
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Sorted indexed tokens (for prefix queries)"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.document_frequency)
+        return self._vocabulary
+
+    def search(self, query: str, limit: Optional[int] = 20, company=None, location: str = None) -> List[Dict]:
+        """
+        Jobs matching a query, best first
+
+        Args:
+            query: Query string (see class docstring); empty matches every job
+            limit: Maximum results (None for all)
+            company: Only jobs of this company: an ObjectId, a list of them, or an employer name phrase
+            location: Only jobs in this metro: a metro key ('los_angeles') or any location text ('LA, CA')
+
+        Returns:
+            Dicts with 'job_id', 'job', 'company' (document or None) and 'score'
+        """
+        ranked = self.rank(query, company, location)
+        if limit is not None:
+            ranked = ranked[:limit]
+        rows = [row for row, _ in ranked]
+
+        # Documents for the returned rows only: one $in for jobs, one (cached) for companies
+        wanted = [self.job_ids[row] for row in rows]
+        jobs = {job['_id']: job for job in self.jobs_collection.find({'_id': {'$in': wanted}})}
+        companies = company_resolver(self.db).resolve(self.company_ids[row] for row in rows)
+
+        results = []
+        for row, score in ranked:
+            job = jobs.get(self.job_ids[row])
+            if job is None:
+                # Deleted since the index was built
+                continue
+            results.append({
+                'job_id': str(job['_id']),
+                'job': job,
+                'company': companies.get(self.company_ids[row]),
+                'score': score
+            })
+        return results
+
+    def find_jobs(self, query: str, limit: Optional[int] = None, company=None, location: str = None) -> List[Dict]:
+        """Job documents matching a query, best first (see search)"""
+        return [hit['job'] for hit in self.search(query, limit, company, location)]
+
+    def count(self, query: str, company=None, location: str = None) -> int:
+        """Number of jobs matching a query, from the index alone"""
+        return len(self._filter(self.match(self.parse(query)), company, location))
+
+    def rank(self, query: str, company=None, location: str = None) -> List[Tuple[int, float]]:
+        """(row, score) of every job matching a query, best first"""
+        tree = self.parse(query)
+        rows = self._filter(self.match(tree), company, location)
+        scores = dict.fromkeys(rows, 0.0)
+        for leaf in self._positive_leaves(tree):
+            for row, score in self._leaf_scores(leaf, rows).items():
+                scores[row] += score
+        return sorted(scores.items(), key=lambda item: (-item[1], str(self.job_ids[item[0]])))
+
+    def _filter(self, rows: Set[int], company, location: str = None) -> Set[int]:
+        """Restrict rows to company and location filters (see search)"""
+        if location is not None:
+            rows = rows & set(self.rows_in_metro(location).tolist())
+        if company is None:
+            return rows
+        if isinstance(company, str):
+            leaf = self._leaf('company', company)
+            return rows & self.match(leaf) if leaf else set()
+        company_ids = {company} if isinstance(company, ObjectId) else set(company)
+        return {row for row in rows if self.company_ids[row] in company_ids}
+
+    def rows_in_metro(self, location: str) -> np.ndarray:
+        """Rows of jobs located in a metro (a metro key or any location text)"""
+        locations = self.locations
+        if self._city_codes is None:
+            self._city_codes = np.array(self.city_ids, dtype=np.int32)
+        return np.flatnonzero(locations.in_metro(self._city_codes, locations.metro_id(location)))
+
+    # Query parsing
+
+    def parse(self, query: str):
+        """
+        Parse a query string into a tree of tuples
+
+        Nodes are ('term', field, token), ('prefix', field, stem),
+        ('phrase', field, tokens), ('and', children), ('or', children) and
+        ('not', child); field is None for all fields. An empty query parses
+        to None (every job); one without any words ('*', 'NOT', '((') to
+        MATCH_NOTHING.
+        """
+        tokens = QUERY_TOKEN_PATTERN.findall(query or '')
+        tree, _ = self._parse_or(tokens, 0)
+        # Unbalanced ')' and anything after it are ignored
+        if tree is None and tokens:
+            return self.MATCH_NOTHING
+        return tree
+
+    def _parse_or(self, tokens: List[str], position: int):
+        # Empty alternatives ('a OR', '() OR b') are dropped rather than matching everything
+        children = []
+        node, position = self._parse_and(tokens, position)
+        if node is not None:
+            children.append(node)
+        while position < len(tokens) and tokens[position] == 'OR':
+            node, position = self._parse_and(tokens, position + 1)
+            if node is not None:
+                children.append(node)
+        return self._group('or', children), position
+
+    def _parse_and(self, tokens: List[str], position: int):
+        children = []
+        while position < len(tokens) and tokens[position] not in ('OR', ')'):
+            if tokens[position] == 'AND':
+                position += 1
+                continue
+            node, position = self._parse_unary(tokens, position)
+            if node is not None:
+                children.append(node)
+        return self._group('and', children), position
+
+    @staticmethod
+    def _group(kind: str, children: List):
+        """('and' | 'or', children) node; None when there are no children"""
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else (kind, children)
+
+    def _parse_unary(self, tokens: List[str], position: int):
+        token = tokens[position]
+        if token == 'NOT':
+            if position + 1 >= len(tokens) or tokens[position + 1] in ('OR', ')'):
+                return None, position + 1
+            node, position = self._parse_unary(tokens, position + 1)
+            return (('not', node) if node is not None else None), position
+        if token == '(':
+            node, position = self._parse_or(tokens, position + 1)
+            if position < len(tokens) and tokens[position] == ')':
+                position += 1
+            return node, position
+        if token.startswith('-') and len(token) > 1:
+            node = self._parse_leaf(token[1:])
+            return (('not', node) if node is not None else None), position + 1
+        return self._parse_leaf(token), position + 1
+
+    def _parse_leaf(self, token: str):
+        field = None
+        name, separator, rest = token.partition(':')
+        name = self.FIELD_ALIASES.get(name.lower(), name.lower())
+        if separator and rest and name in self.FIELDS:
+            field, token = name, rest
+        return self._leaf(field, token)
+
+    def _leaf(self, field: Optional[str], text: str):
+        """Leaf node for a word, prefix or phrase (None if it has no tokens)"""
+        if text.endswith('*') and '"' not in text:
+            stems = self._tokens(text[:-1])
+            if len(stems) == 1:
+                return ('prefix', field, stems[0])
+        tokens = self._tokens(text.strip('"'))
+        if not tokens:
+            return None
+        if len(tokens) == 1:
+            return ('term', field, tokens[0])
+        return ('phrase', field, tuple(tokens))
+
+    # Matching
+
+    def _fields(self, field: Optional[str]) -> Iterable[str]:
+        return self.FIELDS if field is None else (field,)
+
+    def _prefix_tokens(self, stem: str) -> List[str]:
+        vocabulary = self.vocabulary
+        tokens = []
+        for i in range(bisect_left(vocabulary, stem), len(vocabulary)):
+            if not vocabulary[i].startswith(stem):
+                break
+            tokens.append(vocabulary[i])
+        return tokens
+
+    def _phrase_rows(self, field: str, tokens: Tuple[str, ...]) -> Dict[int, int]:
+        """Rows containing the phrase in field -> number of occurrences"""
+        postings = [self.postings[field].get(token) for token in tokens]
+        if not all(postings):
+            return {}
+        counts = {}
+        for row in set.intersection(*(set(posting) for posting in postings)):
+            starts = set(postings[0][row])
+            for offset, posting in enumerate(postings[1:], 1):
+                starts &= {position - offset for position in posting[row]}
+                if not starts:
+                    break
+            if starts:
+                counts[row] = len(starts)
+        return counts
+
+    def _leaf_matches(self, leaf) -> Dict[str, Dict[int, int]]:
+        """field -> row -> occurrences of a leaf"""
+        kind, field, value = leaf
+        matches = {}
+        for name in self._fields(field):
+            if kind == 'term':
+                rows = {row: len(positions) for row, positions in self.postings[name].get(value, {}).items()}
+            elif kind == 'prefix':
+                rows = {}
+                for token in self._prefix_tokens(value):
+                    for row, positions in self.postings[name].get(token, {}).items():
+                        rows[row] = rows.get(row, 0) + len(positions)
+            else:
+                rows = self._phrase_rows(name, value)
+            if rows:
+                matches[name] = rows
+        return matches
+
+    def match(self, node) -> Set[int]:
+        """Rows matching a parsed query tree (None matches every row)"""
+        if node is None:
+            return self._all_rows()
+        kind = node[0]
+        if kind == 'and':
+            positives = [child for child in node[1] if child[0] != 'not']
+            rows = self.match(positives[0]) if positives else self._all_rows()
+            for child in positives[1:]:
+                if not rows:
+                    break
+                rows &= self.match(child)
+            for child in node[1]:
+                if child[0] == 'not' and rows:
+                    rows -= self.match(child[1])
+            return rows
+        if kind == 'or':
+            rows = set()
+            for child in node[1]:
+                rows |= self.match(child)
+            return rows
+        if kind == 'not':
+            return self._all_rows() - self.match(node[1])
+        rows = set()
+        for field_rows in self._leaf_matches(node).values():
+            rows.update(field_rows)
+        return rows
+
+    # Ranking
+
+    def _positive_leaves(self, node) -> List:
+        """Leaves not under a NOT (the ones that contribute to the score)"""
+        if node is None:
+            return []
+        kind = node[0]
+        if kind == 'not':
+            return []
+        if kind in ('and', 'or'):
+            return [leaf for child in node[1] for leaf in self._positive_leaves(child)]
+        return [node]
+
+    def _idf(self, leaf) -> float:
+        n = len(self)
+        kind, _, value = leaf
+        if kind == 'term':
+            frequency = self.document_frequency.get(value, 0)
+        elif kind == 'prefix':
+            frequency = max((self.document_frequency[token] for token in self._prefix_tokens(value)), default=0)
+        else:
+            frequency = min(self.document_frequency.get(token, 0) for token in value)
+        return math.log(1.0 + n / (1.0 + frequency))
+
+    def _leaf_scores(self, leaf, rows: Set[int]) -> Dict[int, float]:
+        """Score contribution of one leaf for the given rows"""
+        idf = self._idf(leaf)
+        scores = {}
+        for field, field_rows in self._leaf_matches(leaf).items():
+            weight = self.FIELD_WEIGHTS[field] * idf
+            for row, occurrences in field_rows.items():
+                if row in rows:
+                    scores[row] = scores.get(row, 0.0) + weight * (1.0 + math.log(occurrences))
+        return scores
+
+
+if __name__ == "__main__":
+    import sys
+    from mongo_clients import get_database
+
+    # Usage: python job_search.py '<query>' [limit]
+    db, _ = get_database('db')
+    search = JobSearch.load_or_build(db)
+    print(f"Indexed {len(search)} jobs")
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for hit in search.search(sys.argv[1] if len(sys.argv) > 1 else '', limit):
+        job, company = hit['job'], hit['company']
+        employer = company.get('employer_name', 'N/A') if company else 'N/A'
+        print(f"{hit['score']:7.2f}  {job.get('title', 'N/A')} at {employer} ({job.get('location', 'N/A')})")
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from text_cache import LRUCache
+
+# Metro -> city -> extra aliases (the city name itself always matches).
+# Metro-wide names ('bay area') are cities of their metro too.
+METROS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    'remote': {
+        'remote': ('anywhere', 'work from home', 'wfh', 'distributed', 'fully remote', 'remote first')
+    },
+    'los_angeles': {
+        'los angeles': ('la', 'l a', 'lax', 'los angeles county', 'greater los angeles', 'socal',
+                        'southern california', 'downtown la', 'dtla'),
+        'santa monica': (),
+        'venice': ('venice beach',),
+        'culver city': (),
+        'pasadena': (),
+        'burbank': (),
+        'glendale': (),
+        'long beach': (),
+        'el segundo': (),
+        'playa vista': (),
+        'marina del rey': (),
+        'beverly hills': (),
+        'west hollywood': ('weho',),
+        'hollywood': (),
+        'torrance': (),
+        'irvine': (),
+        'orange county': ('oc',)
+    },
+    'sf_bay_area': {
+        'bay area': ('sf bay area', 'san francisco bay area', 'silicon valley', 'norcal', 'northern california'),
+        'san francisco': ('sf', 's f', 'sfo'),
+        'palo alto': (),
+        'mountain view': (),
+        'menlo park': (),
+        'redwood city': (),
+        'san mateo': (),
+        'san jose': ('sj',),
+        'sunnyvale': (),
+        'santa clara': (),
+        'cupertino': (),
+        'los altos': (),
+        'milpitas': (),
+        'fremont': (),
+        'oakland': (),
+        'berkeley': (),
+        'emeryville': (),
+        'south san francisco': ('south sf', 'ssf'),
+        'foster city': (),
+        'burlingame': ()
+    },
+    'new_york': {
+        'new york': ('nyc', 'new york city', 'manhattan', 'ny ny', 'new york ny'),
+        'brooklyn': (),
+        'queens': (),
+        'jersey city': (),
+        'hoboken': ()
+    },
+    'seattle': {
+        'seattle': (),
+        'bellevue': (),
+        'redmond': (),
+        'kirkland': ()
+    },
+    'boston': {
+        'boston': (),
+        'cambridge': ('cambridge ma',),
+        'somerville': (),
+        'waltham': ()
+    },
+    'austin': {
+        'austin': ('atx',)
+    },
+    'chicago': {
+        'chicago': ('chi',),
+        'evanston': ()
+    },
+    'denver': {
+        'denver': (),
+        'boulder': ()
+    },
+    'washington_dc': {
+        'washington dc': ('dc', 'd c', 'washington d c'),
+        'arlington': ('arlington va',),
+        'bethesda': ()
+    },
+    'san_diego': {
+        'san diego': ('sd',),
+        'la jolla': (),
+        'carlsbad': ()
+    }
+}
+
+# Location text is matched as lowercase alphanumeric tokens ("L.A., CA" -> ['l', 'a', 'ca'])
+LOCATION_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Aliases made only of tokens this short ('la', 'sd', 'l a') look like state codes
+SHORT_ALIAS_TOKEN_LENGTH = 2
+
+
+class LocationTable:
+    """
+    Canonical city and metro ids for free-text locations
+
+    Job locations and candidate cities are reduced to a small integer city
+    id (0 for unknown) once, via a precomputed alias table; metro_of_city
+    maps city ids to metro ids. Filtering by location and the location
+    sub-score are then integer comparisons and array lookups instead of
+    regex scans over the raw strings.
+
+    A location resolves to the longest alias found at the earliest token
+    position, so "La Jolla, CA" is San Diego, "Los Angeles, CA" and "LA"
+    are Los Angeles, and "Remote (US) or Palo Alto" is remote. Short aliases
+    ('la', 'sd', 'sf') only match the whole string or the whole part before
+    its first comma, so "New Orleans, LA" and "Sioux Falls, SD" stay unknown.
+    """
+
+    UNKNOWN = 0
+
+    # Metro whose jobs match candidates anywhere
+    REMOTE_METRO = 'remote'
+
+    # location_match scores
+    SAME_CITY_SCORE = 1.0
+    SAME_METRO_SCORE = 0.8
+    UNKNOWN_SCORE = 0.5
+
+    # Resolved location strings kept in memory
+    CACHE_SIZE = 50000
+
+    def __init__(self, metros: Dict[str, Dict[str, Tuple[str, ...]]] = None, cache_size: int = None):
+        """
+        Args:
+            metros: Metro -> city -> aliases table (defaults to METROS)
+            cache_size: Resolved strings to memoize (defaults to CACHE_SIZE)
+        """
+        metros = METROS if metros is None else metros
+        self.metros: List[str] = ['']
+        self.cities: List[str] = ['']
+        city_metros = [self.UNKNOWN]
+        self._aliases: Dict[Tuple[str, ...], int] = {}
+        self._short_aliases: Dict[Tuple[str, ...], int] = {}
+
+        for metro, cities in metros.items():
+            metro_id = len(self.metros)
+            self.metros.append(metro)
+            for city, aliases in cities.items():
+                city_id = len(self.cities)
+                self.cities.append(city)
+                city_metros.append(metro_id)
+                for alias in (city,) + tuple(aliases):
+                    alias = tuple(self.tokens(alias))
+                    short = all(len(token) <= SHORT_ALIAS_TOKEN_LENGTH for token in alias)
+                    (self._short_aliases if short else self._aliases).setdefault(alias, city_id)
+
+        self.metro_of_city = np.array(city_metros, dtype=np.int32)
+        self.metro_ids = {metro: i for i, metro in enumerate(self.metros) if metro}
+        self.remote_metro = self.metro_ids.get(self.REMOTE_METRO, -1)
+        self.max_alias_tokens = max((len(alias) for alias in self._aliases), default=0)
+        self.fingerprint = hashlib.sha1(json.dumps(
+            [self.cities, city_metros, sorted(map(list, self._aliases.items())),
+             sorted(map(list, self._short_aliases.items()))]
+        ).encode()).hexdigest()
+        self.cache = LRUCache(self.CACHE_SIZE if cache_size is None else cache_size)
+
+    @staticmethod
+    def tokens(text) -> List[str]:
+        return LOCATION_TOKEN_PATTERN.findall(str(text).lower()) if text else []
+
+    def city_id(self, text) -> int:
+        """City id of a location string (UNKNOWN if no alias matches)"""
+        if not text:
+            return self.UNKNOWN
+        if not isinstance(text, str):
+            text = str(text)
+        return self.cache.get_or_compute(text, lambda: self._resolve(text))
+
+    def _resolve(self, text: str) -> int:
+        tokens = self.tokens(text)
+        for part in (tokens, self.tokens(text.split(',', 1)[0])):
+            city_id = self._short_aliases.get(tuple(part))
+            if city_id is not None:
+                return city_id
+        for start in range(len(tokens)):
+            for length in range(min(self.max_alias_tokens, len(tokens) - start), 0, -1):
+                city_id = self._aliases.get(tuple(tokens[start:start + length]))
+                if city_id is not None:
+                    return city_id
+        return self.UNKNOWN
+
+    def city_ids(self, texts: Iterable) -> np.ndarray:
+        """int32 city ids of many location strings"""
+        return np.array([self.city_id(text) for text in texts], dtype=np.int32)
+
+    def metro_id(self, location) -> int:
+        """Metro id of a metro key ('sf_bay_area') or any location string"""
+        if location in self.metro_ids:
+            return self.metro_ids[location]
+        return int(self.metro_of_city[self.city_id(location)])
+
+    def city_name(self, city_id: int) -> str:
+        return self.cities[city_id]
+
+    def metro_name(self, metro_id: int) -> str:
+        return self.metros[metro_id]
+
+    def in_metro(self, city_ids: np.ndarray, metro_id: int) -> np.ndarray:
+        """Boolean mask of city ids inside a metro (never true for UNKNOWN)"""
+        return (self.metro_of_city[city_ids] == metro_id) & (metro_id != self.UNKNOWN)
+
+    def match_scores(self, job_city: int, candidate_cities: np.ndarray) -> np.ndarray:
+        """
+        location_match of one job against many candidate city ids
+
+        Same city scores SAME_CITY_SCORE, same metro SAME_METRO_SCORE and
+        anything else 0. Remote jobs match everyone fully; an unknown
+        location on either side scores UNKNOWN_SCORE.
+        """
+        candidate_cities = np.asarray(candidate_cities)
+        if job_city == self.UNKNOWN:
+            return np.full(len(candidate_cities), self.UNKNOWN_SCORE)
+        job_metro = self.metro_of_city[job_city]
+        if job_metro == self.remote_metro:
+            return np.full(len(candidate_cities), self.SAME_CITY_SCORE)
+
+        scores = np.where(candidate_cities == job_city, self.SAME_CITY_SCORE,
+                          np.where(self.metro_of_city[candidate_cities] == job_metro, self.SAME_METRO_SCORE, 0.0))
+        scores[candidate_cities == self.UNKNOWN] = self.UNKNOWN_SCORE
+        return scores
+
+    def match_score(self, job_city: int, candidate_city: int) -> float:
+        """match_scores for a single candidate"""
+        return float(self.match_scores(job_city, np.array([candidate_city], dtype=np.int32))[0])
+
+
+# Default table shared by matchers and indexes
+LOCATIONS = LocationTable()
@@ -1,7 +1,8 @@
 from job_candidate_matcher import JobCandidateMatcher
-from pymongo import MongoClient
 from config import MONGODB_URI
 from pprint import pprint
+from result_cache import RESULT_CACHE_PATH
+import time
 
 def demo_find_candidates_for_job():
     """Demo: Find matching candidates for a specific job"""
@@ -114,6 +115,8 @@ def demo_find_jobs_for_candidate():
 def interactive_search():
     """Interactive search interface"""
     matcher = JobCandidateMatcher()
+    # Re-querying a job is served from the result cache (kept on disk across sessions)
+    matcher.enable_result_cache(RESULT_CACHE_PATH)
     
     print("="*80)
     print("Interactive Job-Candidate Matching")
@@ -144,9 +147,11 @@ def interactive_search():
                 limit = input("How many candidates to show? (default 10): ").strip()
                 limit = int(limit) if limit.isdigit() else 10
                 
+                started = time.perf_counter()
                 matches = matcher.find_matching_candidates(job_id, limit=limit)
+                elapsed = time.perf_counter() - started
                 
-                print(f"\nFound {len(matches)} matching candidates:\n")
+                print(f"\nFound {len(matches)} matching candidates in {elapsed * 1000:.0f} ms:\n")
                 for i, match in enumerate(matches, 1):
                     candidate = match['candidate']
                     print(f"{i}. {candidate.get('first_name', '')} {candidate.get('last_name', '')} "
@@ -1,19 +1,27 @@
-from connect_prod import get_database, MONGODB_URI
-from pymongo import MongoClient
+from connect_prod import MONGODB_URI
 from job_candidate_matcher import JobCandidateMatcher
+from ranking import merge_rankings
 from bson import ObjectId
 from pprint import pprint
 
+# Summary wording for each weighted sub-score
+SUB_SCORE_LABELS = {
+    'skills_match': 'Skills compatibility',
+    'experience_match': 'Experience level',
+    'job_role_match': 'Job role alignment',
+    'text_similarity': 'Profile text similarity',
+    'location_match': 'Location (same city or metro)'
+}
+
 class ProductionJobCandidateMatcher(JobCandidateMatcher):
     """Job-Candidate Matcher for Production Database"""
     
+    # Prefer candidates in (or near) the job's city
+    LOCATION_WEIGHT = 0.10
+    
     def __init__(self):
         """Initialize with production database connection"""
-        self.client = MongoClient(MONGODB_URI)
-        self.db = self.client['db']
-        self.jobs_collection = self.db['jobs']
-        self.candidates_collection = self.db['candidates']
-        self.candidatedatas_collection = self.db['candidatedatas']
+        super().__init__('db', mongodb_uri=MONGODB_URI)
 
 def find_top_candidates_for_dqa():
     """Find top 10 candidates for the Data Quality Analyst job in Palo Alto"""
@@ -42,62 +50,33 @@ def find_top_candidates_for_dqa():
     
     # Get company info
     if job.get('company'):
-        from connect_prod import get_database
-        db, _ = get_database('db')
-        company = db['companies'].find_one({'_id': job['company']})
+        company = matcher.db['companies'].find_one({'_id': job['company']})
         if company:
             print(f"   Company: {company.get('employer_name', 'N/A')}")
     
     print(f"\n🔍 Searching for matching candidates...")
     print(f"   This may take a moment as we analyze all candidates...\n")
     
-    # Get candidates with relevant skills or job roles (more targeted search)
-    print("   Step 1: Finding candidates with relevant skills/roles...")
+    # Index candidate skills, then score only candidates sharing a skill with the job
+    print("   Step 1: Indexing candidate skills...")
     
-    relevant_candidates = list(matcher.candidates_collection.find({
-        '$or': [
-            {'skills': {'$regex': 'data|sql|quality|analyst|qa|crm|analysis', '$options': 'i'}},
-            {'job_role': {'$regex': 'data|analyst|quality|qa', '$options': 'i'}},
-            {'is_job_seeking': True}
-        ],
-        'approval_status': {'$ne': 'rejected'}
-    }).limit(2000))  # Limit to 2000 most relevant candidates
+    eligible = {'approval_status': {'$ne': 'rejected'}}
+    skills_index = matcher.build_skills_index(eligible)
     
-    print(f"   Found {len(relevant_candidates)} potentially relevant candidates")
-    print("   Step 2: Calculating match scores...")
+    print(f"   Indexed {len(skills_index)} candidates")
+    print("   Step 2: Calculating match scores for candidates with overlapping skills or related roles...")
     
-    matches = []
+    # Same eligibility as before the skills index: a shared skill, a related role, or actively job seeking
+    related = {'$and': [eligible, {'$or': [
+        {'job_role': {'$regex': 'data|analyst|quality|qa', '$options': 'i'}},
+        {'is_job_seeking': True}
+    ]}]}
     
-    for i, candidate in enumerate(relevant_candidates):
-        if (i + 1) % 200 == 0:
-            print(f"      Processed {i + 1}/{len(relevant_candidates)} candidates... (Found {len(matches)} matches so far)")
-        
-        # Try to get detailed candidate data
-        candidatedata = matcher.candidatedatas_collection.find_one({
-            'candidate': candidate['_id']
-        })
-        
-        # Calculate match score
-        try:
-            match_result = matcher.calculate_match_score(job, candidate, candidatedata)
-            
-            if match_result['overall_score'] >= 0.05:  # Minimum 5% match
-                matches.append({
-                    'candidate_id': str(candidate['_id']),
-                    'candidate': candidate,
-                    'candidatedata': candidatedata,
-                    'match_score': match_result['overall_score'],
-                    'score_breakdown': match_result['scores']
-                })
-        except Exception as e:
-            # Skip candidates that cause errors
-            continue
-    
-    # Sort by match score (descending)
-    matches.sort(key=lambda x: x['match_score'], reverse=True)
-    
-    # Get top 10
-    matches = matches[:10]
+    # Top 10, minimum 5% match
+    matches = merge_rankings([
+        matcher.rank_candidates(job, limit=10, min_score=0.05, query=eligible, skill_prefilter=True),
+        matcher.rank_candidates(job, limit=10, min_score=0.05, query=related)
+    ], limit=10)
     
     if not matches:
         print("❌ No matching candidates found.")
@@ -143,6 +122,7 @@ def find_top_candidates_for_dqa():
         print(f"      • Experience Match: {breakdown['experience_match']:.1%}")
         print(f"      • Job Role Match: {breakdown['job_role_match']:.1%}")
         print(f"      • Text Similarity: {breakdown['text_similarity']:.1%}")
+        print(f"      • Location Match: {breakdown['location_match']:.1%}")
         
         # Additional info if available
         if candidate.get('about'):
@@ -161,10 +141,8 @@ def find_top_candidates_for_dqa():
     if matches:
         print(f"📊 Score range: {matches[-1]['match_score']:.1%} - {matches[0]['match_score']:.1%}")
     print(f"\n💡 These candidates are ranked by overall match score, which considers:")
-    print(f"   • Skills compatibility (30% weight)")
-    print(f"   • Experience level (20% weight)")
-    print(f"   • Job role alignment (25% weight)")
-    print(f"   • Profile text similarity (25% weight)")
+    for key, weight in matcher.WEIGHTS.items():
+        print(f"   • {SUB_SCORE_LABELS.get(key, key)} ({weight:.1%} weight)")
     
     matcher.close()
 
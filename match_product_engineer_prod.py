@@ -1,19 +1,27 @@
 from connect_prod import get_database, MONGODB_URI
-from pymongo import MongoClient
 from job_candidate_matcher import JobCandidateMatcher
+from ranking import merge_rankings
 from bson import ObjectId
 from pprint import pprint
 
+# Summary wording for each weighted sub-score
+SUB_SCORE_LABELS = {
+    'skills_match': 'Skills compatibility',
+    'experience_match': 'Experience level',
+    'job_role_match': 'Job role alignment',
+    'text_similarity': 'Profile text similarity',
+    'location_match': 'Location (same city or metro)'
+}
+
 class ProductionJobCandidateMatcher(JobCandidateMatcher):
     """Job-Candidate Matcher for Production Database"""
     
+    # Prefer candidates in (or near) the job's city
+    LOCATION_WEIGHT = 0.10
+    
     def __init__(self):
         """Initialize with production database connection"""
-        self.client = MongoClient(MONGODB_URI)
-        self.db = self.client['db']
-        self.jobs_collection = self.db['jobs']
-        self.candidates_collection = self.db['candidates']
-        self.candidatedatas_collection = self.db['candidatedatas']
+        super().__init__('db', mongodb_uri=MONGODB_URI)
 
 def find_top_candidates_for_product_engineer():
     """Find top 10 candidates for the Product Engineer job in San Francisco"""
@@ -43,49 +51,26 @@ def find_top_candidates_for_product_engineer():
     print(f"\n🔍 Searching for matching candidates...")
     print(f"   This may take a moment as we analyze all candidates...\n")
     
-    # Get candidates with relevant skills or job roles (more targeted search)
-    # First, get candidates with relevant skills or engineering roles
-    print("   Step 1: Finding candidates with relevant skills/roles...")
-    
-    relevant_candidates = list(matcher.candidates_collection.find({
-        '$or': [
-            {'skills': {'$regex': 'react|typescript|javascript|mysql|sql|engineer|software|product', '$options': 'i'}},
-            {'job_role': {'$regex': 'engineer|software|product|developer', '$options': 'i'}},
-            {'is_job_seeking': True}
-        ],
-        'approval_status': {'$ne': 'rejected'}
-    }).limit(2000))  # Limit to 2000 most relevant candidates
-    
-    print(f"   Found {len(relevant_candidates)} potentially relevant candidates")
-    print("   Step 2: Calculating match scores...")
-    
-    matches = []
-    
-    for i, candidate in enumerate(relevant_candidates):
-        if (i + 1) % 200 == 0:
-            print(f"      Processed {i + 1}/{len(relevant_candidates)} candidates...")
-        # Try to get detailed candidate data
-        candidatedata = matcher.candidatedatas_collection.find_one({
-            'candidate': candidate['_id']
-        })
-        
-        # Calculate match score
-        match_result = matcher.calculate_match_score(job, candidate, candidatedata)
-        
-        if match_result['overall_score'] >= 0.05:  # Minimum 5% match
-            matches.append({
-                'candidate_id': str(candidate['_id']),
-                'candidate': candidate,
-                'candidatedata': candidatedata,
-                'match_score': match_result['overall_score'],
-                'score_breakdown': match_result['scores']
-            })
+    # Index candidate skills, then score only candidates sharing a skill with the job
+    print("   Step 1: Indexing candidate skills...")
+    
+    eligible = {'approval_status': {'$ne': 'rejected'}}
+    skills_index = matcher.build_skills_index(eligible)
+    
+    print(f"   Indexed {len(skills_index)} candidates")
+    print("   Step 2: Calculating match scores for candidates with overlapping skills or related roles...")
     
-    # Sort by match score (descending)
-    matches.sort(key=lambda x: x['match_score'], reverse=True)
+    # Same eligibility as before the skills index: a shared skill, a related role, or actively job seeking
+    related = {'$and': [eligible, {'$or': [
+        {'job_role': {'$regex': 'engineer|software|product|developer', '$options': 'i'}},
+        {'is_job_seeking': True}
+    ]}]}
     
-    # Get top 10
-    matches = matches[:10]
+    # Top 10, minimum 5% match
+    matches = merge_rankings([
+        matcher.rank_candidates(job, limit=10, min_score=0.05, query=eligible, skill_prefilter=True),
+        matcher.rank_candidates(job, limit=10, min_score=0.05, query=related)
+    ], limit=10)
     
     if not matches:
         print("❌ No matching candidates found.")
@@ -131,6 +116,7 @@ def find_top_candidates_for_product_engineer():
         print(f"      • Experience Match: {breakdown['experience_match']:.1%}")
         print(f"      • Job Role Match: {breakdown['job_role_match']:.1%}")
         print(f"      • Text Similarity: {breakdown['text_similarity']:.1%}")
+        print(f"      • Location Match: {breakdown['location_match']:.1%}")
         
         # Additional info if available
         if candidate.get('about'):
@@ -148,10 +134,8 @@ def find_top_candidates_for_product_engineer():
     print(f"✅ Found {len(matches)} top matching candidates")
     print(f"📊 Score range: {matches[-1]['match_score']:.1%} - {matches[0]['match_score']:.1%}")
     print(f"\n💡 These candidates are ranked by overall match score, which considers:")
-    print(f"   • Skills compatibility (30% weight)")
-    print(f"   • Experience level (20% weight)")
-    print(f"   • Job role alignment (25% weight)")
-    print(f"   • Profile text similarity (25% weight)")
+    for key, weight in matcher.WEIGHTS.items():
+        print(f"   • {SUB_SCORE_LABELS.get(key, key)} ({weight:.1%} weight)")
     
     matcher.close()
 
@@ -0,0 +1,95 @@
+import atexit
+import os
+import threading
+from typing import Dict, Tuple
+
+from pymongo import MongoClient, ReadPreference
+
+try:
+    import config
+except ImportError:  # Production scripts pass their own URI
+    config = None
+
+# Pool and timeout settings for every shared client; config.MONGODB_CLIENT_OPTIONS overrides them
+DEFAULT_CLIENT_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 0,
+    'maxIdleTimeMS': 300000,
+    'connectTimeoutMS': 10000,
+    'serverSelectionTimeoutMS': 15000,
+    # Long enough for a large cursor batch on a busy secondary
+    'socketTimeoutMS': 300000,
+    'retryReads': True
+}
+
+# Read preference for matching scans: spread full reads over secondaries, fall back to the primary
+SCAN_READ_PREFERENCE = ReadPreference.SECONDARY_PREFERRED
+
+_clients: Dict[Tuple, MongoClient] = {}
+_clients_pid = os.getpid()
+_lock = threading.Lock()
+
+
+def client_options(**overrides) -> Dict:
+    """Default client options, then config.MONGODB_CLIENT_OPTIONS, then overrides"""
+    options = dict(DEFAULT_CLIENT_OPTIONS)
+    options.update(getattr(config, 'MONGODB_CLIENT_OPTIONS', None) or {})
+    options.update(overrides)
+    return options
+
+
+def get_client(uri: str = None, **overrides) -> MongoClient:
+    """
+    Process-wide MongoClient for a URI, created on first use
+
+    Every caller asking for the same URI and options shares one client (and
+    so one SRV lookup, TLS handshake and connection pool). A forked child
+    gets fresh clients, as pymongo clients must not cross a fork.
+
+    Args:
+        uri: Connection string (defaults to config.MONGODB_URI)
+        overrides: MongoClient options on top of client_options()
+    """
+    global _clients_pid
+    uri = uri or getattr(config, 'MONGODB_URI', None)
+    if not uri:
+        raise ValueError("No MongoDB URI given and config.MONGODB_URI is not set")
+    options = client_options(**overrides)
+    key = (uri, tuple(sorted((name, repr(value)) for name, value in options.items())))
+    with _lock:
+        if _clients_pid != os.getpid():
+            # Inherited clients belong to the parent; drop them without closing
+            _clients.clear()
+            _clients_pid = os.getpid()
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = MongoClient(uri, **options)
+        return client
+
+
+def get_database(db_name: str = 'db', uri: str = None, **overrides):
+    """Database on the shared client for uri, as (db, client)"""
+    client = get_client(uri, **overrides)
+    return client[db_name], client
+
+
+def scan_collection(db, name: str):
+    """Collection handle that reads with SCAN_READ_PREFERENCE"""
+    return db.get_collection(name, read_preference=SCAN_READ_PREFERENCE)
+
+
+def primary_collection(collection):
+    """The same collection read from the primary, for point lookups that must see the latest write"""
+    return collection.with_options(read_preference=ReadPreference.PRIMARY)
+
+
+def close_clients():
+    """Close every shared client; later get_client calls open new ones"""
+    with _lock:
+        clients = list(_clients.values()) if _clients_pid == os.getpid() else []
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_clients)
@@ -0,0 +1,244 @@
+import multiprocessing
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ranking import TopK, merge_rankings
+
+# Matcher inherited by each forked worker (set by _init_worker)
+_worker_matcher = None
+
+
+def object_id_shards(collection, query: Dict, shards: int) -> List[Dict]:
+    """
+    Split the documents matching query into contiguous _id ranges of roughly equal size
+
+    Returns:
+        One _id filter per shard (the first and last shard are open-ended)
+    """
+    total = collection.count_documents(query)
+    shards = max(1, min(shards, total))
+
+    bounds = []
+    for i in range(1, shards):
+        boundary = next(iter(collection.find(query, {'_id': 1}).sort('_id', 1).skip(total * i // shards).limit(1)), None)
+        if boundary is not None and (not bounds or boundary['_id'] > bounds[-1]):
+            bounds.append(boundary['_id'])
+
+    filters = []
+    lower = None
+    for upper in bounds + [None]:
+        id_range = {}
+        if lower is not None:
+            id_range['$gte'] = lower
+        if upper is not None:
+            id_range['$lt'] = upper
+        filters.append({'_id': id_range} if id_range else {})
+        lower = upper
+    return filters
+
+
+def _shard_query(query: Dict, shard: Dict) -> Dict:
+    """Restrict a query to one shard's _id range"""
+    if not shard:
+        return query
+    if not query:
+        return shard
+    return {'$and': [query, shard]}
+
+
+def _init_worker(matcher):
+    """Pool initializer: adopt the parent's matcher with a connection of our own"""
+    global _worker_matcher
+    matcher.reconnect()
+    _worker_matcher = matcher
+
+
+def _rank_shard(job: Dict, job_profile, limit: int, min_score: float, batch_size: Optional[int],
+                query: Dict, location: Optional[str], candidate_ids: Optional[List] = None,
+                skills_scores: Optional[np.ndarray] = None) -> List[Dict]:
+    """Top-k candidates of one shard: an _id range in query, or a slice of skill-prefiltered ids"""
+    return _worker_matcher.rank_scan(job, job_profile, limit, min_score, True, batch_size, query, location,
+                                     candidate_ids, skills_scores)
+
+
+def _score_store_rows(job: Dict, job_profile, rows: np.ndarray, limit: int, min_score: float,
+                      skill_prefilter: bool, metro_id: Optional[int]) -> List[Tuple]:
+    """Top-k of some base rows of the feature store the worker was forked with"""
+    matcher = _worker_matcher
+    return matcher.top_segment_scores(job, job_profile, matcher.feature_store, rows, limit, min_score,
+                                      skill_prefilter, metro_id)
+
+
+def _split(values: np.ndarray, parts: int) -> List[np.ndarray]:
+    """Contiguous, non-empty chunks of roughly equal size"""
+    return [chunk for chunk in np.array_split(values, max(1, min(parts, len(values)))) if len(chunk)]
+
+
+def _top_jobs(matcher, candidate: Dict, candidatedata: Dict, limit: int, min_score: float,
+              batch_size: Optional[int], query: Dict) -> List[Dict]:
+    """Top-k jobs matching query for a candidate"""
+    top = TopK(limit)
+    for match in matcher.iter_job_matches(candidate, candidatedata, min_score, batch_size, query):
+        top.push(match['match_score'], match['job_id'], match)
+    return top.results()
+
+
+def _search_shard(*args) -> List[Dict]:
+    """Top-k jobs of one shard"""
+    return _top_jobs(_worker_matcher, *args)
+
+
+class ShardedScorer:
+    """
+    Process-pool execution of candidate rankings and job scans
+
+    With a current feature store, its base rows (or the ANN candidates) are
+    split into contiguous row ranges, one task per range; the parent scores
+    the small delta segment itself. Otherwise candidates are split into
+    contiguous ObjectId ranges, or, with skill_prefilter, the ids from the
+    parent's skills index are split so each worker fetches only its own.
+    Workers are forked from the parent, so the text model and the
+    (memory-mapped) feature store arrays are shared copy-on-write rather
+    than copied; each worker opens its own MongoClient. Per-shard top-k
+    lists are merged with the same (score, id) ordering as the serial path,
+    so results are identical.
+
+    The pool is re-forked when the feature store is replaced or compacted
+    or the text model or location table changes. Dead rows are excluded by
+    the parent, so deltas applied since the fork need no re-fork. Requires
+    the 'fork' start method (Linux); elsewhere calls run serially in-process.
+    """
+
+    # Shards per worker process, so uneven shards still keep every core busy
+    SHARDS_PER_PROCESS = 4
+
+    def __init__(self, matcher, processes: int = None):
+        """
+        Args:
+            matcher: JobCandidateMatcher to fork workers from
+            processes: Worker processes (defaults to the CPU count)
+        """
+        self.matcher = matcher
+        self.processes = processes or os.cpu_count() or 1
+        self._pool = None
+        self._forked_state = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _matcher_state(self) -> Tuple:
+        """What the workers inherit at fork time and must not diverge from the parent"""
+        matcher = self.matcher
+        store = matcher.feature_store
+        return (
+            id(store),
+            store.revision if store is not None else None,
+            matcher.text_model.fingerprint if matcher.text_model is not None else None,
+            matcher.locations.fingerprint
+        )
+
+    @property
+    def pool(self):
+        """Worker pool, forked on first use (and again after _matcher_state changes); None when fork is unavailable"""
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return None
+        state = self._matcher_state()
+        if self._pool is not None and state != self._forked_state:
+            self.close()
+        if self._pool is None:
+            context = multiprocessing.get_context('fork')
+            self._pool = context.Pool(self.processes, initializer=_init_worker, initargs=(self.matcher,))
+            self._forked_state = state
+        return self._pool
+
+    @property
+    def shards(self) -> int:
+        return self.processes * self.SHARDS_PER_PROCESS
+
+    def rank_candidates(self, job: Dict, limit: int = 10, min_score: float = 0.0, batch_size: int = None,
+                        query: Dict = None, skill_prefilter: bool = False, location: str = None,
+                        approximate: bool = False) -> List[Dict]:
+        """Sharded JobCandidateMatcher.rank_candidates (vectorized path)"""
+        matcher = self.matcher
+        query = matcher.CANDIDATE_QUERY if query is None else query
+        if self.pool is None:
+            return matcher.rank_candidates(job, limit, min_score, True, batch_size, query, skill_prefilter,
+                                           location=location, approximate=approximate)
+
+        job_profile = matcher.compile_job_profile(job)
+        if matcher.feature_store_is_current(query):
+            return self._rank_feature_store(job, job_profile, limit, min_score, skill_prefilter, location, approximate)
+
+        if skill_prefilter:
+            # Each worker fetches only its slice of the prefiltered ids (sorted, so slices are _id ranges)
+            candidate_ids, skills_scores = matcher.skill_prefilter_candidates(job_profile)
+            order = sorted(range(len(candidate_ids)), key=candidate_ids.__getitem__)
+            tasks = [
+                (job, job_profile, limit, min_score, batch_size, query, location,
+                 [candidate_ids[i] for i in chunk], np.asarray(skills_scores)[chunk])
+                for chunk in _split(np.array(order, dtype=np.int64), self.shards)
+            ]
+        else:
+            shards = object_id_shards(matcher.candidates_collection, query, self.shards)
+            tasks = [
+                (job, job_profile, limit, min_score, batch_size, _shard_query(query, shard), location)
+                for shard in shards
+            ]
+        return merge_rankings(self.pool.starmap(_rank_shard, tasks), limit, 'candidate_id')
+
+    def _rank_feature_store(self, job: Dict, job_profile, limit: int, min_score: float, skill_prefilter: bool,
+                            location: Optional[str], approximate: bool) -> List[Dict]:
+        """Base rows scored in the workers by row range, the delta here; then one fetch of the merged top-k"""
+        matcher = self.matcher
+        store = matcher.feature_store
+        metro_id = None if location is None else matcher.locations.metro_id(location)
+        if approximate and matcher.ann_index_is_current():
+            rows = matcher.ann_index.search(job_profile.text_vector)
+        else:
+            rows = np.arange(store.ids.shape[0])
+        if store.dead is not None:
+            # The workers' copy of the dead mask dates from the fork
+            rows = rows[~store.dead[rows]]
+
+        tasks = [
+            (job, job_profile, chunk, limit, min_score, skill_prefilter, metro_id)
+            for chunk in _split(rows, self.shards)
+        ]
+        results = self.pool.starmap(_score_store_rows, tasks)
+        if store.delta is not None:
+            results.append(matcher.top_segment_scores(job, job_profile, store.delta, None, limit, min_score,
+                                                      skill_prefilter, metro_id))
+
+        top = TopK(limit)
+        for matches in results:
+            for score, candidate_id, result in matches:
+                top.push(score, candidate_id, result)
+        return matcher._fetch_matches(top.results())
+
+    def search_jobs(self, candidate: Dict, candidatedata: Dict = None, limit: int = 10, min_score: float = 0.0,
+                    batch_size: int = None, query: Dict = None) -> List[Dict]:
+        """Sharded top-k over JobCandidateMatcher.iter_job_matches"""
+        matcher = self.matcher
+        query = query or {}
+        if self.pool is None:
+            return _top_jobs(matcher, candidate, candidatedata, limit, min_score, batch_size, query)
+
+        shards = object_id_shards(matcher.jobs_collection, query, self.shards)
+        tasks = [
+            (candidate, candidatedata, limit, min_score, batch_size, _shard_query(query, shard))
+            for shard in shards
+        ]
+        return merge_rankings(self.pool.starmap(_search_shard, tasks), limit, 'job_id')
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._forked_state = None
@@ -1,11 +1,11 @@
-from pymongo import MongoClient
 from config import MONGODB_URI
+from mongo_clients import get_client
 from pprint import pprint
 
 def get_database(db_name='db'):
     """Get a specific database from MongoDB"""
     try:
-        client = MongoClient(MONGODB_URI)
+        client = get_client(MONGODB_URI)
         db = client[db_name]
         return db, client
     except Exception as e:
@@ -35,8 +35,6 @@ def quick_view_collection(collection_name, limit=5):
             pprint(doc, width=100, depth=3)
     else:
         print("Collection is empty.")
-    
-    client.close()
 
 def list_collections():
     """List all collections with document counts"""
@@ -58,8 +56,6 @@ def list_collections():
         collection = db[col_name]
         count = collection.count_documents({})
         print(f"{col_name:<40} {count:<15}")
-    
-    client.close()
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,104 @@
+import heapq
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+
+class _HeapEntry:
+    """Min-heap entry ordered worst-first: lower score, then higher id"""
+
+    __slots__ = ('score', 'item_id', 'item')
+
+    def __init__(self, score: float, item_id: str, item: Any):
+        self.score = score
+        self.item_id = item_id
+        self.item = item
+
+    def __lt__(self, other: '_HeapEntry') -> bool:
+        if self.score != other.score:
+            return self.score < other.score
+        return self.item_id > other.item_id
+
+
+class TopK:
+    """
+    Bounded top-k selection over a stream of scored items
+
+    Keeps at most k items in a min-heap. Ranking is by score descending, then
+    by id ascending, so results are deterministic regardless of arrival order.
+    """
+
+    def __init__(self, k: int):
+        self.k = max(0, k)
+        self._heap: List[_HeapEntry] = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    @property
+    def threshold(self) -> float:
+        """Score an item must beat (or tie with a smaller id) to enter; -inf until full"""
+        if len(self._heap) < self.k:
+            return float('-inf')
+        return self._heap[0].score
+
+    def would_accept(self, score: float, item_id: str) -> bool:
+        """Whether an item with this score and id would enter the current top-k"""
+        if self.k == 0:
+            return False
+        if len(self._heap) < self.k:
+            return True
+        return self._heap[0] < _HeapEntry(score, item_id, None)
+
+    def push(self, score: float, item_id: str, item: Any = None) -> bool:
+        """Offer an item; returns True if it was kept"""
+        if not self.would_accept(score, item_id):
+            return False
+        entry = _HeapEntry(score, item_id, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+        return True
+
+    def results(self) -> List[Any]:
+        """Kept items, best first"""
+        return [entry.item for entry in sorted(self._heap, reverse=True)]
+
+
+def merge_rankings(rankings: Iterable[List[Dict]], limit: int, id_key: str = 'candidate_id') -> List[Dict]:
+    """
+    Top `limit` of several ranked match lists, with TopK ordering
+
+    A match appearing in more than one list (same id_key) is counted once.
+    """
+    top = TopK(limit)
+    seen = set()
+    for ranking in rankings:
+        for match in ranking:
+            item_id = match[id_key]
+            if item_id not in seen:
+                seen.add(item_id)
+                top.push(match['match_score'], item_id, match)
+    return top.results()
+
+
+def top_k_indices(scores: np.ndarray, k: int, ids: Sequence[str], min_score: float = float('-inf')) -> List[int]:
+    """
+    Indices of the k best scores at or above min_score, best first
+
+    Uses argpartition-style selection so only the boundary set is sorted;
+    ties are broken by ascending id, matching TopK.
+    """
+    eligible = np.flatnonzero(scores >= min_score)
+    if k <= 0 or eligible.size == 0:
+        return []
+
+    if eligible.size > k:
+        eligible_scores = scores[eligible]
+        kth = np.partition(eligible_scores, eligible_scores.size - k)[eligible_scores.size - k]
+        # Keep every tie at the boundary so the id tie-break decides between them
+        eligible = eligible[eligible_scores >= kth]
+
+    order = sorted(eligible.tolist(), key=lambda i: (-scores[i], ids[i]))
+    return order[:k]
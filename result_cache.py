@@ -0,0 +1,176 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Hashable, List
+
+from bson import json_util
+
+from text_cache import LRUCache
+
+# Default directory of the on-disk tier
+RESULT_CACHE_PATH = 'result_cache'
+
+
+def job_revision(job: Dict) -> str:
+    """Content hash of a job document; any edit to the job gives a new revision"""
+    return hashlib.sha1(json_util.dumps(job, sort_keys=True).encode()).hexdigest()
+
+
+class MatchResultCache:
+    """
+    Ranked match lists keyed by everything that determines them
+
+    Entries live in a bounded in-memory LRU and, when path is given, as one
+    pickle file per key in that directory, so a restarted process (or
+    another one sharing the directory) starts warm. Values are stored
+    pickled: callers always get their own copy and may modify it freely.
+
+    Keys are built by the matcher (see JobCandidateMatcher.result_cache_key)
+    and include the job revision and the feature store revision, so edits to
+    a job or a rebuilt or compacted store simply stop matching old entries.
+    Rankings streamed from the collection have no store revision, and
+    changes applied to the store as deltas keep its revision; ttl bounds how
+    long either may lag behind candidate changes.
+    """
+
+    MAXSIZE = 1000
+
+    # Seconds an entry is served for
+    TTL = 600.0
+
+    # Puts between sweeps of expired files from the disk tier
+    PRUNE_INTERVAL = 256
+
+    def __init__(self, path: str = None, maxsize: int = None, ttl: float = None):
+        """
+        Args:
+            path: Directory of the on-disk tier (None keeps entries in memory only)
+            maxsize: Entries kept in memory (defaults to MAXSIZE)
+            ttl: Seconds an entry is served for (defaults to TTL)
+        """
+        self.path = path
+        self.ttl = self.TTL if ttl is None else ttl
+        self.memory = LRUCache(self.MAXSIZE if maxsize is None else maxsize)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def __len__(self):
+        return len(self.memory)
+
+    def _file(self, key: Hashable) -> str:
+        return os.path.join(self.path, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: Hashable) -> List[Dict]:
+        """Cached matches for key, or None"""
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None and entry[0] <= now:
+            self.memory.pop(key)
+            entry = None
+        if entry is None and self.path:
+            entry = self._read(key, now)
+            if entry is not None:
+                self.memory.put(key, entry)
+                self._count('disk_hits')
+        if entry is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return pickle.loads(entry[1])
+
+    def _read(self, key: Hashable, now: float):
+        filename = self._file(key)
+        try:
+            with open(filename, 'rb') as f:
+                stored_key, expires, payload = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        if expires <= now:
+            self._remove(filename)
+            return None
+        # A different key with the same file name (a hash collision) is a miss
+        return (expires, payload) if stored_key == key else None
+
+    def put(self, key: Hashable, matches: List[Dict]):
+        """Store matches for key in memory and, with a path, on disk"""
+        entry = (time.time() + self.ttl, pickle.dumps(matches, pickle.HIGHEST_PROTOCOL))
+        self.memory.put(key, entry)
+        if not self.path:
+            return
+
+        # Write to a temporary file and rename, so readers never see a partial entry
+        fd, staging = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((key, entry[0], entry[1]), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(staging, self._file(key))
+        except OSError:
+            self._remove(staging)
+            raise
+
+        with self._lock:
+            self._puts += 1
+            prune = self._puts % self.PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+
+    @staticmethod
+    def _remove(filename: str):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def prune(self) -> int:
+        """Delete expired entries from the disk tier; returns how many were removed"""
+        if not self.path:
+            return 0
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.path):
+            if not name.endswith('.pkl'):
+                continue
+            filename = os.path.join(self.path, name)
+            try:
+                with open(filename, 'rb') as f:
+                    expired = pickle.load(f)[1] <= now
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                expired = True
+            if expired:
+                self._remove(filename)
+                removed += 1
+        return removed
+
+    def clear(self):
+        """Drop every entry, in memory and on disk, and reset the counters"""
+        self.memory.clear()
+        if self.path:
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters (disk_hits are the hits served from the disk tier)"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.memory),
+            'maxsize': self.memory.maxsize,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
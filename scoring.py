@@ -0,0 +1,201 @@
+import json
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from ranking import top_k_indices
+
+# Sub-scores every matcher computes, in the order they are summed
+CORE_SUB_SCORES = ('skills_match', 'experience_match', 'job_role_match', 'text_similarity')
+
+# Computed by the matcher when weighted (see JobCandidateMatcher.set_location_weight)
+OPTIONAL_SUB_SCORES = ('location_match',)
+
+
+class SubScorePlugin:
+    """
+    Extra sub-score computed from candidate documents
+
+    Subclasses set name (the sub-score key) and fields (the candidate fields
+    score() reads, fetched with one projected query per batch) and implement
+    score(). Plugin sub-scores are added to SubScoreTables, so they can be
+    weighted and compared without re-extracting the built-in features.
+    """
+
+    name: str = None
+    fields: Tuple[str, ...] = ()
+
+    def score(self, matcher, job_profile, candidates: List[Dict]) -> np.ndarray:
+        """Sub-score in [0, 1] of each candidate document against the job"""
+        raise NotImplementedError
+
+
+class AvailabilityPlugin(SubScorePlugin):
+    """'availability': whether the candidate is available to interview"""
+
+    name = 'availability'
+    fields = ('is_availabletointerview',)
+
+    AVAILABLE_SCORE = 1.0
+    UNAVAILABLE_SCORE = 0.0
+    UNKNOWN_SCORE = 0.5
+
+    def score(self, matcher, job_profile, candidates: List[Dict]) -> np.ndarray:
+        values = {True: self.AVAILABLE_SCORE, False: self.UNAVAILABLE_SCORE}
+        return np.array([values.get(candidate.get('is_availabletointerview'), self.UNKNOWN_SCORE)
+                         for candidate in candidates])
+
+
+class ScoringConfig:
+    """
+    Sub-score weights, plus the plugins providing any non-built-in sub-scores
+
+    Weights are kept in summation order: the core sub-scores first (missing
+    ones weighted 0), then location_match, then plugin sub-scores. Matchers
+    rank with the built-in part (set_scoring_config); SubScoreTables accept
+    any config.
+    """
+
+    def __init__(self, weights: Dict[str, float], plugins: Iterable[SubScorePlugin] = ()):
+        """
+        Args:
+            weights: Sub-score name -> non-negative weight
+            plugins: Plugins computing the weighted sub-scores that are not built in
+        """
+        self.plugins = {plugin.name: plugin for plugin in plugins}
+        known = CORE_SUB_SCORES + OPTIONAL_SUB_SCORES + tuple(self.plugins)
+        unknown = set(weights) - set(known)
+        if unknown:
+            raise ValueError(f"No built-in sub-score or plugin named {', '.join(sorted(unknown))}")
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Weights must be non-negative")
+
+        self.weights = {key: float(weights.get(key, 0.0)) for key in CORE_SUB_SCORES}
+        self.weights.update((key, float(weights[key])) for key in known[len(CORE_SUB_SCORES):] if key in weights)
+
+    def __repr__(self):
+        return f"ScoringConfig({self.weights})"
+
+    @property
+    def builtin(self) -> bool:
+        """Whether every weighted sub-score is computed by the matcher itself"""
+        return not any(self.weights.get(name) for name in self.plugins)
+
+    def normalized(self) -> 'ScoringConfig':
+        """The same config with weights scaled to sum to 1"""
+        total = sum(self.weights.values())
+        if not total:
+            raise ValueError("Cannot normalize weights that sum to 0")
+        return ScoringConfig({key: weight / total for key, weight in self.weights.items()}, self.plugins.values())
+
+    def with_weights(self, **changes: float) -> 'ScoringConfig':
+        """A copy with some weights changed (e.g. config.with_weights(text_similarity=0.4))"""
+        return ScoringConfig(dict(self.weights, **changes), self.plugins.values())
+
+    def to_dict(self) -> Dict:
+        return {'weights': dict(self.weights), 'plugins': sorted(self.plugins)}
+
+    @classmethod
+    def load(cls, path: str, plugins: Iterable[SubScorePlugin] = ()) -> 'ScoringConfig':
+        """
+        Read weights from a JSON file ({"weights": {...}} or a bare weights object)
+
+        Args:
+            plugins: Plugin instances available to the config
+        """
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get('weights', data), plugins)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def weights_of(weights) -> Dict[str, float]:
+    """The weights dict of a ScoringConfig, or a plain weights dict as given"""
+    return weights.weights if isinstance(weights, ScoringConfig) else dict(weights)
+
+
+class SubScoreTable:
+    """
+    Unweighted sub-score arrays of one job against its whole candidate set
+
+    Built once per job by JobCandidateMatcher.score_table (from the feature
+    store or one scan). Ranking under any weights is then a linear
+    combination of the cached arrays, summed in the same order as the
+    matcher, so a table ranked with the matcher's own weights returns
+    exactly what rank_candidates returns.
+    """
+
+    def __init__(self, job_id, id_strings: Sequence[str], scores: Dict[str, np.ndarray]):
+        """
+        Args:
+            job_id: Id of the job the table scores
+            id_strings: Candidate ids as hex strings, row-aligned with the arrays
+            scores: Sub-score name -> float64 array over the candidates
+        """
+        self.job_id = job_id
+        self.id_strings = id_strings
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.id_strings)
+
+    def __contains__(self, name: str):
+        return name in self.scores
+
+    def add(self, name: str, scores: np.ndarray):
+        """Add (or replace) a sub-score column, e.g. from a plugin"""
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.shape != (len(self),):
+            raise ValueError(f"Sub-score {name!r} has shape {scores.shape}, expected ({len(self)},)")
+        self.scores[name] = scores
+
+    def overall(self, weights) -> np.ndarray:
+        """Weighted overall score of every candidate (weights: a ScoringConfig or a name -> weight dict)"""
+        weights = weights_of(weights)
+        missing = [key for key, weight in weights.items() if weight and key not in self.scores]
+        if missing:
+            raise KeyError(f"Sub-scores not in the table: {', '.join(missing)}")
+        overall = np.zeros(len(self))
+        for key in self.scores:
+            if key in weights:
+                overall += self.scores[key] * weights[key]
+        return overall
+
+    def top(self, weights, limit: int = 10, min_score: float = 0.0) -> List[Tuple[object, float, Dict]]:
+        """Top-k (candidate ObjectId, score, breakdown) under weights; ties broken by candidate id"""
+        weights = weights_of(weights)
+        overall = self.overall(weights)
+        keys = [key for key in self.scores if key in weights]
+        return [
+            (ObjectId(self.id_strings[i]), float(overall[i]), {key: float(self.scores[key][i]) for key in keys})
+            for i in top_k_indices(overall, limit, self.id_strings, min_score)
+        ]
+
+    def compare(self, weights_a, weights_b, limit: int = 10, min_score: float = 0.0) -> Dict:
+        """
+        A/B comparison of two weightings
+
+        Returns:
+            overlap (share of the top `limit` in common), only_a / only_b (candidate
+            ids in one top list only), rank_changes (id -> (rank under a, rank under
+            b) for shared candidates that moved) and mean_abs_change (mean absolute
+            overall score difference over all candidates)
+        """
+        top_a = [str(candidate_id) for candidate_id, _, _ in self.top(weights_a, limit, min_score)]
+        top_b = [str(candidate_id) for candidate_id, _, _ in self.top(weights_b, limit, min_score)]
+        ranks_a = {candidate_id: rank for rank, candidate_id in enumerate(top_a, 1)}
+        ranks_b = {candidate_id: rank for rank, candidate_id in enumerate(top_b, 1)}
+        shared = [candidate_id for candidate_id in top_a if candidate_id in ranks_b]
+        difference = self.overall(weights_a) - self.overall(weights_b)
+        return {
+            'overlap': len(shared) / max(len(top_a), len(top_b), 1),
+            'only_a': [candidate_id for candidate_id in top_a if candidate_id not in ranks_b],
+            'only_b': [candidate_id for candidate_id in top_b if candidate_id not in ranks_a],
+            'rank_changes': {candidate_id: (ranks_a[candidate_id], ranks_b[candidate_id])
+                             for candidate_id in shared if ranks_a[candidate_id] != ranks_b[candidate_id]},
+            'mean_abs_change': float(np.abs(difference).mean()) if len(self) else 0.0
+        }
@@ -1,14 +1,20 @@
-from pymongo import MongoClient
 from config import MONGODB_URI
+from mongo_clients import get_client
+from job_queries import company_resolver
+from job_search import JobSearch
 from pprint import pprint
 import re
 
 def search_allocate_jobs():
     """Search for Data Quality Analyst positions from Allocate"""
-    client = MongoClient(MONGODB_URI)
+    client = get_client(MONGODB_URI)
     db = client['db']
     jobs_collection = db['jobs']
     companies_collection = db['companies']
+    # Companies of each listing are resolved with one query (and cached)
+    resolver = company_resolver(db)
+    # Index over all jobs for the text searches below (reused from the last run while current)
+    search = JobSearch.load_or_build(db)
     
     print("="*80)
     print("SEARCHING FOR DATA QUALITY ANALYST POSITIONS FROM ALLOCATE")
@@ -48,10 +54,9 @@ def search_allocate_jobs():
     
     # Search 3: Jobs with "data quality analyst" in title
     print(f"\n\n3. Searching for jobs with 'data quality analyst' in title:")
-    dqa_jobs = list(jobs_collection.find({
-        'title': {'$regex': 'data quality analyst', '$options': 'i'}
-    }))
+    dqa_jobs = search.find_jobs('title:"data quality analyst"')
     print(f"   Found: {len(dqa_jobs)} jobs")
+    companies = resolver.for_jobs(dqa_jobs)
     
     for job in dqa_jobs:
         print(f"\n   {'='*70}")
@@ -60,7 +65,7 @@ def search_allocate_jobs():
         print(f"   Job ID: {job.get('_id')}")
         # Get company name
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
         print(f"   Skills: {job.get('skills', 'N/A')}")
@@ -71,14 +76,9 @@ def search_allocate_jobs():
     
     # Search 4: Jobs with "data quality" anywhere
     print(f"\n\n4. Searching for jobs with 'data quality' in any field:")
-    data_quality_jobs = list(jobs_collection.find({
-        '$or': [
-            {'title': {'$regex': 'data quality', '$options': 'i'}},
-            {'description': {'$regex': 'data quality', '$options': 'i'}},
-            {'skills': {'$regex': 'data quality', '$options': 'i'}}
-        ]
-    }))
+    data_quality_jobs = search.find_jobs('title:"data quality" OR description:"data quality" OR skills:"data quality"')
     print(f"   Found: {len(data_quality_jobs)} jobs")
+    companies = resolver.for_jobs(data_quality_jobs)
     
     for job in data_quality_jobs:
         print(f"\n   {'='*70}")
@@ -86,7 +86,7 @@ def search_allocate_jobs():
         print(f"   Location: {job.get('location', 'N/A')}")
         # Get company name
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
         if job.get('description'):
@@ -102,14 +102,9 @@ def search_allocate_jobs():
     
     # Search 5: Jobs with "allocate" in description or title
     print(f"\n\n5. Searching for jobs with 'allocate' in any field:")
-    allocate_in_jobs = list(jobs_collection.find({
-        '$or': [
-            {'title': {'$regex': 'allocate', '$options': 'i'}},
-            {'description': {'$regex': 'allocate', '$options': 'i'}},
-            {'skills': {'$regex': 'allocate', '$options': 'i'}}
-        ]
-    }))
+    allocate_in_jobs = search.find_jobs('title:allocate* OR description:allocate* OR skills:allocate*')
     print(f"   Found: {len(allocate_in_jobs)} jobs")
+    companies = resolver.for_jobs(allocate_in_jobs)
     
     for job in allocate_in_jobs:
         print(f"\n   {'='*70}")
@@ -117,12 +112,10 @@ def search_allocate_jobs():
         print(f"   Location: {job.get('location', 'N/A')}")
         # Get company name
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
     
-    client.close()
-    
     print("\n" + "="*80)
     print("SUMMARY")
     print("="*80)
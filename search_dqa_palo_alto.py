@@ -1,13 +1,15 @@
-from connect_prod import get_database
-from bson import ObjectId
+from connect_prod import get_database, JOB_SEARCH_PATH
+from job_queries import company_resolver
+from job_search import JobSearch
 from pprint import pprint
 
 def search_dqa_palo_alto():
     """Search for Data Quality Analyst position in Palo Alto"""
     db, client = get_database('db')
     
-    jobs_collection = db['jobs']
-    companies_collection = db['companies']
+    # One index over all jobs answers every search below (reused from the last run while current)
+    search = JobSearch.load_or_build(db, JOB_SEARCH_PATH)
+    resolver = company_resolver(db)
     
     print("="*80)
     print("SEARCHING FOR DATA QUALITY ANALYST IN PALO ALTO")
@@ -15,10 +17,9 @@ def search_dqa_palo_alto():
     
     # Search 1: Jobs with "data quality analyst" in title
     print("\n1. Searching for 'Data Quality Analyst' in title:")
-    dqa_jobs = list(jobs_collection.find({
-        'title': {'$regex': 'data quality analyst', '$options': 'i'}
-    }))
+    dqa_jobs = search.find_jobs('title:"data quality analyst"')
     print(f"   Found: {len(dqa_jobs)} jobs")
+    companies = resolver.for_jobs(dqa_jobs)
     
     for job in dqa_jobs:
         print(f"\n   {'='*70}")
@@ -26,17 +27,16 @@ def search_dqa_palo_alto():
         print(f"   Location: {job.get('location', 'N/A')}")
         print(f"   Job ID: {job.get('_id')}")
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
         print(f"   Skills: {job.get('skills', 'N/A')}")
     
     # Search 2: Jobs in Palo Alto
     print(f"\n\n2. Searching for jobs in Palo Alto:")
-    palo_alto_jobs = list(jobs_collection.find({
-        'location': {'$regex': 'palo alto', '$options': 'i'}
-    }))
+    palo_alto_jobs = search.find_jobs('location:"palo alto"')
     print(f"   Found: {len(palo_alto_jobs)} jobs")
+    companies = resolver.for_jobs(palo_alto_jobs)
     
     for job in palo_alto_jobs:
         print(f"\n   {'='*70}")
@@ -44,17 +44,15 @@ def search_dqa_palo_alto():
         print(f"   Location: {job.get('location', 'N/A')}")
         print(f"   Job ID: {job.get('_id')}")
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
     
     # Search 3: Combined - Data Quality Analyst in Palo Alto
     print(f"\n\n3. Combined search: Data Quality Analyst in Palo Alto:")
-    combined_jobs = list(jobs_collection.find({
-        'title': {'$regex': 'data quality analyst', '$options': 'i'},
-        'location': {'$regex': 'palo alto', '$options': 'i'}
-    }))
+    combined_jobs = search.find_jobs('title:"data quality analyst" location:"palo alto"')
     print(f"   Found: {len(combined_jobs)} jobs")
+    companies = resolver.for_jobs(combined_jobs)
     
     for job in combined_jobs:
         print(f"\n   {'='*70}")
@@ -63,7 +61,7 @@ def search_dqa_palo_alto():
         print(f"   Location: {job.get('location', 'N/A')}")
         print(f"   Job ID: {job.get('_id')}")
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
         print(f"   Skills: {job.get('skills', 'N/A')}")
@@ -75,14 +73,9 @@ def search_dqa_palo_alto():
     # Search 4: If not found, search for "data quality" in Palo Alto
     if len(combined_jobs) == 0:
         print(f"\n\n4. Searching for 'data quality' jobs in Palo Alto:")
-        data_quality_pa = list(jobs_collection.find({
-            '$or': [
-                {'title': {'$regex': 'data quality', '$options': 'i'}},
-                {'description': {'$regex': 'data quality', '$options': 'i'}}
-            ],
-            'location': {'$regex': 'palo alto', '$options': 'i'}
-        }))
+        data_quality_pa = search.find_jobs('(title:"data quality" OR description:"data quality") location:"palo alto"')
         print(f"   Found: {len(data_quality_pa)} jobs")
+        companies = resolver.for_jobs(data_quality_pa)
         
         for job in data_quality_pa:
             print(f"\n   {'='*70}")
@@ -90,12 +83,10 @@ def search_dqa_palo_alto():
             print(f"   Location: {job.get('location', 'N/A')}")
             print(f"   Job ID: {job.get('_id')}")
             if job.get('company'):
-                company = companies_collection.find_one({'_id': job['company']})
+                company = companies.get(job['company'])
                 if company:
                     print(f"   Company: {company.get('employer_name', 'N/A')}")
     
-    client.close()
-    
     return combined_jobs if combined_jobs else (data_quality_pa if 'data_quality_pa' in locals() else [])
 
 if __name__ == "__main__":
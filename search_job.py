@@ -1,46 +1,47 @@
-from pymongo import MongoClient
-from config import MONGODB_URI
+from mongo_clients import get_database
+from job_search import JobSearch
 from pprint import pprint
-import re
+
+# Job search index, built on first use and shared by every search in this run
+_job_search = None
+
+def get_job_search():
+    """Inverted index over all jobs (see job_search.JobSearch), reused from the last run while current"""
+    global _job_search
+    if _job_search is None:
+        _job_search = JobSearch.load_or_build(get_database('db')[0])
+    return _job_search
 
 def search_jobs(keywords=None, company=None, location=None, title=None):
     """Search for jobs with specific criteria"""
-    client = MongoClient(MONGODB_URI)
-    db = client['db']
-    jobs_collection = db['jobs']
+    search = get_job_search()
     
     # Build query
-    query = {}
-    
-    if company:
-        # Case-insensitive search for company name
-        query['company'] = {'$regex': re.escape(company), '$options': 'i'}
+    terms = []
     
     if location:
-        # Case-insensitive search for location
-        query['location'] = {'$regex': re.escape(location), '$options': 'i'}
+        # Location phrase
+        terms.append(f'location:"{location}"')
     
     if title:
-        # Case-insensitive search in title
-        query['title'] = {'$regex': re.escape(title), '$options': 'i'}
+        # Title phrase
+        terms.append(f'title:"{title}"')
     
     if keywords:
-        # Search in title, description, or skills
-        query['$or'] = [
-            {'title': {'$regex': keywords, '$options': 'i'}},
-            {'description': {'$regex': keywords, '$options': 'i'}},
-            {'skills': {'$regex': keywords, '$options': 'i'}}
-        ]
+        # Search in every field (boolean/phrase syntax allowed)
+        terms.append(f'({keywords})')
     
-    # Execute search
-    jobs = list(jobs_collection.find(query))
+    # Execute search; company filters by employer name
+    hits = search.search(' '.join(terms), limit=None, company=company)
+    jobs = [hit['job'] for hit in hits]
     
     print(f"\n{'='*80}")
     print(f"Search Results: Found {len(jobs)} job(s)")
     print(f"{'='*80}\n")
     
     if jobs:
-        for i, job in enumerate(jobs, 1):
+        for i, hit in enumerate(hits, 1):
+            job = hit['job']
             print(f"{'='*80}")
             print(f"Job #{i}")
             print(f"{'='*80}")
@@ -54,32 +55,22 @@ def search_jobs(keywords=None, company=None, location=None, title=None):
             print(f"{job.get('description', 'N/A')[:500]}...")
             print()
             
-            # Try to get company name if we have company ID
+            # Company name, resolved with the search results
             if job.get('company'):
-                companies_collection = db['companies']
-                company_doc = companies_collection.find_one({'_id': job['company']})
+                company_doc = hit['company']
                 if company_doc:
-                    print(f"Company Name: {company_doc.get('name', 'N/A')}")
+                    print(f"Company Name: {company_doc.get('employer_name', 'N/A')}")
                     print()
     else:
         print("No jobs found matching the criteria.")
         print("\nTrying broader search...")
         
         # Try searching for "dialogue" in description/title
-        broad_query = {
-            '$or': [
-                {'title': {'$regex': 'dialogue', '$options': 'i'}},
-                {'description': {'$regex': 'dialogue', '$options': 'i'}},
-                {'location': {'$regex': 'los angeles', '$options': 'i'}},
-                {'title': {'$regex': 'founding', '$options': 'i'}}
-            ]
-        }
-        broad_results = list(jobs_collection.find(broad_query))
-        print(f"Found {len(broad_results)} jobs with related keywords:")
-        for job in broad_results[:5]:  # Show first 5
+        broad_query = 'title:dialogue* OR description:dialogue* OR location:"los angeles" OR title:founding*'
+        print(f"Found {search.count(broad_query)} jobs with related keywords:")
+        for hit in search.search(broad_query, limit=5):  # Show first 5
+            job = hit['job']
             print(f"  - {job.get('title', 'N/A')} at {job.get('location', 'N/A')}")
-    
-    client.close()
 
 if __name__ == "__main__":
     # Search for Dialogue AI Founding Software Engineer in Los Angeles
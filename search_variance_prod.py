@@ -1,4 +1,6 @@
-from connect_prod import get_database
+from connect_prod import get_database, JOB_SEARCH_PATH
+from job_queries import company_resolver
+from job_search import JobSearch
 from pprint import pprint
 import re
 
@@ -12,6 +14,10 @@ def search_variance_product_engineer():
     
     jobs_collection = db['jobs']
     companies_collection = db['companies']
+    # Companies of each listing are resolved with one query (and cached)
+    resolver = company_resolver(db)
+    # Index over all jobs for the text searches below (reused from the last run while current)
+    search = JobSearch.load_or_build(db, JOB_SEARCH_PATH)
     
     print("="*80)
     print("SEARCHING FOR PRODUCT ENGINEER POSITIONS FROM VARIANCE")
@@ -54,10 +60,9 @@ def search_variance_product_engineer():
     
     # Search 3: Jobs with "product engineer" in title
     print(f"\n\n3. Searching for jobs with 'product engineer' in title:")
-    product_engineer_jobs = list(jobs_collection.find({
-        'title': {'$regex': 'product engineer', '$options': 'i'}
-    }))
+    product_engineer_jobs = search.find_jobs('title:"product engineer"')
     print(f"   Found: {len(product_engineer_jobs)} jobs")
+    companies = resolver.for_jobs(product_engineer_jobs)
     
     for job in product_engineer_jobs:
         print(f"\n   {'='*70}")
@@ -66,7 +71,7 @@ def search_variance_product_engineer():
         print(f"   Job ID: {job.get('_id')}")
         # Get company name
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
                 print(f"   Company Email: {company.get('email', 'N/A')}")
@@ -78,14 +83,9 @@ def search_variance_product_engineer():
     
     # Search 4: Jobs with "variance" in any field
     print(f"\n\n4. Searching for jobs with 'variance' in any field:")
-    variance_in_jobs = list(jobs_collection.find({
-        '$or': [
-            {'title': {'$regex': 'variance', '$options': 'i'}},
-            {'description': {'$regex': 'variance', '$options': 'i'}},
-            {'skills': {'$regex': 'variance', '$options': 'i'}}
-        ]
-    }))
+    variance_in_jobs = search.find_jobs('title:variance* OR description:variance* OR skills:variance*')
     print(f"   Found: {len(variance_in_jobs)} jobs")
+    companies = resolver.for_jobs(variance_in_jobs)
     
     for job in variance_in_jobs:
         print(f"\n   {'='*70}")
@@ -93,17 +93,14 @@ def search_variance_product_engineer():
         print(f"   Location: {job.get('location', 'N/A')}")
         # Get company name
         if job.get('company'):
-            company = companies_collection.find_one({'_id': job['company']})
+            company = companies.get(job['company'])
             if company:
                 print(f"   Company: {company.get('employer_name', 'N/A')}")
     
     # Search 5: Combined search - Product Engineer from Variance
     print(f"\n\n5. Combined search: Product Engineer from Variance:")
     if variance_company_ids:
-        combined_jobs = list(jobs_collection.find({
-            'company': {'$in': variance_company_ids},
-            'title': {'$regex': 'product engineer', '$options': 'i'}
-        }))
+        combined_jobs = search.find_jobs('title:"product engineer"', company=variance_company_ids)
         print(f"   Found: {len(combined_jobs)} jobs matching both criteria")
         
         for job in combined_jobs:
@@ -121,8 +118,6 @@ def search_variance_product_engineer():
     else:
         print("   No Variance companies found, so no combined matches possible.")
     
-    client.close()
-    
     print("\n" + "="*80)
     print("SUMMARY")
     print("="*80)
@@ -0,0 +1,131 @@
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+
+def skills_match_from_counts(matched: np.ndarray, candidate_sizes: np.ndarray, job_size: int) -> np.ndarray:
+    """
+    Vectorized calculate_skills_match given intersection counts
+
+    Args:
+        matched: Number of job skills each candidate has
+        candidate_sizes: Number of distinct skills per candidate
+        job_size: Number of distinct job skills
+    """
+    if job_size == 0:
+        return np.zeros(len(matched))
+
+    match_score = matched / job_size
+    bonus = np.minimum(0.1, (candidate_sizes - matched) * 0.01)
+    has_extra = candidate_sizes > job_size
+    match_score[has_extra] = np.minimum(1.0, match_score[has_extra] + bonus[has_extra])
+    match_score[candidate_sizes == 0] = 0.0
+    return match_score
+
+
+class SkillsIndex:
+    """
+    In-process inverted index from normalized skill token to candidates
+
+    Postings hold dense internal document numbers; a job's skill list is
+    resolved by merging its postings, which yields every candidate sharing at
+    least one skill together with the intersection size. Numbers freed by
+    remove() are reused by later adds, so an index maintained from a change
+    stream stays as large as the candidate set.
+    """
+
+    def __init__(self, query: Dict = None):
+        # Candidate filter the index was built with (None for every candidate)
+        self.query = query
+        self._postings: Dict[str, set] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._doc_numbers: Dict[Hashable, int] = {}
+        self._candidate_ids: List[Hashable] = []
+        self._doc_skills: List[frozenset] = []
+        # Document numbers of removed candidates, reused by add()
+        self._free_docs: List[int] = []
+        self._sizes = None
+
+    def __len__(self):
+        return len(self._doc_numbers)
+
+    def __contains__(self, candidate_id):
+        return candidate_id in self._doc_numbers
+
+    def add(self, candidate_id: Hashable, skills: Iterable[str]):
+        """Index (or re-index) a candidate's skill tokens"""
+        if candidate_id in self._doc_numbers:
+            self.remove(candidate_id)
+
+        skills = frozenset(skills)
+        if self._free_docs:
+            doc = self._free_docs.pop()
+            self._candidate_ids[doc] = candidate_id
+            self._doc_skills[doc] = skills
+        else:
+            doc = len(self._candidate_ids)
+            self._candidate_ids.append(candidate_id)
+            self._doc_skills.append(skills)
+        self._doc_numbers[candidate_id] = doc
+        for skill in skills:
+            self._postings.setdefault(skill, set()).add(doc)
+            self._arrays.pop(skill, None)
+        self._sizes = None
+
+    def remove(self, candidate_id: Hashable) -> bool:
+        """Drop a candidate from the index; returns False if it was not indexed"""
+        doc = self._doc_numbers.pop(candidate_id, None)
+        if doc is None:
+            return False
+
+        for skill in self._doc_skills[doc]:
+            posting = self._postings.get(skill)
+            if posting is not None:
+                posting.discard(doc)
+                if not posting:
+                    del self._postings[skill]
+            self._arrays.pop(skill, None)
+        self._doc_skills[doc] = frozenset()
+        self._candidate_ids[doc] = None
+        self._free_docs.append(doc)
+        self._sizes = None
+        return True
+
+    def postings(self, skill: str) -> np.ndarray:
+        """Sorted document numbers of candidates with this skill"""
+        array = self._arrays.get(skill)
+        if array is None:
+            array = np.fromiter(sorted(self._postings.get(skill, ())), dtype=np.int64)
+            self._arrays[skill] = array
+        return array
+
+    def overlap(self, job_skills: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidates sharing at least one skill with the job
+
+        Returns:
+            (document numbers, intersection counts) arrays
+        """
+        lists = [self.postings(skill) for skill in set(job_skills)]
+        lists = [posting for posting in lists if posting.size]
+        if not lists:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        counts = np.bincount(np.concatenate(lists), minlength=len(self._candidate_ids))
+        docs = np.flatnonzero(counts)
+        return docs, counts[docs]
+
+    def skills_match(self, job_skills: Iterable[str]) -> Tuple[List[Hashable], np.ndarray]:
+        """
+        calculate_skills_match for every candidate with non-zero overlap
+
+        Returns:
+            (candidate ids, skills_match scores)
+        """
+        job_skills_set = set(job_skills)
+        docs, matched = self.overlap(job_skills_set)
+        if self._sizes is None:
+            self._sizes = np.array([len(skills) for skills in self._doc_skills], dtype=np.int64)
+
+        scores = skills_match_from_counts(matched, self._sizes[docs], len(job_skills_set))
+        return [self._candidate_ids[doc] for doc in docs.tolist()], scores
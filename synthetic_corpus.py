@@ -0,0 +1,235 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+# Common skills; the vocabulary is padded with generated names up to the requested size
+BASE_SKILLS = [
+    'python', 'sql', 'java', 'javascript', 'typescript', 'react', 'node.js', 'aws', 'docker', 'kubernetes',
+    'excel', 'tableau', 'power bi', 'spark', 'pandas', 'machine learning', 'go', 'c++', 'rust', 'figma',
+    'salesforce', 'crm', 'qa', 'selenium', 'data analysis', 'statistics', 'communication', 'project management',
+    'git', 'linux', 'postgresql', 'mongodb', 'graphql', 'django', 'flask', 'terraform', 'airflow', 'dbt'
+]
+
+ROLES = [
+    'Software Engineer', 'Data Analyst', 'Data Quality Analyst', 'Product Engineer', 'Product Manager',
+    'QA Engineer', 'Data Scientist', 'DevOps Engineer', 'Designer', 'Account Manager', 'Business Analyst',
+    'Machine Learning Engineer', 'Frontend Engineer', 'Backend Engineer', 'Marketing Manager'
+]
+
+SENIORITY = ['', '', 'Junior ', 'Senior ', 'Lead ', 'Founding ']
+
+JOB_LOCATIONS = [
+    'San Francisco, CA', 'Palo Alto, CA', 'Los Angeles, CA', 'LA', 'Santa Monica', 'New York, NY', 'Remote',
+    'Austin, TX', 'Seattle, WA', 'Chicago, IL', 'Boston, MA', 'Denver, CO', 'Mountain View, CA'
+]
+
+CANDIDATE_CITIES = [
+    'san francisco', 'sf', 'palo alto', 'los angeles', 'la', 'pasadena', 'new york', 'brooklyn', 'austin',
+    'seattle', 'chicago', 'boston', 'denver', 'oakland', 'portland', 'miami', ''
+]
+
+APPROVAL_STATUSES = ['approved', 'approved', 'pending', 'rejected']
+
+YEARS_PHRASES = ['', '', ' 1+ years of experience.', ' 2-4 years experience.', ' 3-5 years of experience.',
+                 ' 5+ years.', ' 7+ yrs in a similar role.', ' entry level.', ' senior level.']
+
+# Syllables combined into the generated word (and skill) vocabulary
+SYLLABLES = ['da', 'ta', 'pro', 'duct', 'en', 'gi', 'neer', 'sys', 'tem', 'qua', 'li', 'ty', 'ana', 'lyst',
+             'cloud', 'web', 'ops', 'stack', 'mo', 'bile', 'ser', 'vice', 'pipe', 'line', 'mar', 'ket']
+
+
+class SyntheticCorpus:
+    """
+    Generator of realistic-looking jobs, candidates and candidatedatas
+
+    Skills and profile words are drawn from Zipf distributions over their
+    vocabularies (skew is the exponent: 0 is uniform, ~1 is natural
+    language), so a few skills are very common and most are rare, as in the
+    real collections. Documents carry every field the matcher reads, in the
+    production shapes. The same seed always produces the same corpus.
+    """
+
+    def __init__(self, n_candidates: int = 10000, n_jobs: int = 200, n_skills: int = 500,
+                 skill_skew: float = 1.1, text_words: int = 60, n_words: int = 5000, word_skew: float = 1.0,
+                 candidatedata_share: float = 0.6, n_companies: int = None, seed: int = 0):
+        """
+        Args:
+            n_candidates: Candidate documents
+            n_jobs: Job documents
+            n_skills: Size of the skill vocabulary
+            skill_skew: Zipf exponent of skill popularity
+            text_words: Mean words per free-text field (about, descriptions, summaries)
+            n_words: Size of the word vocabulary for free text
+            word_skew: Zipf exponent of word frequency
+            candidatedata_share: Fraction of candidates with a candidatedata document
+            n_companies: Companies the jobs belong to (defaults to one per 5 jobs)
+            seed: Random seed
+        """
+        self.n_candidates = n_candidates
+        self.n_jobs = n_jobs
+        self.text_words = text_words
+        self.candidatedata_share = candidatedata_share
+        self.n_companies = n_companies or max(1, n_jobs // 5)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        self.skills = (BASE_SKILLS + self._generated_names(max(0, n_skills - len(BASE_SKILLS)), 'kit'))[:n_skills]
+        self.words = self._generated_names(n_words, '')
+        self._skill_cdf = self._zipf_cdf(len(self.skills), skill_skew)
+        self._word_cdf = self._zipf_cdf(n_words, word_skew)
+
+    @staticmethod
+    def _generated_names(count: int, suffix: str) -> List[str]:
+        """Distinct pronounceable names: i written in base len(SYLLABLES), one syllable per digit"""
+        names, seen = [], set()
+        n = len(SYLLABLES)
+        for i in range(count):
+            parts, value = [], i
+            while True:
+                parts.append(SYLLABLES[value % n])
+                value //= n
+                if not value:
+                    break
+            name = ''.join(parts) + suffix
+            while name in seen:
+                name += SYLLABLES[i % n]
+            seen.add(name)
+            names.append(name)
+        return names
+
+    @staticmethod
+    def _zipf_cdf(size: int, skew: float) -> np.ndarray:
+        weights = 1.0 / np.arange(1, size + 1) ** skew
+        cdf = np.cumsum(weights)
+        return cdf / cdf[-1]
+
+    def _draw(self, cdf: np.ndarray, sizes: np.ndarray) -> List[np.ndarray]:
+        """One array of vocabulary indices per size, drawn in a single vectorized pass"""
+        indices = np.searchsorted(cdf, self.rng.random(int(sizes.sum())))
+        return np.split(np.minimum(indices, len(cdf) - 1), np.cumsum(sizes)[:-1])
+
+    def _texts(self, count: int, mean_words: float) -> List[str]:
+        sizes = self.rng.poisson(max(mean_words, 0.0), count)
+        return [' '.join(self.words[i] for i in draw) for draw in self._draw(self._word_cdf, sizes)]
+
+    def _skill_lists(self, count: int, mean_skills: float) -> List[str]:
+        sizes = self.rng.poisson(mean_skills, count)
+        return [', '.join(dict.fromkeys(self.skills[i] for i in draw)) for draw in self._draw(self._skill_cdf, sizes)]
+
+    def _choices(self, options: List, count: int) -> List:
+        return [options[i] for i in self.rng.integers(0, len(options), count)]
+
+    # Documents
+
+    def companies(self) -> List[Dict]:
+        """Company documents"""
+        return [
+            {'_id': ObjectId(), 'employer_name': f"{name.title()} Inc", 'email': f"jobs@{name}.example.com"}
+            for name in self._generated_names(self.n_companies, 'co')
+        ]
+
+    def jobs(self, companies: List[Dict]) -> List[Dict]:
+        """Job documents, each belonging to one of companies"""
+        n = self.n_jobs
+        titles = [seniority + role for seniority, role in zip(self._choices(SENIORITY, n), self._choices(ROLES, n))]
+        descriptions = self._texts(n, self.text_words * 2)
+        years = self._choices(YEARS_PHRASES, n)
+        skills = self._skill_lists(n, 5)
+        locations = self._choices(JOB_LOCATIONS, n)
+        owners = self._choices(companies, n)
+        return [
+            {
+                '_id': ObjectId(),
+                'title': titles[i],
+                'description': descriptions[i] + years[i],
+                'skills': skills[i],
+                'location': locations[i],
+                'company': owners[i]['_id']
+            }
+            for i in range(n)
+        ]
+
+    def candidate_batches(self, batch_size: int = 10000) -> Iterator[Tuple[List[Dict], List[Dict]]]:
+        """(candidates, candidatedatas) in batches, so large corpora are never held whole"""
+        now = datetime.now(timezone.utc)
+        for start in range(0, self.n_candidates, batch_size):
+            n = min(batch_size, self.n_candidates - start)
+            skills = self._skill_lists(n, 6)
+            roles = self._choices(ROLES + [''], n)
+            abouts = self._texts(n, self.text_words)
+            achievements = self._texts(n, self.text_words / 4)
+            cities = self._choices(CANDIDATE_CITIES, n)
+            years = self.rng.integers(0, 21, n)
+            seeking = self.rng.random(n) < 0.8
+            statuses = self._choices(APPROVAL_STATUSES, n)
+            has_data = self.rng.random(n) < self.candidatedata_share
+
+            candidates = []
+            for i in range(n):
+                number = start + i
+                candidates.append({
+                    '_id': ObjectId(),
+                    'first_name': f"First{number}",
+                    'last_name': f"Last{number}",
+                    'email': f"candidate{number}@example.com",
+                    'skills': skills[i],
+                    'job_role': roles[i],
+                    'about': abouts[i],
+                    'biggest_achievement': achievements[i],
+                    'years_of_experience': int(years[i]) if years[i] else None,
+                    'city': cities[i],
+                    'is_job_seeking': bool(seeking[i]),
+                    'is_availabletointerview': bool(seeking[i]),
+                    'approval_status': statuses[i],
+                    'updated': now
+                })
+
+            owners = [candidate for candidate, keep in zip(candidates, has_data) if keep]
+            m = len(owners)
+            data_skills = self._skill_lists(m, 4)
+            data_roles = self._choices(ROLES, m)
+            education = self._texts(m, self.text_words / 3)
+            employment = self._texts(m, self.text_words / 2)
+            candidatedatas = [
+                {
+                    '_id': ObjectId(),
+                    'candidate': owner['_id'],
+                    'skills': data_skills[i],
+                    'job_role': data_roles[i],
+                    'years_experience': owner['years_of_experience'],
+                    'education': [{'summary': education[i], 'major': 'Computer Science'}],
+                    'employment': [{'summary': employment[i], 'job_title': data_roles[i]}],
+                    'updated': now
+                }
+                for i, owner in enumerate(owners)
+            ]
+            yield candidates, candidatedatas
+
+    def load(self, db, batch_size: int = 10000) -> Dict[str, int]:
+        """
+        Replace the jobs, companies, candidates and candidatedatas collections of db with this corpus
+
+        Returns:
+            Documents inserted per collection
+        """
+        for name in ('companies', 'jobs', 'candidates', 'candidatedatas'):
+            db[name].drop()
+
+        companies = self.companies()
+        db['companies'].insert_many(companies)
+        jobs = self.jobs(companies)
+        if jobs:
+            db['jobs'].insert_many(jobs)
+
+        counts = {'companies': len(companies), 'jobs': len(jobs), 'candidates': 0, 'candidatedatas': 0}
+        for candidates, candidatedatas in self.candidate_batches(batch_size):
+            db['candidates'].insert_many(candidates)
+            counts['candidates'] += len(candidates)
+            if candidatedatas:
+                db['candidatedatas'].insert_many(candidatedatas)
+                counts['candidatedatas'] += len(candidatedatas)
+
+        db['candidatedatas'].create_index('candidate')
+        return counts
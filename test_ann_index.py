@@ -0,0 +1,42 @@
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from ann_index import ProfileANNIndex
+
+
+def _sparse_vectors(rows=3000, dims=400, seed=0):
+    vectors = sparse.random(rows, dims, density=0.02, format='csr', random_state=seed)
+    return normalize(vectors)
+
+
+def test_search_truncates_sparse_probe_to_max_candidates():
+    vectors = _sparse_vectors()
+    index = ProfileANNIndex.build(vectors, n_lists=8)
+    query = vectors[0]
+    probed = index.probe(query, n_probe=4)
+    assert len(probed) > 100
+
+    rows = index.search(query, n_probe=4, max_candidates=100)
+
+    assert len(rows) == 100
+    assert np.all(np.diff(rows) > 0)
+    similarity = (vectors[probed] @ query.T).toarray().ravel()
+    cutoff = np.sort(similarity)[-100]
+    assert set(rows) <= set(probed)
+    assert (vectors[rows] @ query.T).toarray().min() >= cutoff
+
+
+def test_search_truncates_dense_probe_to_max_candidates():
+    vectors = _sparse_vectors().toarray()
+    index = ProfileANNIndex.build(vectors, n_lists=8)
+    rows = index.search(vectors[:1], n_probe=4, max_candidates=50)
+    assert len(rows) == 50
+    assert 0 in rows
+
+
+def test_search_returns_every_probed_row_under_the_cap():
+    vectors = _sparse_vectors(rows=500)
+    index = ProfileANNIndex.build(vectors, n_lists=4)
+    query = vectors[3]
+    assert np.array_equal(index.search(query, n_probe=2, max_candidates=10 ** 6), index.probe(query, n_probe=2))
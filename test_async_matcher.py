@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+import pytest
+
+from async_matcher import AsyncJobCandidateMatcher
+from synthetic_corpus import SyntheticCorpus
+
+mongomock = pytest.importorskip('mongomock')
+benchmark = pytest.importorskip('benchmark')
+
+
+class _AsyncCursor:
+    """Async view of a mongomock cursor"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def batch_size(self, size):
+        self.cursor = self.cursor.batch_size(size)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.cursor:
+            yield document
+
+
+class _AsyncCollection:
+    """Async view of a mongomock collection (the calls AsyncJobCandidateMatcher makes)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+
+@pytest.fixture
+def matcher():
+    db = mongomock.MongoClient()['db']
+    SyntheticCorpus(n_candidates=300, n_jobs=4, n_skills=60, text_words=20, n_words=400, seed=11).load(db)
+    matcher = benchmark.InMemoryMatcher(db)
+    matcher.fit_text_model()
+    return matcher
+
+
+def _key(matches):
+    return [(match['candidate_id'], match['match_score']) for match in matches]
+
+
+async def _async_rankings(matcher, jobs, **kwargs):
+    async_matcher = AsyncJobCandidateMatcher(mongodb_uri='mongodb://localhost:27017', matcher=matcher)
+    for name in ('jobs', 'candidates', 'candidatedatas', 'companies'):
+        setattr(async_matcher, name + '_collection', _AsyncCollection(matcher.db[name]))
+    try:
+        return await asyncio.gather(*[async_matcher.rank_candidates(job, 10, **kwargs) for job in jobs])
+    finally:
+        await async_matcher.client.close()
+
+
+def _record_threads(function, threads):
+    def recorded(*args):
+        threads.add(threading.get_ident())
+        return function(*args)
+    return recorded
+
+
+@pytest.mark.parametrize('options', [{}, {'skill_prefilter': True}, {'vectorized': False}])
+def test_async_rankings_match_rank_candidates(matcher, options):
+    jobs = list(matcher.jobs_collection.find())
+    rankings = asyncio.run(_async_rankings(matcher, jobs, **options))
+    assert all(rankings)
+    assert [_key(ranking) for ranking in rankings] == [_key(matcher.rank_candidates(job, 10, **options))
+                                                       for job in jobs]
+
+
+def test_async_feature_store_rankings_match_rank_candidates(matcher):
+    matcher.build_feature_store(save_path=None)
+    jobs = list(matcher.jobs_collection.find())
+    rankings = asyncio.run(_async_rankings(matcher, jobs, location='sf_bay_area'))
+    assert any(rankings)
+    assert [_key(ranking) for ranking in rankings] == [_key(matcher.rank_candidates(job, 10, location='sf_bay_area'))
+                                                       for job in jobs]
+
+
+def test_disk_result_cache_is_read_and_written_off_the_event_loop(matcher, tmp_path, monkeypatch):
+    cache = matcher.enable_result_cache(str(tmp_path / 'result_cache'))
+    threads = set()
+    monkeypatch.setattr(cache, 'get', _record_threads(cache.get, threads))
+    monkeypatch.setattr(cache, 'put', _record_threads(cache.put, threads))
+    jobs = list(matcher.jobs_collection.find())
+
+    first = asyncio.run(_async_rankings(matcher, jobs))
+    cache.memory.clear()
+    second = asyncio.run(_async_rankings(matcher, jobs))
+
+    assert cache.disk_hits == len(jobs)
+    assert [_key(ranking) for ranking in first] == [_key(ranking) for ranking in second]
+    assert threads and threading.get_ident() not in threads
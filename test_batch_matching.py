@@ -0,0 +1,44 @@
+import pytest
+
+from batch_matching import BatchMatcher
+from synthetic_corpus import SyntheticCorpus
+
+mongomock = pytest.importorskip('mongomock')
+benchmark = pytest.importorskip('benchmark')
+
+
+@pytest.fixture
+def matcher():
+    db = mongomock.MongoClient()['db']
+    SyntheticCorpus(n_candidates=300, n_jobs=6, n_skills=60, text_words=20, n_words=400, seed=13).load(db)
+    matcher = benchmark.InMemoryMatcher(db)
+    matcher.fit_text_model()
+    matcher.build_feature_store(save_path=None)
+    return matcher
+
+
+def _job_rankings(result):
+    return [
+        [(str(result._candidate_id(row)), result.job_scores['overall_score'][j, k])
+         for k, row in enumerate(result.job_candidates[j]) if row >= 0]
+        for j in range(len(result.job_ids))
+    ]
+
+
+def test_scores_match_rank_candidates_for_any_weight_order(matcher):
+    matcher.set_location_weight(0.1)
+    matcher.WEIGHTS = dict(reversed(list(matcher.WEIGHTS.items())))
+    result = BatchMatcher(matcher, top_n=8, block_size=64).run()
+    expected = [
+        [(match['candidate_id'], match['match_score']) for match in matcher.rank_candidates(job, 8)]
+        for job in (matcher.db.jobs.find_one({'_id': job_id}) for job_id in result.job_ids)
+    ]
+    assert _job_rankings(result) == expected
+
+
+def test_candidate_query_does_not_replace_the_matchers_store(matcher):
+    store = matcher.feature_store
+    candidate_query = {'$and': [matcher.CANDIDATE_QUERY, {'job_role': {'$exists': True}}]}
+    result = BatchMatcher(matcher, top_n=8).run(candidate_query=candidate_query)
+    assert matcher.feature_store is store
+    assert len(result.candidate_jobs) == matcher.db.candidates.count_documents(candidate_query)
@@ -0,0 +1,147 @@
+import pytest
+from bson import ObjectId
+
+import change_watcher
+import job_candidate_matcher
+import mongo_clients
+from change_watcher import ChangeStreamWatcher
+from job_search import JobSearch
+from synthetic_corpus import SyntheticCorpus
+
+mongomock = pytest.importorskip('mongomock')
+benchmark = pytest.importorskip('benchmark')
+
+
+@pytest.fixture
+def matcher():
+    db = mongomock.MongoClient()['db']
+    SyntheticCorpus(n_candidates=300, n_jobs=8, n_skills=80, text_words=20, n_words=400, seed=3).load(db)
+    matcher = benchmark.InMemoryMatcher(db)
+    matcher.fit_text_model()
+    matcher.build_feature_store(save_path=None)
+    matcher.build_ann_index(n_lists=4)
+    matcher.build_skills_index()
+    return matcher
+
+
+def _event(collection, operation, document_id, document=None):
+    return {
+        '_id': {'_data': str(ObjectId())},
+        'ns': {'db': 'db', 'coll': collection},
+        'operationType': operation,
+        'documentKey': {'_id': document_id},
+        'fullDocument': document
+    }
+
+
+def _watcher(matcher, events, **kwargs):
+    """A watcher replaying events, started (owners loaded) before the test changes anything"""
+    watcher = ChangeStreamWatcher(matcher, token_path=None, event_source=lambda token: iter(events), **kwargs)
+    watcher.load_candidatedata_owners()
+    return watcher
+
+
+def _ranking(matcher, job, **kwargs):
+    return [(match['candidate_id'], match['match_score']) for match in matcher.rank_candidates(job, 300, **kwargs)]
+
+
+def test_candidate_events_are_applied_as_deltas(matcher):
+    db, store = matcher.db, matcher.feature_store
+    revision, ann_index = store.revision, matcher.ann_index
+    events = []
+    watcher = _watcher(matcher, events)
+    eligible = list(db.candidates.find(matcher.CANDIDATE_QUERY, {'_id': 1}).limit(2))
+    updated, deleted = eligible[0]['_id'], eligible[1]['_id']
+    db.candidates.update_one({'_id': updated}, {'$set': {'skills': 'Cobol, Fortran'}})
+    db.candidates.delete_one({'_id': deleted})
+    inserted = db.candidates.insert_one({
+        'skills': 'Python, SQL', 'job_role': 'Data Analyst', 'about': 'sql reporting',
+        'is_job_seeking': True, 'approval_status': 'approved'
+    }).inserted_id
+    # A delete without pre-images carries no document; its owner must still be re-derived
+    candidatedata = db.candidatedatas.find_one({'candidate': {'$in': [
+        candidate['_id'] for candidate in db.candidates.find(matcher.CANDIDATE_QUERY, {'_id': 1}).skip(2)
+    ]}})
+    db.candidatedatas.delete_one({'_id': candidatedata['_id']})
+
+    events += [
+        _event('candidates', 'update', updated),
+        _event('candidates', 'delete', deleted),
+        _event('candidates', 'insert', inserted),
+        _event('candidatedatas', 'delete', candidatedata['_id'])
+    ]
+    watcher.run()
+
+    assert inserted in store and updated in store and deleted not in store
+    assert store.revision == revision
+    assert set(store.delta.rows) == {updated, inserted, candidatedata['candidate']}
+    assert matcher.ann_index is ann_index and matcher.ann_index_is_current()
+    assert inserted in matcher.skills_index and deleted not in matcher.skills_index
+    assert len(store) == db.candidates.count_documents(matcher.CANDIDATE_QUERY)
+    for job in db.jobs.find():
+        assert _ranking(matcher, job) == _ranking(matcher, job, vectorized=False)
+        assert _ranking(matcher, job, skill_prefilter=True) == _ranking(matcher, job, vectorized=False,
+                                                                         skill_prefilter=True)
+        approximate = _ranking(matcher, job, approximate=True)
+        assert approximate and all(ObjectId(candidate_id) in store for candidate_id, _ in approximate)
+
+
+def test_watcher_compacts_once_enough_changes_accumulate(matcher):
+    db, store = matcher.db, matcher.feature_store
+    store.COMPACT_MIN_ROWS = 3
+    revision = store.revision
+    candidate_ids = [candidate['_id'] for candidate in db.candidates.find(matcher.CANDIDATE_QUERY, {'_id': 1}).limit(5)]
+    for candidate_id in candidate_ids:
+        db.candidates.update_one({'_id': candidate_id}, {'$set': {'job_role': 'Data Engineer'}})
+
+    _watcher(matcher, [_event('candidates', 'update', candidate_id) for candidate_id in candidate_ids]).run()
+
+    assert store.revision != revision and store.delta is None and store.dead is None
+    assert matcher.ann_index_is_current()
+    assert all(candidate_id in store for candidate_id in candidate_ids)
+    job = db.jobs.find_one()
+    assert _ranking(matcher, job) == _ranking(matcher, job, vectorized=False)
+
+
+def test_job_events_refresh_job_search_and_score_tables(matcher):
+    db = matcher.db
+    job_search = JobSearch.build(db, normalize=matcher.normalize_text)
+    updated, deleted = list(db.jobs.find().limit(2))
+    matcher.score_table(updated)
+    matcher.score_table(deleted)
+    db.jobs.update_one({'_id': updated['_id']}, {'$set': {'title': 'Zebra Wrangler'}})
+    db.jobs.delete_one({'_id': deleted['_id']})
+    inserted = db.jobs.insert_one({'title': 'Zebra Keeper', 'location': 'Palo Alto, CA'}).inserted_id
+
+    _watcher(matcher, [
+        _event('jobs', 'update', updated['_id']),
+        _event('jobs', 'delete', deleted['_id']),
+        _event('jobs', 'insert', inserted)
+    ], job_search=job_search).run()
+
+    assert len(matcher.score_tables) == 0
+    assert len(job_search) == db.jobs.count_documents({})
+    assert sorted(job['title'] for job in job_search.find_jobs('title:zebra')) == ['Zebra Keeper', 'Zebra Wrangler']
+    assert job_search.count('') == len(job_search)
+    assert deleted['_id'] not in [job['_id'] for job in job_search.find_jobs('')]
+    assert job_search.count(f'title:"{deleted["title"]}"') == db.jobs.count_documents({'title': deleted['title']})
+
+
+def test_watcher_lookups_read_from_the_primary(matcher, monkeypatch):
+    read = []
+
+    def recording_primary_collection(collection):
+        read.append(collection.name)
+        handle = mongo_clients.primary_collection(collection)
+        assert handle.read_preference == mongo_clients.ReadPreference.PRIMARY
+        return handle
+
+    monkeypatch.setattr(change_watcher, 'primary_collection', recording_primary_collection)
+    monkeypatch.setattr(job_candidate_matcher, 'primary_collection', recording_primary_collection)
+    db = matcher.db
+    candidate_id = db.candidates.find_one(matcher.CANDIDATE_QUERY, {'_id': 1})['_id']
+    job_id = db.jobs.find_one({}, {'_id': 1})['_id']
+    _watcher(matcher, [_event('candidates', 'update', candidate_id), _event('jobs', 'update', job_id)],
+             job_search=JobSearch.build(db, normalize=matcher.normalize_text)).run()
+
+    assert {'candidates', 'candidatedatas', 'jobs'} <= set(read)
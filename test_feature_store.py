@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+from feature_store import CandidateFeatureStore
+from synthetic_corpus import SyntheticCorpus
+
+mongomock = pytest.importorskip('mongomock')
+benchmark = pytest.importorskip('benchmark')
+
+
+@pytest.fixture
+def matcher():
+    db = mongomock.MongoClient()['db']
+    SyntheticCorpus(n_candidates=300, n_jobs=4, n_skills=60, text_words=20, n_words=400, seed=7).load(db)
+    matcher = benchmark.InMemoryMatcher(db)
+    matcher.fit_text_model()
+    matcher.build_feature_store(save_path=None)
+    return matcher
+
+
+def test_refresh_drops_hard_deleted_candidates(matcher):
+    db, store = matcher.db, matcher.feature_store
+    candidate_ids = [candidate['_id'] for candidate in db.candidates.find(matcher.CANDIDATE_QUERY, {'_id': 1})]
+    store.upsert(matcher, *next(matcher.iter_candidates_by_ids(candidate_ids[:1])))
+    deleted = candidate_ids[:3]
+    db.candidates.delete_many({'_id': {'$in': deleted}})
+
+    _, removed = store.refresh(matcher)
+
+    assert removed == len(deleted)
+    assert not any(candidate_id in store for candidate_id in deleted)
+    assert sorted(store.current_ids()) == sorted(candidate_ids[3:])
+    assert len(store) == db.candidates.count_documents(matcher.CANDIDATE_QUERY)
+
+
+def test_stores_in_an_older_format_are_not_loaded(matcher, tmp_path):
+    path = str(tmp_path / 'feature_store')
+    matcher.feature_store.save(path)
+    assert CandidateFeatureStore.load_if_exists(path).revision == matcher.feature_store.revision
+
+    meta_path = os.path.join(path, 'meta.json')
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['format_version'] = CandidateFeatureStore.FORMAT_VERSION - 1
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    assert CandidateFeatureStore.load_if_exists(path) is None
+    with pytest.raises(ValueError):
+        CandidateFeatureStore.load(path)
@@ -0,0 +1,52 @@
+import pytest
+
+from job_search import JobSearch
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient()['db']
+    db.jobs.insert_many([
+        {'title': 'Data Analyst', 'description': 'sql reporting', 'location': 'Palo Alto, CA'},
+        {'title': 'Software Engineer', 'description': 'python services', 'location': 'Los Angeles'},
+        {'title': 'Data Quality Analyst', 'description': 'testing data pipelines', 'location': 'LA'}
+    ])
+    return db
+
+
+def _titles(search, query):
+    return sorted(job['title'] for job in search.find_jobs(query))
+
+
+def test_empty_alternatives_do_not_match_everything(db):
+    search = JobSearch.build(db)
+    assert _titles(search, 'data OR') == ['Data Analyst', 'Data Quality Analyst']
+    assert _titles(search, 'data OR ()') == ['Data Analyst', 'Data Quality Analyst']
+    assert _titles(search, 'engineer () OR') == ['Software Engineer']
+    assert search.parse('OR ()') == JobSearch.MATCH_NOTHING
+
+
+@pytest.mark.parametrize('query', ['*', 'NOT', '-', '"', '((', ')', 'OR ()', 'title:'])
+def test_queries_without_words_match_nothing(db, query):
+    search = JobSearch.build(db)
+    assert search.find_jobs(query) == []
+    assert search.count(query) == 0
+    assert search.count('') == search.count('  ') == len(search)
+
+
+def test_load_or_build_reuses_the_saved_index_until_jobs_change(db, tmp_path):
+    path = str(tmp_path / 'job_search.pkl')
+    built = JobSearch.load_or_build(db, path)
+    loaded = JobSearch.load(db, path)
+    assert loaded is not None
+    assert loaded.job_ids == built.job_ids
+    assert _titles(loaded, 'title:analyst') == ['Data Analyst', 'Data Quality Analyst']
+
+    assert JobSearch.load(db, path, max_age=0) is None
+    db.jobs.insert_one({'title': 'QA Analyst', 'location': 'San Francisco'})
+    assert JobSearch.load(db, path) is None
+    assert _titles(JobSearch.load_or_build(db, path), 'title:analyst') == [
+        'Data Analyst', 'Data Quality Analyst', 'QA Analyst'
+    ]
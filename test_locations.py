@@ -0,0 +1,24 @@
+import pytest
+
+from locations import LOCATIONS
+
+
+@pytest.mark.parametrize('text, metro', [
+    ('LA', 'los_angeles'),
+    ('L.A.', 'los_angeles'),
+    ('LA, CA', 'los_angeles'),
+    ('Downtown LA', 'los_angeles'),
+    ('Los Angeles, CA', 'los_angeles'),
+    ('SD', 'san_diego'),
+    ('La Jolla, CA', 'san_diego'),
+    ('NY, NY', 'new_york'),
+    ('Washington, DC', 'washington_dc'),
+    ('SF', 'sf_bay_area')
+])
+def test_metro_aliases_resolve(text, metro):
+    assert LOCATIONS.metro_name(LOCATIONS.metro_id(text)) == metro
+
+
+@pytest.mark.parametrize('text', ['New Orleans, LA', 'Baton Rouge, LA', 'Sioux Falls, SD', 'Rapid City, SD'])
+def test_state_codes_do_not_match_metro_aliases(text):
+    assert LOCATIONS.city_id(text) == LOCATIONS.UNKNOWN
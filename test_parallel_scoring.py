@@ -0,0 +1,72 @@
+import itertools
+
+import pytest
+
+import parallel_scoring
+from parallel_scoring import ShardedScorer
+from synthetic_corpus import SyntheticCorpus
+
+mongomock = pytest.importorskip('mongomock')
+benchmark = pytest.importorskip('benchmark')
+
+
+class _InlinePool:
+    """Runs tasks in-process (with the module's worker matcher set) and records them"""
+
+    def __init__(self):
+        self.tasks = []
+
+    def starmap(self, function, tasks):
+        self.tasks.extend(tasks)
+        return list(itertools.starmap(function, tasks))
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+@pytest.fixture
+def matcher():
+    db = mongomock.MongoClient()['db']
+    SyntheticCorpus(n_candidates=400, n_jobs=4, n_skills=60, text_words=20, n_words=400, seed=5).load(db)
+    matcher = benchmark.InMemoryMatcher(db)
+    matcher.fit_text_model()
+    return matcher
+
+
+def _scorer(matcher, monkeypatch):
+    scorer = ShardedScorer(matcher, processes=3)
+    scorer._pool = _InlinePool()
+    scorer._forked_state = scorer._matcher_state()
+    monkeypatch.setattr(parallel_scoring, '_worker_matcher', matcher)
+    return scorer
+
+
+def _key(matches):
+    return [(match['candidate_id'], match['match_score']) for match in matches]
+
+
+def test_prefiltered_ids_are_split_between_shards(matcher, monkeypatch):
+    scorer = _scorer(matcher, monkeypatch)
+    for job in matcher.jobs_collection.find():
+        scorer._pool.tasks = []
+        assert _key(scorer.rank_candidates(job, 10, skill_prefilter=True)) == _key(
+            matcher.rank_candidates(job, 10, skill_prefilter=True))
+        candidate_ids, _ = matcher.skill_prefilter_candidates(matcher.compile_job_profile(job))
+        slices = [task[7] for task in scorer._pool.tasks]
+        assert len(slices) > 1
+        assert sorted(sum(slices, [])) == sorted(candidate_ids)
+
+
+def test_feature_store_rows_are_scored_by_range(matcher, monkeypatch):
+    matcher.build_feature_store(save_path=None)
+    matcher.build_ann_index(n_lists=4)
+    scorer = _scorer(matcher, monkeypatch)
+    for job in matcher.jobs_collection.find():
+        for approximate in (False, True):
+            scorer._pool.tasks = []
+            assert _key(scorer.rank_candidates(job, 10, approximate=approximate, skill_prefilter=True)) == _key(
+                matcher.rank_candidates(job, 10, approximate=approximate, skill_prefilter=True))
+            assert len(scorer._pool.tasks) == scorer.shards
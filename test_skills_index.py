@@ -0,0 +1,29 @@
+from skills_index import SkillsIndex
+
+
+def test_readding_candidates_reuses_document_numbers():
+    index = SkillsIndex()
+    for candidate_id in range(10):
+        index.add(candidate_id, ['sql', 'python'])
+    for _ in range(100):
+        for candidate_id in range(10):
+            index.add(candidate_id, ['sql'] if candidate_id % 2 else ['python', 'java'])
+
+    assert len(index) == 10
+    assert len(index._candidate_ids) == 10
+    candidate_ids, scores = index.skills_match(['sql'])
+    assert sorted(candidate_ids) == [1, 3, 5, 7, 9]
+    assert scores.tolist() == [1.0] * 5
+
+
+def test_removed_candidates_are_not_matched():
+    index = SkillsIndex()
+    index.add('a', ['sql'])
+    index.add('b', ['sql', 'excel'])
+    assert index.remove('a')
+    assert not index.remove('a')
+    index.add('c', ['excel'])
+
+    candidate_ids, _ = index.skills_match(['sql', 'excel'])
+    assert sorted(candidate_ids) == ['b', 'c']
+    assert len(index._candidate_ids) == 2
@@ -0,0 +1,131 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache with hit/miss counters
+
+    Thread-safe; values are returned as stored, so cache only immutable
+    values or copy them on the way out.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable):
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value for key (counted as a hit or miss)"""
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for key, computing and storing it on a miss"""
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return an entry without touching the counters"""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove the entries whose key satisfies predicate; returns how many were removed"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire ttl seconds after they were stored"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value for key unless it has expired (counted as a hit or miss)"""
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is not self._MISSING and entry[1] <= self.clock():
+                del self._data[key]
+                entry = self._MISSING
+            if entry is self._MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value for ttl seconds, evicting the least recently used entry when full"""
+        super().put(key, (value, self.clock() + self.ttl))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return an entry (expired or not) without touching the counters"""
+        entry = super().pop(key, self._MISSING)
+        return default if entry is self._MISSING else entry[0]
+
+
+def normalize_text(text) -> str:
+    """Lowercase, punctuation replaced by spaces, whitespace collapsed (JobCandidateMatcher memoizes it)"""
+    if not text:
+        return ""
+    text = str(text).lower().strip()
+    # Remove special characters but keep spaces
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text)
@@ -0,0 +1,135 @@
+import os
+import pickle
+import uuid
+from typing import Iterable, List
+
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Default location of the persisted corpus model
+TEXT_MODEL_PATH = 'text_model.pkl'
+
+
+class CorpusTextModel:
+    """
+    Corpus-level TF-IDF model for job/candidate text similarity
+
+    The vectorizer is fitted once over every job and candidate profile text,
+    so IDF weights reflect the whole corpus. Vectors are L2-normalized, which
+    makes cosine similarity a plain sparse dot product.
+
+    With dimensions set, the TF-IDF space is additionally projected with a
+    truncated SVD (LSA) fitted on the same corpus, and transform() returns
+    contiguous float32 rows of that size instead; similarity across many
+    candidates is then a single dense matrix-vector product.
+    """
+
+    # Fitted SVD projection, or None for sparse TF-IDF vectors
+    svd = None
+
+    def __init__(self, max_features: int = 20000, ngram_range=(1, 2), stop_words='english', min_df: int = 2,
+                 dimensions: int = None):
+        """Create an unfitted model with the given vectorizer settings (and optional SVD dimensions)"""
+        self.vectorizer = TfidfVectorizer(
+            max_features=max_features,
+            stop_words=stop_words,
+            ngram_range=ngram_range,
+            min_df=min_df
+        )
+        self.dimensions = dimensions
+        self.is_fitted = False
+        self.document_count = 0
+        # Changes on every fit; lets derived data (e.g. stored vectors) detect a stale model
+        self.fingerprint = None
+
+    def fit(self, texts: Iterable[str]) -> 'CorpusTextModel':
+        """Fit the vectorizer over normalized job and candidate texts"""
+        texts = list(texts)
+        try:
+            matrix = self.vectorizer.fit_transform(texts)
+        except ValueError:
+            # min_df can prune every term on a tiny corpus; retry keeping all terms
+            self.vectorizer.set_params(min_df=1)
+            matrix = self.vectorizer.fit_transform(texts)
+        if self.dimensions:
+            components = min(self.dimensions, matrix.shape[1] - 1)
+            self.svd = TruncatedSVD(n_components=max(1, components), random_state=0).fit(matrix)
+        self.document_count = len(texts)
+        self.fingerprint = uuid.uuid4().hex
+        self.is_fitted = True
+        return self
+
+    def transform(self, texts: List[str]):
+        """Transform normalized texts into L2-normalized rows (sparse, or dense float32 with SVD)"""
+        matrix = self.vectorizer.transform(texts)
+        if self.svd is None:
+            return matrix
+
+        vectors = np.ascontiguousarray(self.svd.transform(matrix), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        vectors /= norms[:, None]
+        return vectors
+
+    def similarity(self, query_vector, matrix) -> np.ndarray:
+        """Cosine similarity of one query row against every row of a matrix"""
+        if sparse.issparse(matrix):
+            return np.asarray((matrix @ query_vector.T).toarray()).ravel()
+        return (matrix @ np.ravel(query_vector)).astype(np.float64)
+
+    def stack(self, vectors: List):
+        """Stack transformed rows (e.g. one per job) into a single matrix"""
+        if self.svd is None:
+            return sparse.vstack(vectors, format='csr')
+        return np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+
+    def similarity_matrix(self, query_matrix, matrix) -> np.ndarray:
+        """
+        Cosine similarity of every row of matrix against every query row
+
+        Returns:
+            (matrix rows x query rows) float64 array; column j equals similarity(query j, matrix)
+        """
+        if sparse.issparse(matrix):
+            return (matrix @ query_matrix.T.tocsc()).toarray()
+        # One matrix-vector product per query keeps columns identical to similarity()
+        columns = [self.similarity(query, matrix) for query in query_matrix]
+        return np.column_stack(columns) if columns else np.zeros((matrix.shape[0], 0))
+
+    def save(self, path: str = TEXT_MODEL_PATH):
+        """Persist the fitted model to disk"""
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str = TEXT_MODEL_PATH) -> 'CorpusTextModel':
+        """Load a model previously written with save()"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    @classmethod
+    def load_if_exists(cls, path: str = TEXT_MODEL_PATH):
+        """Load a persisted model, or return None when the file is missing"""
+        if path and os.path.exists(path):
+            return cls.load(path)
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+    from job_candidate_matcher import JobCandidateMatcher
+
+    # Usage: python text_model.py [path] [svd dimensions]
+    path = sys.argv[1] if len(sys.argv) > 1 else TEXT_MODEL_PATH
+    dimensions = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    matcher = JobCandidateMatcher(text_model_path=None)
+    print("Fitting corpus text model over all jobs and candidates...")
+    model = matcher.fit_text_model(save_path=path, dimensions=dimensions)
+    print(f"Fitted on {model.document_count} documents "
+          f"({len(model.vectorizer.vocabulary_)} features"
+          f"{f', projected to {model.svd.n_components} dimensions' if model.svd is not None else ''})")
+    print(f"Saved to {path}")
+    matcher.close()